@@ -0,0 +1,75 @@
+#
+# framing_benchmark.py
+# backyardbot
+#
+# Created: October 2026
+#
+
+"""
+Compares the json framing of websocket messages with the MessagePack
+framing for timetable snapshots of different sizes: the size of the
+encoded frame and the time it takes to encode it. Requires the `msgpack`
+package for the comparison.
+
+Run from the repository's root directory:
+`python3 benchmarks/framing_benchmark.py`
+"""
+
+import os
+import sys
+import random
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from framework.framing import create_framings, msgpack  # noqa: E402
+
+
+ENTRY_COUNTS = [100, 1000, 10000]
+REPETITIONS = 20
+PLUGIN_NAMES = ["timetable", "timecontrol", "image_display", "sprinklerinterface"]
+
+
+def create_snapshot(entry_count):
+    zones = ["Z1", "Z2", "Z3", "Z4", "Z5", "Z6"]
+    entries = [
+        {
+            "time_hh": random.randint(0, 23), "time_mm": random.randint(0, 59), "weekday": random.randint(0, 7),
+            "zones": random.sample(zones, random.randint(1, 4)), "duration": random.choice([60, 300, 600]),
+            "doc_id": i
+        }
+        for i in range(entry_count)
+    ]
+    return {
+        "plugin_name": "timetable",
+        "payload": {"command": "timetable_contents", "payload": entries},
+        "state_version": 1
+    }
+
+
+def measure(framing, frame):
+    """ Returns the encoded size in bytes and the mean encoding time in ms. """
+    t0 = time.perf_counter()
+    for _ in range(REPETITIONS):
+        data = framing.encode(frame)
+    duration = (time.perf_counter() - t0) / REPETITIONS
+    size = len(data) if isinstance(data, bytes) else len(data.encode())
+    return size, 1000 * duration
+
+
+def main():
+    random.seed(0)
+    if msgpack is None:
+        print("msgpack is not installed, only the json framing is measured.")
+    framings = create_framings(PLUGIN_NAMES, {})
+    for entry_count in ENTRY_COUNTS:
+        frame = create_snapshot(entry_count)
+        print(f"timetable snapshot with {entry_count} entries")
+        results = {protocol: measure(framing, frame) for protocol, framing in framings.items()}
+        json_size = results["byb.json"][0]
+        for protocol, (size, duration) in results.items():
+            print(f"  {protocol:12} {size / 1024:9.1f} KiB ({size / json_size:4.0%}) {duration:8.2f} ms")
+
+
+if __name__ == "__main__":
+    main()
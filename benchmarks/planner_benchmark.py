@@ -0,0 +1,114 @@
+#
+# planner_benchmark.py
+# backyardbot
+#
+# Created: October 2026
+#
+
+"""
+Compares the total wall time of watering large sets of zones with the
+`WaterSourcePlanner` against watering them one after another, which is the
+only safe option without a planner if the water sources can't drive all
+sprinklers at once. Each zone has its own actuator with a random flow rate
+and duration. The planner's execution is simulated on an event queue, no
+actuators are switched.
+
+Run from the repository's root directory:
+`python3 benchmarks/planner_benchmark.py`
+"""
+
+import os
+import sys
+import heapq
+import random
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from plugins.sprinklerinterface.actuator import WateringTask  # noqa: E402
+from plugins.sprinklerinterface.water_source_planner import WaterSourcePlanner  # noqa: E402
+
+
+ZONE_COUNTS = [50, 500, 5000]
+# liters per minute
+FLOW_BUDGETS = {"tap": 30, "pump": 45, "well": 20}
+FLOW_RATES = [4, 6, 8, 10, 12, 15]
+# seconds
+DURATIONS = [300, 600, 900, 1200, 1800]
+
+
+class BenchmarkActuator:
+
+    def __init__(self, zone, source, flow_rate):
+        self.zone = zone
+        self.source = source
+        self.flow_rate = flow_rate
+
+    def estimate_duration(self, tasks):
+        return sum(task.duration for task in tasks)
+
+
+def create_zones(zone_count):
+    sources = list(FLOW_BUDGETS.keys())
+    zones = []
+    for i in range(zone_count):
+        actuator = BenchmarkActuator(f"Z{i}", random.choice(sources), random.choice(FLOW_RATES))
+        zones.append((actuator, [WateringTask(actuator.zone, random.choice(DURATIONS))]))
+    return zones
+
+
+def simulate_planner(zones):
+    """ Returns the time at which the last zone is done and the time spent in the planner. """
+    planner = WaterSourcePlanner(FLOW_BUDGETS)
+    for actuator, _ in zones:
+        planner.add_actuator(actuator, actuator.source, actuator.flow_rate)
+
+    # (end time, counter, actuator)
+    running = []
+    counter = 0
+    planner_time = 0.0
+    now = 0
+
+    def start(startable):
+        nonlocal counter
+        for actuator, tasks in startable:
+            heapq.heappush(running, (now + actuator.estimate_duration(tasks), counter, actuator))
+            counter += 1
+
+    t0 = time.perf_counter()
+    startable = []
+    for actuator, tasks in zones:
+        startable += planner.submit(actuator, tasks)
+    planner_time += time.perf_counter() - t0
+    start(startable)
+
+    while running:
+        now, _, actuator = heapq.heappop(running)
+        t0 = time.perf_counter()
+        startable = planner.release(actuator)
+        planner_time += time.perf_counter() - t0
+        start(startable)
+    return now, planner_time
+
+
+def main():
+    random.seed(0)
+    print(f"water sources (flow budget): {FLOW_BUDGETS}")
+    for zone_count in ZONE_COUNTS:
+        zones = create_zones(zone_count)
+        sequential = sum(tasks[0].duration for _, tasks in zones)
+        # no schedule can be faster than the source with the most water to deliver
+        lower_bound = max(
+            sum(a.flow_rate * tasks[0].duration for a, tasks in zones if a.source == source) / budget
+            for source, budget in FLOW_BUDGETS.items())
+        planned, planner_time = simulate_planner(zones)
+
+        print(f"{zone_count} zones")
+        print(f"  sequential:   {sequential / 3600:8.1f} h")
+        print(f"  planner:      {planned / 3600:8.1f} h ({sequential / planned:.1f}x faster)")
+        print(f"  lower bound:  {lower_bound / 3600:8.1f} h")
+        print(f"  planner cpu:  {1e6 * planner_time / zone_count:8.1f} us/zone")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,93 @@
+#
+# render_benchmark.py
+# backyardbot
+#
+# Created: October 2026
+#
+
+"""
+Measures how many index pages per second the Renderer produces with the
+plugins and templates of this repository. Compares rendering with the
+compiled template cache against parsing and compiling all templates for
+every request, which is how pages were rendered before the cache existed.
+
+Run from the repository's root directory:
+`python3 benchmarks/render_benchmark.py`
+"""
+
+import os
+import sys
+import json
+import shutil
+import tempfile
+import timeit
+
+repo_dir = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+sys.path.insert(0, repo_dir)
+os.chdir(repo_dir)
+
+from jinja2 import Environment, Template, meta  # noqa: E402
+from framework.memory import Database  # noqa: E402
+from framework.plugin_manager import PluginManager  # noqa: E402
+from framework.renderer import Renderer  # noqa: E402
+from framework.main import load_allowed_files, get_html_template_file  # noqa: E402
+
+
+def uncached_plugin_render(plugin):
+    t = Template(open(plugin.html_template_path).read())
+    return t.render(plugin_name=plugin.name, values=plugin.calc_render_data(), localization=plugin.localization)
+
+
+def uncached_render(plugins, main_template_path, css_files, js_files):
+    """ Renders the index page like the Renderer did without template cache. """
+    main_template_str = open(main_template_path).read()
+    env = Environment()
+    used_vars = meta.find_undeclared_variables(env.parse(main_template_str))
+    plugin_dict = {p.name: p for p in plugins}
+    unlisted_plugins = set(plugin_dict.keys()) - used_vars
+    listed_plugins = set(plugin_dict.keys()) - unlisted_plugins
+
+    template_dict = {
+        "stylesheets": css_files,
+        "plugin_renderers": [lambda p=plugin_dict[name]: uncached_plugin_render(p) for name in unlisted_plugins],
+        "scripts": js_files
+    }
+    for name in listed_plugins:
+        template_dict[name] = lambda p=plugin_dict[name]: uncached_plugin_render(p)
+    return Template(main_template_str).render(template_dict)
+
+
+def main():
+    tmp_dir = tempfile.mkdtemp()
+    try:
+        db_path = os.path.join(tmp_dir, "db.json")
+        shutil.copy("byb/db.json", db_path)
+        Database.set_db_path(db_path)
+
+        settings = json.load(open("byb/settings.json"))
+        plugin_manager = PluginManager("plugins/")
+        plugins = plugin_manager.get_plugin_list()
+        allowed_files = load_allowed_files(settings)
+        for plugin in plugins:
+            plugin.set_localization_data(settings)
+            allowed_files += plugin.css_files() + plugin.js_files()
+        main_template = get_html_template_file(settings)
+
+        renderer = Renderer(plugin_manager, main_template, allowed_files)
+        css_files, js_files = renderer.css_files, renderer.js_files
+
+        requests = 200
+        t_uncached = min(timeit.repeat(
+            lambda: uncached_render(plugins, main_template, css_files, js_files), number=requests, repeat=3))
+        t_cached = min(timeit.repeat(lambda: renderer.render(), number=requests, repeat=3))
+
+        print(f"index page, {len(plugins)} plugins, {len(renderer.render())} characters")
+        print(f"  without template cache: {requests / t_uncached:8.1f} requests/s")
+        print(f"  with template cache:    {requests / t_cached:8.1f} requests/s")
+    finally:
+        Database.db.close()
+        shutil.rmtree(tmp_dir)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,88 @@
+#
+# topics_benchmark.py
+# backyardbot
+#
+# Created: October 2026
+#
+
+"""
+Measures the cost of publishing messages with `Topics.send_message(..)`.
+200 components subscribe to 10 of 2,000 topics each. The indexed routing is
+compared against the previous approach that handed every message to every
+registered component which then checked its handlers itself.
+
+Run from the repository's root directory:
+`python3 benchmarks/topics_benchmark.py`
+"""
+
+import os
+import sys
+import random
+import timeit
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from framework.communication import Topics, BaseMessage  # noqa: E402
+from framework.event import EventComponent  # noqa: E402
+
+
+COMPONENT_COUNT = 200
+TOPIC_COUNT = 2000
+TOPICS_PER_COMPONENT = 10
+MESSAGE_COUNT = 20000
+
+quiet_settings = {"logging": {"log_to_stream": False, "log_to_file": False}}
+
+
+class BenchmarkComponent(EventComponent):
+
+    def __init__(self, settings):
+        super().__init__(settings)
+        self.received = 0
+
+    def receive_message(self, msg):
+        if self._get_message_handler(msg.topic) is not None:
+            self.received += 1
+
+    def handle(self, msg):
+        pass
+
+
+def send_message_to_all_components(message):
+    """ Routing as it was done before the topic index existed. """
+    for client in Topics._clients:
+        client.receive_message(message)
+
+
+def main():
+    random.seed(0)
+    topics = [f"benchmark/topic_{i}" for i in range(TOPIC_COUNT)]
+    components = [BenchmarkComponent(quiet_settings) for _ in range(COMPONENT_COUNT)]
+    for component in components:
+        for topic in random.sample(topics, TOPICS_PER_COMPONENT):
+            component.register_topic_callback(topic, component.handle)
+    # one wildcard subscriber to include pattern matching in the measurements
+    components[0].register_topic_callback("benchmark/*", components[0].handle)
+
+    messages = [BaseMessage(random.choice(topics)) for _ in range(MESSAGE_COUNT)]
+
+    def indexed():
+        for m in messages:
+            Topics.send_message(m)
+
+    def broadcast():
+        for m in messages:
+            send_message_to_all_components(m)
+
+    indexed()  # fills the route cache
+    t_indexed = min(timeit.repeat(indexed, number=1, repeat=5))
+    t_broadcast = min(timeit.repeat(broadcast, number=1, repeat=5))
+
+    print(f"{COMPONENT_COUNT} components, {TOPIC_COUNT} topics, {MESSAGE_COUNT} messages")
+    print(f"  broadcast to all components: {1e6 * t_broadcast / MESSAGE_COUNT:8.2f} us/message")
+    print(f"  topic index:                 {1e6 * t_indexed / MESSAGE_COUNT:8.2f} us/message")
+    print(f"  speedup: {t_broadcast / t_indexed:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,94 @@
+#
+# clock.py
+# backyardbot
+#
+# Created: October 2026
+#
+
+import time
+import asyncio
+
+
+class Clock:
+    """
+    Source of the current unix time for all components that schedule work
+    based on wall clock times, e.g. the time control and the actuators.
+    Defaults to the system time. A simulation replaces it with the virtual
+    time of a `VirtualTimeEventLoop`.
+
+    Waiting is always done with the event loop's functions (`asyncio.sleep`,
+    `asyncio.wait_for`, `loop.call_at`) which follow the loop's time.
+    """
+    _time_source = time.time
+
+    def __init__(self):
+        raise RuntimeWarning("Clock class is not supposed to be instantiated")
+
+    @classmethod
+    def time(cls):
+        return cls._time_source()
+
+    @classmethod
+    def set_time_source(cls, time_source):
+        """ Replaces the source of the current time. `None` restores the system time. """
+        cls._time_source = time_source if time_source is not None else time.time
+
+
+class _VirtualTimeSelector:
+    """
+    Wraps the selector of a `VirtualTimeEventLoop`. Instead of blocking
+    until the next timer is due, it polls for I/O and then advances the
+    loop's virtual time to the timer.
+    """
+
+    def __init__(self, selector, loop):
+        self._selector = selector
+        self._loop = loop
+
+    def select(self, timeout=None):
+        events = self._selector.select(0)
+        if events or timeout == 0:
+            return events
+        if timeout is None:
+            raise RuntimeError("Virtual time event loop is idle without any scheduled callbacks.")
+        self._loop.advance_time(timeout)
+        return events
+
+    def __getattr__(self, name):
+        return getattr(self._selector, name)
+
+
+class VirtualTimeEventLoop(asyncio.SelectorEventLoop):
+    """
+    Event loop that runs on virtual time. Whenever there is nothing to do
+    until the next timer, time jumps forward to that timer instead of
+    waiting, so sleeping for a day returns immediately. Use together with
+    `Clock.set_time_source(loop.wall_time)`.
+
+    Functions handed to `run_in_executor(..)` are executed right away on the
+    loop's thread, as virtual time must not pass while they are in flight.
+    """
+
+    def __init__(self, start_time):
+        super().__init__()
+        self._selector = _VirtualTimeSelector(self._selector, self)
+        self._start_time = start_time
+        self._virtual_time = 0.0
+
+    def time(self):
+        return self._virtual_time
+
+    def wall_time(self):
+        """ Unix timestamp that corresponds to the loop's current virtual time. """
+        return self._start_time + self._virtual_time
+
+    def advance_time(self, duration):
+        self._virtual_time += duration
+
+    def run_in_executor(self, executor, func, *args):
+        future = self.create_future()
+        try:
+            future.set_result(func(*args))
+        except Exception as e:
+            future.set_exception(e)
+        return future
@@ -7,6 +7,7 @@
 # montebaur.tech, github.com/montioo
 #
 
+import asyncio
 from dataclasses import dataclass
 from typing import Any
 
@@ -25,23 +26,61 @@ class WebsocketRequest(BaseMessage):
     by the server to a plugin or sent by a plugin to the server to be
     forwarded to the frontend.
 
-    `ws_id` is the id of the websocket object that was used to either receive
-    this message or that should be used to send a message to the frontend. If
+    `ws_id` is the connection id that the server assigned to the websocket
+    client that either sent this message or should receive it. If
     the server receives a message from a component (e.g. a plugin) without a
     `ws_id` (i.e. -1), it will broadcast the message to all active frontends.
     """
     ws_id: int = -1
 
 
-class Topics:
-    _clients = set()
+@dataclass
+class StateUpdate(WebsocketRequest):
+    """
+    A websocket message whose payload (`{"command": .., "payload": ..}`)
+    holds the complete state of a plugin's frontend element. The server
+    doesn't forward it as is but only sends the changes since the state that
+    the clients received last, see `framework.state_sync.StateSync`.
+    """
+    pass
+
+
+def topic_matches(pattern, topic):
+    """
+    Checks whether `topic` is covered by a subscription `pattern`. Topic
+    names are split into segments at `/` and a `*` segment in the pattern
+    matches exactly one arbitrary segment of the topic, e.g. the pattern
+    `websocket/*/frontend` matches `websocket/timetable/frontend` but not
+    `websocket/frontend`.
+    """
+    if pattern == topic:
+        return True
+    pattern_segments = pattern.split("/")
+    topic_segments = topic.split("/")
+    if len(pattern_segments) != len(topic_segments):
+        return False
+    return all(p == "*" or p == t for p, t in zip(pattern_segments, topic_segments))
+
+
+def is_wildcard_topic(topic_name):
+    return "*" in topic_name.split("/")
 
-    # TODO: Either deliver every message to every plugin or maintain a list with "interested plugins"
+
+class Topics:
     """
     Implements a messaging system where messages are exchanged over topics. Clients can subscribe to
     any topic and will get notified via a callback once a message appears on that topic.
     Every client can publish messages on all topics.
 
+    Topics keeps an index that maps every topic to its subscribers, so publishing a message only
+    reaches the clients that registered a callback for it. Subscriptions may contain wildcard
+    segments (`*`), e.g. `websocket/*/frontend`. The subscribers of a concrete topic name are
+    resolved once and cached until the subscriptions change.
+
+    Topics that carry a complete state description can be declared as coalesced topics with
+    `coalesce_topic(..)`. Their messages are rate limited and if several messages arrive within
+    one window, only the latest one is delivered (latest value wins).
+
     Message structure:
     {
         "topic": "topic_name",
@@ -49,6 +88,26 @@ class Topics:
         "payload": "contents_of_the_message"
     }
     """
+    _clients = set()
+
+    # topic name -> set of clients subscribed to exactly that topic
+    _subscribers = {}
+    # topic pattern with wildcards -> set of clients subscribed to that pattern
+    _wildcard_subscribers = {}
+    # topic name -> tuple of all interested clients (exact and wildcard matches),
+    # only holds topics with subscribers and at most `_route_cache_size` of them
+    _route_cache = {}
+    _route_cache_size = 1024
+
+    # coalesced topic name -> minimum time between two deliveries in seconds
+    _coalesced_topics = {}
+    # (topic, ws_id) -> latest held back message or `None` if the window is open but empty
+    _pending_coalesced = {}
+    # number of messages that were replaced by a newer one before delivery
+    coalesced_count = 0
+    # deliveries of held back messages that wait for queue space
+    _delivery_tasks = set()
+
     def __init__(self):
         raise RuntimeWarning("Topics class is not supposed to be instantiated")
 
@@ -68,19 +127,79 @@ class Topics:
     @classmethod
     def register(cls, client):
         """
-        Registers a client (caller) for a topic.
-        The callback will be called every time the a new message is sent on that topic.
-        callbacks are ought to return quickly.
+        Makes a client known to the messaging system. A client only receives
+        messages for topics it subscribed to with `subscribe(..)`.
         """
         cls._clients.add(client)
 
     @classmethod
     def unregister(cls, client):
-        """ Removes the given callback from the topic. """
-        try:
-            cls._clients.remove(client)
-        except ValueError:
-            pass
+        """ Removes the client and all of its subscriptions. """
+        cls._clients.discard(client)
+        for subscriber_index in (cls._subscribers, cls._wildcard_subscribers):
+            for topic_name in list(subscriber_index.keys()):
+                subscriber_index[topic_name].discard(client)
+                if not subscriber_index[topic_name]:
+                    del subscriber_index[topic_name]
+        cls._route_cache.clear()
+
+    @classmethod
+    def subscribe(cls, topic_name, client):
+        """
+        Adds the client to the subscribers of a topic. `topic_name` may
+        contain `*` segments to subscribe to all matching topics.
+        """
+        cls._clients.add(client)
+        subscriber_index = cls._wildcard_subscribers if is_wildcard_topic(topic_name) else cls._subscribers
+        subscriber_index.setdefault(topic_name, set()).add(client)
+        cls._route_cache.clear()
+
+    @classmethod
+    def unsubscribe(cls, topic_name, client):
+        """ Removes the client from the subscribers of the given topic. """
+        subscriber_index = cls._wildcard_subscribers if is_wildcard_topic(topic_name) else cls._subscribers
+        subscribers = subscriber_index.get(topic_name, set())
+        subscribers.discard(client)
+        if not subscribers:
+            subscriber_index.pop(topic_name, None)
+        cls._route_cache.clear()
+
+    @classmethod
+    def get_subscribers(cls, topic_name):
+        """ Returns all clients that are interested in messages on the given topic. """
+        subscribers = cls._route_cache.get(topic_name, None)
+        if subscribers is None:
+            interested = set(cls._subscribers.get(topic_name, ()))
+            for pattern, clients in cls._wildcard_subscribers.items():
+                if topic_matches(pattern, topic_name):
+                    interested |= clients
+            subscribers = tuple(interested)
+            # topics nobody listens to are cheap to resolve and may be
+            # unbounded in number, e.g. per client topics
+            if subscribers:
+                if len(cls._route_cache) >= cls._route_cache_size:
+                    cls._route_cache.clear()
+                cls._route_cache[topic_name] = subscribers
+        return subscribers
+
+    @classmethod
+    def coalesce_topic(cls, topic_name, max_rate):
+        """
+        Declares that messages on `topic_name` always hold the complete state
+        and older messages are of no interest once a newer one exists. The
+        subscribers receive at most `max_rate` messages per second and
+        receiver (`ws_id`) on that topic. The first message after a quiet
+        period is delivered immediately, messages that arrive during the
+        following window are merged and only the latest one is delivered as
+        the window ends. Pass `None` as `max_rate` to deliver every message
+        again.
+        """
+        if max_rate is None:
+            cls._coalesced_topics.pop(topic_name, None)
+            for key in [k for k in cls._pending_coalesced.keys() if k[0] == topic_name]:
+                del cls._pending_coalesced[key]
+        else:
+            cls._coalesced_topics[topic_name] = 1 / max_rate
 
     @classmethod
     def send_message(cls, message):
@@ -88,5 +207,71 @@ class Topics:
         if not isinstance(message, BaseMessage):
             # TODO: Use logger instead of print
             print("!!! Message has wrong type:", type(message))
-        for client in cls._clients:
+        if message.topic in cls._coalesced_topics and cls._hold_back(message):
+            return
+        cls._deliver(message)
+
+    @classmethod
+    async def publish(cls, message):
+        """
+        Like `send_message(..)` but waits until every subscriber is able to
+        take the message. This applies backpressure to the sender if a
+        subscriber's message queue is full and uses the `block` overflow
+        policy.
+        """
+        if message.topic in cls._coalesced_topics and cls._hold_back(message):
+            return
+        await cls._deliver_when_space(message)
+
+    @classmethod
+    async def _deliver_when_space(cls, message):
+        subscribers = cls.get_subscribers(message.topic)
+        for client in subscribers:
+            await client.wait_for_queue_space()
+        for client in subscribers:
+            client.receive_message(message)
+
+    @classmethod
+    def _deliver(cls, message):
+        for client in cls.get_subscribers(message.topic):
             client.receive_message(message)
+
+    @classmethod
+    def _hold_back(cls, message):
+        """
+        Returns `True` if the message on a coalesced topic was held back to
+        be delivered at the end of the current window. Opens a new window and
+        returns `False` if the message should be delivered right away.
+        """
+        key = (message.topic, getattr(message, "ws_id", None))
+        if key in cls._pending_coalesced:
+            if cls._pending_coalesced[key] is not None:
+                cls.coalesced_count += 1
+            cls._pending_coalesced[key] = message
+            return True
+
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            # no event loop to schedule the end of the window, deliver directly
+            return False
+
+        cls._open_window(loop, key)
+        return False
+
+    @classmethod
+    def _open_window(cls, loop, key):
+        cls._pending_coalesced[key] = None
+        loop.call_later(cls._coalesced_topics.get(key[0], 0), cls._close_window, loop, key)
+
+    @classmethod
+    def _close_window(cls, loop, key):
+        message = cls._pending_coalesced.pop(key, None)
+        if message is None:
+            return
+        # held back messages wait for queue space like the ones sent with `publish(..)`
+        task = loop.create_task(cls._deliver_when_space(message))
+        cls._delivery_tasks.add(task)
+        task.add_done_callback(cls._delivery_tasks.discard)
+        # messages that arrive right after this delivery are rate limited as well
+        cls._open_window(loop, key)
@@ -11,9 +11,51 @@
 import asyncio
 import time
 import inspect
-from collections import deque
+from dataclasses import dataclass, asdict
 from .utility import create_logger, log_coroutine_exceptions
-from .communication import Topics
+from .clock import Clock
+from .communication import Topics, topic_matches, is_wildcard_topic
+from .message_queue import MessageQueue, PRIORITY_HIGH, PRIORITY_NORMAL, priority_names
+
+
+@dataclass
+class SpinMetrics:
+    """
+    Statistics about an EventComponent's spinning. All durations are given in
+    seconds.
+    - wakeups: number of times the waiting coroutine was resumed
+    - ticks: number of returns of `spin_once(rate)` and `spin_until(..)` at
+      their deadline
+    - callbacks: number of dispatched message callbacks
+    - callback_latency_*: time between enqueueing a message and dispatching
+      its callback
+    - drift_*: time between a tick's planned deadline (derived from `rate`
+      or the wakeup time given to `spin_until(..)`) and the moment the spin
+      method actually returned
+    """
+    wakeups: int = 0
+    ticks: int = 0
+    callbacks: int = 0
+    callback_latency_total: float = 0.0
+    callback_latency_max: float = 0.0
+    drift_total: float = 0.0
+    drift_max: float = 0.0
+
+    def record_callback(self, latency):
+        self.callbacks += 1
+        self.callback_latency_total += latency
+        self.callback_latency_max = max(self.callback_latency_max, latency)
+
+    def record_tick(self, drift):
+        self.ticks += 1
+        self.drift_total += drift
+        self.drift_max = max(self.drift_max, drift)
+
+    def asdict(self):
+        d = asdict(self)
+        d["callback_latency_mean"] = self.callback_latency_total / self.callbacks if self.callbacks else 0.0
+        d["drift_mean"] = self.drift_total / self.ticks if self.ticks else 0.0
+        return d
 
 
 class EventComponent:
@@ -29,8 +71,21 @@ class EventComponent:
         self._should_shutdown = False
         self._received_update_event = asyncio.Event()
         self._next_return_time = None
-        self._message_queue = deque()
+        self._deadline_time = None
+        self._deadline_handle = None
+        self._deadline_reached = False
+        self._wake_up_requested = False
+        self._spin_metrics = SpinMetrics()
+        self._message_queue = MessageQueue.from_settings(settings, on_overflow=self._message_queue_overflow)
         self._message_handlers = {}
+        # registered topic name (or pattern) -> priority of its messages
+        self._handler_priorities = {"will_shutdown": PRIORITY_HIGH}
+        # priorities from the settings have precedence over registered ones
+        self._configured_priorities = {
+            topic_name: priority_names[p.lower()]
+            for topic_name, p in settings.get("message_queue", {}).get("topic_priorities", {}).items()}
+        # concrete topic name -> registered topic name (or pattern) that handles it
+        self._handler_cache = {}
 
         Topics.register(self)
 
@@ -60,31 +115,45 @@ class EventComponent:
         plugin received a signal to shut down. `spin_once(..)` will not do any
         computations itself if all topic callbacks are asynchronous
         functions.
-        """
-        while True:
-            by_event = await self._event_wait(self._received_update_event, self._remaining_time(rate))
 
-            if not by_event:
-                return True
-
-            self._received_update_event.clear()
+        The periodic return is driven by a deadline that is registered with
+        `loop.call_at(..)`. The coroutine only wakes up if a message arrived,
+        the deadline was reached or the plugin should shut down.
+        """
+        loop = asyncio.get_running_loop()
+        self._schedule_deadline(loop, rate)
+        return await self._spin_until_deadline(loop)
 
-            if self._should_shutdown:
-                self.logger.info(f"--> plugin {__name__}.{self.__class__.__name__} exiting")
-                return False
+    async def spin_until(self, wakeup_time):
+        """
+        Handles messages until the unix timestamp `wakeup_time` (as given by
+        `Clock.time()`) is reached or `wake_up()` is called, whichever happens
+        first. With `wakeup_time`
+        set to `None`, only `wake_up()` makes it return. Returns `False` if
+        the plugin received a signal to shut down. Meant for components that
+        have work due at specific points in time instead of periodically.
+        Example usage:
+        ```
+        while await self.spin_until(self.next_job_time()):
+            if Clock.time() >= self.next_job_time():
+                self.run_next_job()
+        ```
+        """
+        loop = asyncio.get_running_loop()
+        self._cancel_deadline()
+        if wakeup_time is not None:
+            self._deadline_time = loop.time() + max(0.0, wakeup_time - Clock.time())
+            self._deadline_handle = loop.call_at(self._deadline_time, self._deadline_callback)
+        return await self._spin_until_deadline(loop)
 
-            # Execute callback, starting with longest waiting message
-            while self._message_queue:
-                msg = self._message_queue.popleft()
-                callback = self._message_handlers[msg.topic]
-                if inspect.iscoroutinefunction(callback):
-                    # launch asynchronously and return immediately
-                    asyncio.create_task(
-                        log_coroutine_exceptions(callback(msg), self.logger))
-                else:
-                    # for quick tasks, a synchronous callback is fine
-                    # self.logger.warning("Using synchronous callback function.")
-                    callback(msg)
+    def wake_up(self):
+        """
+        Makes the current (or next) call to `spin_until(..)` or `spin_once(..)`
+        return early, e.g. because a callback changed the time at which the
+        component has to do its next job.
+        """
+        self._wake_up_requested = True
+        self._received_update_event.set()
 
     async def spin(self):
         """
@@ -93,13 +162,14 @@ class EventComponent:
         as it enables the plugin to handle messages with its defined
         callbacks.
         """
-        await self.spin_once(None)
+        while await self.spin_once(None):
+            pass  # woken up by `wake_up()`, nothing to do here
 
     # TODO: while_system_active condition for graceful shutdown: https://docs.python.org/3.8/library/signal.html
 
     # === Messaging ===
 
-    def register_topic_callback(self, topic_name, callback):
+    def register_topic_callback(self, topic_name, callback, priority=None):
         """
         Registers a callback function that will be called once the plugin
         receives a message on the given topic. `callback` may be a
@@ -109,8 +179,18 @@ class EventComponent:
         - websocket/<plugin_name>/backend : message from a frontend client to the backend
         - websocket/<plugin_name>/frontend : message from a backend client to the frontend
         - will_shutdown : called before the server shuts down
+        `topic_name` may contain `*` segments to receive messages from all
+        matching topics, e.g. `websocket/*/frontend`. Handlers for the exact
+        topic name take precedence over wildcard handlers.
+        `priority` selects the lane of the message queue in which messages
+        of this topic wait for their callback (`PRIORITY_HIGH`,
+        `PRIORITY_NORMAL` or `PRIORITY_LOW` from `framework.message_queue`).
         """
         self._message_handlers[topic_name] = callback
+        if priority is not None:
+            self._handler_priorities[topic_name] = priority
+        self._handler_cache.clear()
+        Topics.subscribe(topic_name, self)
 
     def receive_message(self, msg):
         """
@@ -118,22 +198,116 @@ class EventComponent:
         into the plugin's message buffer. **Don't** call this method directly
         but send a message to a subscribed topic using the Topic maintainer.
         """
-        if msg.topic in self._message_handlers.keys():
-            self._message_queue.append(msg)
+        handler_topic = self._get_handler_topic(msg.topic)
+        if handler_topic is None:
+            return
+        priority = self._configured_priorities.get(
+            msg.topic, self._handler_priorities.get(handler_topic, PRIORITY_NORMAL))
+        if self._message_queue.put(msg, priority):
             self._received_update_event.set()
 
+    async def wait_for_queue_space(self):
+        """
+        Returns once the message queue can take another message. Only waits
+        if the queue's overflow policy is `block`.
+        """
+        await self._message_queue.wait_for_space()
+
     def shutdown(self):
         """ Will stop the plugin's event loop. """
         self._should_shutdown = True
         self._received_update_event.set()
 
+    def get_spin_metrics(self):
+        """ Returns a dict with the statistics collected while spinning. """
+        return self._spin_metrics.asdict()
+
+    def get_queue_stats(self):
+        """ Returns a dict with the message queue's current length and overflow counters. """
+        return {"length": len(self._message_queue), **self._message_queue.stats}
+
     # === Private Methods ===
     # === --------------- ===
 
-    def _remaining_time(self, rate):
+    def _get_handler_topic(self, topic_name):
+        """ Returns the registered topic name or pattern whose callback handles `topic_name`. """
+        if topic_name in self._handler_cache:
+            return self._handler_cache[topic_name]
+        handler_topic = None
+        if topic_name in self._message_handlers:
+            handler_topic = topic_name
+        else:
+            for pattern in self._message_handlers.keys():
+                if is_wildcard_topic(pattern) and topic_matches(pattern, topic_name):
+                    handler_topic = pattern
+                    break
+        self._handler_cache[topic_name] = handler_topic
+        return handler_topic
+
+    def _get_message_handler(self, topic_name):
+        handler_topic = self._get_handler_topic(topic_name)
+        return self._message_handlers[handler_topic] if handler_topic is not None else None
+
+    def _message_queue_overflow(self, reason, msg):
+        overflow_count = self._message_queue.stats[reason]
+        # log the first occurrence and then only every 100th to not flood the log
+        if overflow_count % 100 == 1:
+            self.logger.warning(
+                f"Message queue full ({self._message_queue.max_length} messages, "
+                f"policy: {self._message_queue.overflow_policy}), {reason} message on topic "
+                f"{msg.topic}. Total {reason}: {overflow_count}")
+
+    def _dispatch_messages(self):
+        # Execute callback, starting with longest waiting message
+        while self._message_queue:
+            enqueue_time, msg = self._message_queue.pop()
+            callback = self._get_message_handler(msg.topic)
+            self._spin_metrics.record_callback(time.monotonic() - enqueue_time)
+            if inspect.iscoroutinefunction(callback):
+                # launch asynchronously and return immediately
+                asyncio.create_task(
+                    log_coroutine_exceptions(callback(msg), self.logger))
+            else:
+                # for quick tasks, a synchronous callback is fine
+                # self.logger.warning("Using synchronous callback function.")
+                callback(msg)
+
+    async def _spin_until_deadline(self, loop):
+        """ Dispatches messages until the registered deadline, a wake up request or the shutdown. """
+        while True:
+            await self._received_update_event.wait()
+            self._received_update_event.clear()
+            self._spin_metrics.wakeups += 1
+
+            if self._should_shutdown:
+                self._cancel_deadline()
+                self.logger.info(f"--> plugin {__name__}.{self.__class__.__name__} exiting")
+                return False
+
+            self._dispatch_messages()
+
+            if self._deadline_reached:
+                self._deadline_reached = False
+                self._wake_up_requested = False
+                self._spin_metrics.record_tick(loop.time() - self._deadline_time)
+                return True
+
+            if self._wake_up_requested:
+                self._wake_up_requested = False
+                self._cancel_deadline()
+                return True
+
+    def _schedule_deadline(self, loop, rate):
+        """
+        Registers the time at which `spin_once(rate)` should return next.
+        The first call returns immediately. If the previous deadline was
+        missed by more than one period, the schedule restarts from now
+        instead of trying to catch up.
+        """
+        self._cancel_deadline()
         if rate is None:
-            return None
-        t = time.time()
+            return
+        t = loop.time()
 
         if self._next_return_time is None:
             self._next_return_time = t
@@ -141,12 +315,15 @@ class EventComponent:
         if t > self._next_return_time:
             self._next_return_time = max(self._next_return_time + 1/rate, t)
 
-        return self._next_return_time - t
+        self._deadline_time = self._next_return_time
+        self._deadline_handle = loop.call_at(self._deadline_time, self._deadline_callback)
+
+    def _cancel_deadline(self):
+        if self._deadline_handle is not None:
+            self._deadline_handle.cancel()
+            self._deadline_handle = None
 
-    async def _event_wait(self, evt, timeout):
-        # wait for: ( event_triggered  or  time_up )
-        try:
-            await asyncio.wait_for(evt.wait(), timeout)
-        except asyncio.TimeoutError:
-            pass
-        return evt.is_set()
+    def _deadline_callback(self):
+        self._deadline_handle = None
+        self._deadline_reached = True
+        self._received_update_event.set()
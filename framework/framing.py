@@ -0,0 +1,113 @@
+#
+# framing.py
+# backyardbot
+#
+# Created: October 2026
+#
+
+import json
+import struct
+
+try:
+    import msgpack
+except ImportError:
+    # compact framing isn't offered, all clients use json
+    msgpack = None
+
+
+JSON_PROTOCOL = "byb.json"
+MSGPACK_PROTOCOL = "byb.msgpack"
+
+# Frame types of the MessagePack framing. A frame is an array that starts
+# with its type, the plugin is given by its index in the plugin dictionary.
+FRAME_MESSAGE = 0       # [0, plugin, payload]
+FRAME_SNAPSHOT = 1      # [1, plugin, payload, state version, server time]
+FRAME_PATCH = 2         # [2, plugin, command, base version, version, ops, server time]
+FRAME_DICTIONARY = 3    # [3, [plugin names]], first frame after connecting
+FRAME_SYNC_REQUEST = 4  # [4, plugin, command]
+FRAME_BATCH = 5         # [5, [frames]], several frames sent as one message
+
+
+class JsonFraming:
+    """ Frames are the json encoded dicts that the server works with. Sent as text messages. """
+    protocol = JSON_PROTOCOL
+
+    def encode(self, frame):
+        return json.dumps(frame)
+
+    def decode(self, data):
+        return json.loads(data)
+
+    def encode_batch(self, encoded_frames):
+        """ Joins already encoded frames into a json array. """
+        return "[" + ",".join(encoded_frames) + "]"
+
+    def dictionary_frame(self):
+        return None
+
+
+class MsgpackFraming:
+    """
+    Frames are MessagePack encoded arrays that are sent as binary messages.
+    Plugin names are replaced by their index in a dictionary that the server
+    sends to each client once after connecting. Names that aren't in the
+    dictionary are sent as strings.
+    """
+    protocol = MSGPACK_PROTOCOL
+
+    def __init__(self, plugin_names):
+        self.plugin_names = list(plugin_names)
+        self._plugin_ids = {name: i for i, name in enumerate(self.plugin_names)}
+
+    def encode(self, frame):
+        plugin = self._plugin_ids.get(frame["plugin_name"], frame["plugin_name"])
+        if "state_patch" in frame:
+            patch = frame["state_patch"]
+            array = [FRAME_PATCH, plugin, patch["command"], patch["base_version"], patch["version"], patch["ops"]]
+        elif "state_version" in frame:
+            array = [FRAME_SNAPSHOT, plugin, frame["payload"], frame["state_version"]]
+        else:
+            array = [FRAME_MESSAGE, plugin, frame["payload"]]
+        if "server_time" in frame:
+            array.append(frame["server_time"])
+        return msgpack.packb(array, use_bin_type=True)
+
+    def decode(self, data):
+        """ Turns a frame from a client back into the dict layout of json frames. """
+        array = msgpack.unpackb(data, raw=False)
+        frame_type, plugin = array[0], array[1]
+        plugin_name = self.plugin_names[plugin] if isinstance(plugin, int) else plugin
+        if frame_type == FRAME_SYNC_REQUEST:
+            return {"plugin_name": plugin_name, "sync_request": array[2]}
+        if frame_type == FRAME_MESSAGE:
+            return {"plugin_name": plugin_name, "payload": array[2]}
+        raise ValueError(f"Unexpected frame type from client: {frame_type}")
+
+    def encode_batch(self, encoded_frames):
+        """ Wraps already encoded frames into a batch frame without encoding them again. """
+        count = len(encoded_frames)
+        if count < 16:
+            array_header = struct.pack(">B", 0x90 | count)
+        elif count < 0x10000:
+            array_header = struct.pack(">BH", 0xdc, count)
+        else:
+            array_header = struct.pack(">BI", 0xdd, count)
+        # fixarray with two elements, the frame type and the array of frames
+        return bytes((0x92, FRAME_BATCH)) + array_header + b"".join(encoded_frames)
+
+    def dictionary_frame(self):
+        return msgpack.packb([FRAME_DICTIONARY, self.plugin_names], use_bin_type=True)
+
+
+def create_framings(plugin_names, server_settings):
+    """
+    Returns the framings that the server offers, ordered by preference and
+    keyed by their websocket subprotocol name. MessagePack is offered if the
+    `msgpack` package is installed and `"ws_compact_framing"` isn't disabled
+    in the server settings. Json is always available as a fallback.
+    """
+    framings = {}
+    if msgpack is not None and server_settings.get("ws_compact_framing", True):
+        framings[MSGPACK_PROTOCOL] = MsgpackFraming(plugin_names)
+    framings[JSON_PROTOCOL] = JsonFraming()
+    return framings
@@ -9,12 +9,21 @@
 
 import os
 import json
+import time
 import asyncio
+import contextlib
 from aiohttp import web
 from .renderer import Renderer
 from .utility import create_logger, log_coroutine_exceptions
-from .communication import Topics, WebsocketRequest
+from .communication import Topics, BaseMessage, WebsocketRequest, StateUpdate
 from .event import EventComponent
+from .message_queue import PRIORITY_LOW
+from .ws_client import WebsocketClient, ClientRegistry, PluginTraffic
+from .static_files import StaticFileCache
+from .memory import Database
+from .clock import Clock
+from .state_sync import StateSync
+from .framing import create_framings, JSON_PROTOCOL
 
 
 def load_allowed_files(settings: dict):
@@ -40,7 +49,15 @@ class Server(EventComponent):
         # TODO: Store global settings somewhere else?
         self.settings = settings
 
-        self.ws_clients = set()
+        self.ws_clients = ClientRegistry()
+        self.state_sync = StateSync()
+        # websocket traffic of all clients, including the ones that disconnected. Recorded by
+        # the clients, so only messages that were sent successfully are counted.
+        self.plugin_traffic = PluginTraffic()
+        # ws_id -> list of (encoded frame, byte count, plugin name) that are sent together at the end of the tick
+        self._batch_frames = self.settings.get("server", {}).get("ws_batch_frames", True)
+        self._pending_frames = {}
+        self._flush_handle = None
 
         logger_name = __name__ + "." + self.__class__.__name__
         self.logger = create_logger(logger_name)
@@ -53,16 +70,26 @@ class Server(EventComponent):
             plugin.set_localization_data(self.settings)
             self.allowed_files += plugin.css_files() + plugin.js_files()
 
-            topic = f"websocket/{plugin.name}/frontend"
-            self.register_topic_callback(topic, self.send_topic_over_ws)
+        # websocket subprotocol name -> framing, ordered by preference
+        self.framings = create_framings([p.name for p in self.plugins_list], self.settings.get("server", {}))
+
+        # UI updates may wait for more important messages
+        self.register_topic_callback("websocket/*/frontend", self.send_topic_over_ws, priority=PRIORITY_LOW)
 
         html_template_file = get_html_template_file(self.settings)
-        self.renderer = Renderer(plugin_manager, html_template_file, self.allowed_files)
+        reload_templates = self.settings.get("application", {}).get("reload_templates", False)
+        self.static_files = StaticFileCache(self.allowed_files, reload_on_change=reload_templates)
+        self.renderer = Renderer(plugin_manager, html_template_file, self.allowed_files, reload_templates,
+                                 static_url=self.static_files.url_for)
 
         app = web.Application()
         app.add_routes(
             [
                 web.get("/", self.handle),
+                web.get("/admin/clients", self.handle_admin_clients),
+                web.get("/admin/traffic", self.handle_admin_traffic),
+                web.get("/admin/database", self.handle_admin_database),
+                web.get("/admin/plugins", self.handle_admin_plugins),
                 web.get("/{folder}/{plugin_name}/{filename}", self.handle_files),
                 web.get("/{folder}/{filename}", self.handle_files),
                 web.get("/ws", self.handle_ws),
@@ -97,96 +124,239 @@ class Server(EventComponent):
         if filepath not in self.allowed_files:
             raise web.HTTPNotFound()
 
-        abs_path = os.path.realpath(filepath)
-        # TODO: Does web.FileResponse do caching?
-        return web.FileResponse(abs_path)
+        return self.static_files.response_for(filepath, request)
 
     async def handle_ws(self, request):
         self.logger.info(f"ws request: {request}")
-        ws = web.WebSocketResponse()
-        self.ws_clients.add(ws)
+        # aiohttp picks the first protocol offered by the client that is in this list
+        server_settings = self.settings.get("server", {})
+        ws = web.WebSocketResponse(protocols=tuple(self.framings), compress=server_settings.get("ws_compression", True))
         await ws.prepare(request)
+        framing = self.framings.get(ws.ws_protocol, self.framings[JSON_PROTOCOL])
+        client = WebsocketClient.from_settings(
+            ws, self.ws_clients.next_id(), self.logger, server_settings,
+            on_evict=self.ws_clients.remove, framing=framing, total_traffic=self.plugin_traffic)
+        client.start()
+        self.ws_clients.add(client)
+
+        dictionary_frame = framing.dictionary_frame()
+        if dictionary_frame is not None:
+            client.send_str(dictionary_frame)
 
         topic = "websocket/new_client"
-        message = WebsocketRequest(topic, ws_id=id(ws))
+        message = WebsocketRequest(topic, ws_id=client.ws_id)
         Topics.send_message(message)
 
         async for msg in ws:
             if msg.type == web.WSMsgType.TEXT:
-                try:
-                    data_dict = json.loads(msg.data)
-                except Exception as e:
-                    self.logger.info(f"error {e} parsing message: {msg}")
-                    continue
-
-                try:
-                    plugin_name = data_dict["plugin_name"]
-                    payload = data_dict["payload"]
-                except KeyError:
-                    self.logger.info(f"Keys plugin_name or payload not present in {data_dict}")
-                    continue
-
-                # debug code, send message to arbitrary receivers.
-                if plugin_name == "debug":
-                    message_destination = data_dict["message_destination"]
-                    receiving_plugin = data_dict["receiving_plugin"]
-                    if message_destination == "to_client":
-                        m = WebsocketRequest(f"websocket/{receiving_plugin}/frontend", payload)
-                        await self.send_topic_over_ws(m)
-                        continue
-                    elif message_destination == "to_server":
-                        plugin_name = receiving_plugin
-                    else:
-                        raise Exception("no such destination:", message_destination)
-                # end debug code
-
-                topic = f"websocket/{plugin_name}/backend"
-                message = WebsocketRequest(topic, payload=payload, ws_id=id(ws))
-                Topics.send_message(message)
+                await self._handle_client_frame(client, self.framings[JSON_PROTOCOL], msg.data, len(msg.data.encode()))
 
             elif msg.type == web.WSMsgType.BINARY:
-                self.logger.info("Not going to handle binary data.")
-                continue
+                await self._handle_client_frame(client, framing, msg.data, len(msg.data))
 
             elif msg.type == web.WSMsgType.CLOSE:
                 break
 
-        self.ws_clients.remove(ws)
+        client.stop()
+        self.ws_clients.remove(client)
         self.logger.info("removed ws client")
         return ws
 
+    async def _handle_client_frame(self, client, framing, data, byte_count):
+        try:
+            data_dict = framing.decode(data)
+        except Exception as e:
+            client.record_received(byte_count)
+            self.logger.info(f"error {e} parsing message: {data}")
+            return
+
+        plugin_name = data_dict.get("plugin_name", None)
+        client.record_received(byte_count, plugin_name)
+
+        if "sync_request" in data_dict:
+            # the client missed a state version and needs the full state
+            self._send_state_snapshot(data_dict.get("plugin_name", None), data_dict["sync_request"], client.ws_id)
+            return
+
+        try:
+            plugin_name = data_dict["plugin_name"]
+            payload = data_dict["payload"]
+        except KeyError:
+            self.logger.info(f"Keys plugin_name or payload not present in {data_dict}")
+            return
+
+        # debug code, send message to arbitrary receivers.
+        if plugin_name == "debug":
+            message_destination = data_dict["message_destination"]
+            receiving_plugin = data_dict["receiving_plugin"]
+            if message_destination == "to_client":
+                m = WebsocketRequest(f"websocket/{receiving_plugin}/frontend", payload)
+                await self.send_topic_over_ws(m)
+                return
+            elif message_destination == "to_server":
+                plugin_name = receiving_plugin
+            else:
+                raise Exception("no such destination:", message_destination)
+        # end debug code
+
+        topic = f"websocket/{plugin_name}/backend"
+        message = WebsocketRequest(topic, payload=payload, ws_id=client.ws_id)
+        # Stops reading from this websocket while the plugin is busy.
+        await Topics.publish(message)
+
+    async def handle_admin_clients(self, request):
+        """ Lists the connected websocket clients and their traffic statistics. """
+        return web.json_response({"clients": self.ws_clients.get_info()})
+
+    async def handle_admin_traffic(self, request):
+        """ Returns the websocket traffic per plugin and client, the same as on the stats topic. """
+        return web.json_response(self.get_traffic_stats())
+
+    async def handle_admin_database(self, request):
+        """ Returns the database's read, write and fsync counters and latency histograms. """
+        return web.json_response(Database.get_stats())
+
+    async def handle_admin_plugins(self, request):
+        """ Returns the statistics of every plugin, see `Plugin.get_stats()`. """
+        return web.json_response({plugin.name: plugin.get_stats() for plugin in self.plugins_list})
+
+    async def event_loop(self):
+        """ Publishes the websocket traffic statistics periodically, see `get_traffic_stats()`. """
+        interval = self.settings.get("server", {}).get("ws_stats_interval", 60)
+        if not interval:
+            await self.spin()
+            return
+        while await self.spin_once(1 / interval):
+            Topics.send_message(BaseMessage("server/traffic_stats", self.get_traffic_stats()))
+
+    def get_traffic_stats(self):
+        """
+        Returns the number of messages and bytes that were exchanged with the
+        frontends, in total for every plugin and for every connected client
+        split up by plugin. Only messages that were sent successfully are
+        counted, the totals include clients that disconnected. Bytes are
+        counted before compression. Also includes the number of state frames
+        that were sent as patches and snapshots and the number of messages on
+        coalesced topics that were replaced before their delivery.
+        """
+        return {
+            "time": time.time(),
+            "plugins": self.plugin_traffic.asdict(),
+            "clients": self.ws_clients.get_info(),
+            "state_sync": self.state_sync.get_stats(),
+            "coalesced_messages": Topics.coalesced_count
+        }
+
     async def start_background_tasks(self, app):
         app["server_msg_loop"] = asyncio.create_task(log_coroutine_exceptions(self.event_loop(), self.logger))
+        app["db_flush"] = asyncio.create_task(log_coroutine_exceptions(Database.flush_periodically(), self.logger))
 
         for plugin in self.plugins_list:
             app[plugin.name] = asyncio.create_task(log_coroutine_exceptions(plugin.event_loop(), plugin.logger))
 
     async def cleanup_background_tasks(self, app):
-        app["server_msg_loop"].cancel()
-        await app["server_msg_loop"]
-
-        for plugin in self.plugins_list:
-            app[plugin.name].cancel()
-            await app[plugin.name]
+        # awaiting a cancelled task raises CancelledError, which would skip the remaining tasks
+        tasks = [app["server_msg_loop"]] + [app[plugin.name] for plugin in self.plugins_list]
+        for task in tasks:
+            task.cancel()
+        for task in tasks:
+            with contextlib.suppress(asyncio.CancelledError):
+                await task
+
+        # the database is flushed last, so it contains the plugins' final modifications
+        app["db_flush"].cancel()
+        with contextlib.suppress(asyncio.CancelledError):
+            await app["db_flush"]
+        Database.flush()
 
     # === Messaging with Frontend ===
 
     async def send_topic_over_ws(self, message):
         # assumes topic format "websocket/<plugin_name>/frontend"
         plugin_name = message.topic.split("/")[1]
-        data = message.payload
+        if isinstance(message, StateUpdate):
+            self._send_state_update(plugin_name, message)
+            return
+
         # Converts message to format that is sent over ws. Could be beautified.
-        json_str = json.dumps({
+        self._send_frame({
             "plugin_name": plugin_name,
-            "payload": data
-        })
+            "payload": message.payload
+        }, message.ws_id)
 
+    def _send_state_update(self, plugin_name, message):
+        command = message.payload["command"]
+        frame = self.state_sync.update(plugin_name, command, message.payload["payload"])
         if message.ws_id == -1:
-            for ws in self.ws_clients:
-                # TODO: ws has a send_json method. Try that.
-                await ws.send_str(json_str)
+            if frame is not None:
+                self._send_state_frame(frame)
+            return
+        # the state changed with a message for a single client, the others need the change as well
+        if frame is not None:
+            self._send_state_frame(frame, exclude_ws_id=message.ws_id)
+        self._send_state_snapshot(plugin_name, command, message.ws_id)
+
+    def _send_state_snapshot(self, plugin_name, command, ws_id):
+        frame = self.state_sync.snapshot_frame(plugin_name, command)
+        if frame is not None:
+            self._send_state_frame(frame, ws_id)
+
+    def _send_state_frame(self, frame, ws_id=-1, exclude_ws_id=None):
+        # The server's clock lets the frontends count down to deadlines in the
+        # state. It's part of the frame instead of the state, which would
+        # otherwise change with every message.
+        frame["server_time"] = Clock.time()
+        self._send_frame(frame, ws_id, exclude_ws_id)
+
+    def _send_frame(self, frame, ws_id=-1, exclude_ws_id=None):
+        # Each frame is encoded once per framing that is in use and the
+        # encoded message is shared by all clients with that framing.
+        encoded = {}
+
+        def encode_for(client):
+            framing = client.framing
+            if framing.protocol not in encoded:
+                data = framing.encode(frame)
+                encoded[framing.protocol] = (data, len(data) if isinstance(data, bytes) else len(data.encode()))
+            return encoded[framing.protocol]
+
+        def send_to(client):
+            data, byte_count = encode_for(client)
+            if self._batch_frames:
+                self._pending_frames.setdefault(client.ws_id, []).append((data, byte_count, plugin_name))
+            else:
+                client.send_str(data, byte_count, plugin_name)
+
+        # Clients buffer the message and send it on their own, so a slow
+        # client doesn't delay the others.
+        plugin_name = frame["plugin_name"]
+        if ws_id == -1:
+            for client in self.ws_clients:
+                if client.ws_id != exclude_ws_id:
+                    send_to(client)
         else:
-            ws_id_dict = {id(ws): ws for ws in self.ws_clients}
-            if message.ws_id in ws_id_dict.keys():
-                await ws_id_dict[message.ws_id].send_str(json_str)
-
+            client = self.ws_clients.get(ws_id)
+            if client is not None:
+                send_to(client)
+
+        if self._pending_frames and self._flush_handle is None:
+            self._flush_handle = asyncio.get_running_loop().call_soon(self._flush_pending_frames)
+
+    def _flush_pending_frames(self):
+        """
+        Sends the frames that were produced for each client during the last
+        iteration of the event loop as a single websocket message, e.g. the
+        answers of all plugins to a new client. Frames keep their order and
+        single frames are sent as they are.
+        """
+        self._flush_handle = None
+        pending_frames, self._pending_frames = self._pending_frames, {}
+        for ws_id, frames in pending_frames.items():
+            client = self.ws_clients.get(ws_id)
+            if client is None:
+                continue
+            if len(frames) == 1:
+                client.send_str(*frames[0])
+            else:
+                data = client.framing.encode_batch([data for data, _, _ in frames])
+                client.send_batch(data, [(plugin_name, byte_count) for _, byte_count, plugin_name in frames])
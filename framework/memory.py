@@ -7,23 +7,378 @@
 # montebaur.tech, github.com/montioo
 #
 
+import os
+import json
+import time
+import asyncio
+import functools
+import threading
+from dataclasses import dataclass, field
+from typing import Dict, List
+from concurrent.futures import ThreadPoolExecutor
 from tinydb import TinyDB
+from tinydb.table import Table
+from tinydb.storages import Storage
+from .communication import Topics, BaseMessage
+
+
+@dataclass
+class TableUpdatePayload:
+    """ Payload of the messages on `database_update/<table_name>`. """
+    table: str
+    inserted: Dict[int, dict] = field(default_factory=dict)  # doc id -> document
+    updated: Dict[int, dict] = field(default_factory=dict)   # doc id -> document after the update
+    removed: List[int] = field(default_factory=list)         # doc ids
+
+    def changed_doc_ids(self):
+        return set(self.inserted.keys()) | set(self.updated.keys()) | set(self.removed)
+
+
+class StorageStats:
+    """
+    Counts read, write and fsync operations of a storage. Besides the totals,
+    the counts of the last complete minute are kept to be able to monitor
+    the wear of SD cards.
+    """
+    counters = ("reads", "writes", "flushes", "fsyncs")
+
+    def __init__(self):
+        self.totals = {c: 0 for c in self.counters}
+        self._current_minute = int(time.time() // 60)
+        self._current = {c: 0 for c in self.counters}
+        self._last_minute = {c: 0 for c in self.counters}
+
+    def count(self, counter, n=1):
+        minute = int(time.time() // 60)
+        if minute != self._current_minute:
+            # counts of the previous minute are only valid if it directly precedes the current one
+            self._last_minute = self._current if minute == self._current_minute + 1 else {c: 0 for c in self.counters}
+            self._current = {c: 0 for c in self.counters}
+            self._current_minute = minute
+        self.totals[counter] += n
+        self._current[counter] += n
+
+    def asdict(self):
+        self.count("reads", 0)  # rolls the minute buckets over if necessary
+        return {"total": dict(self.totals), "last_minute": dict(self._last_minute)}
+
+
+class WriteBehindStorage(Storage):
+    """
+    TinyDB storage that keeps the whole database in memory. Reads never
+    touch the file and writes only mark the data as modified. The data is
+    written to disk once `flush()` is called, which the Database does
+    periodically and on shutdown.
+
+    Flushing is crash-safe: the data is written to a temporary file which is
+    synced to disk and then atomically renamed to replace the old file. An
+    interrupted flush leaves the previous version of the database intact.
+
+    Tables modify the data in place, so `lock` has to be the lock that the
+    table operations hold. The data is serialized while holding it, writing
+    the file happens without blocking table operations.
+    """
+
+    def __init__(self, path, lock=None, **kwargs):
+        super().__init__()
+        self.path = path
+        self.kwargs = kwargs
+        self.stats = StorageStats()
+        self._lock = lock if lock is not None else threading.RLock()
+        self._dirty = False
+
+        self._data = None
+        if os.path.exists(path) and os.path.getsize(path) > 0:
+            with open(path) as f:
+                self._data = json.load(f)
+
+    def read(self):
+        self.stats.count("reads")
+        return self._data
+
+    def write(self, data):
+        self.stats.count("writes")
+        self._data = data
+        self._dirty = True
+
+    def is_dirty(self):
+        return self._dirty
+
+    def flush(self):
+        """ Writes the data to disk if it was modified since the last flush. """
+        with self._lock:
+            if not self._dirty:
+                return
+            serialized = json.dumps(self._data, **self.kwargs)
+            self._dirty = False
+        tmp_path = self.path + ".tmp"
+        try:
+            with open(tmp_path, "w") as f:
+                f.write(serialized)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp_path, self.path)
+        except OSError:
+            with self._lock:
+                self._dirty = True
+            raise
+        self.stats.count("flushes")
+        self.stats.count("fsyncs", 2 if self._fsync_directory() else 1)
+
+    def close(self):
+        self.flush()
+
+    def _fsync_directory(self):
+        """ Makes the rename itself persistent. Returns whether the directory was synced. """
+        try:
+            dir_fd = os.open(os.path.dirname(os.path.abspath(self.path)), os.O_RDONLY)
+        except OSError:
+            return False
+        try:
+            os.fsync(dir_fd)
+            return True
+        except OSError:
+            return False
+        finally:
+            os.close(dir_fd)
+
+
+class ObservedTable(Table):
+    """
+    TinyDB table that reports every modification to the Database's change
+    feed. On the event loop's thread, the change is only collected if the
+    table's update topic has subscribers.
+    """
+
+    def insert(self, document):
+        doc_id = super().insert(document)
+        if Database.has_update_subscribers(self.name):
+            Database.publish_table_update(TableUpdatePayload(self.name, inserted={doc_id: dict(document)}))
+        return doc_id
+
+    def insert_multiple(self, documents):
+        documents = list(documents)
+        doc_ids = super().insert_multiple(documents)
+        if Database.has_update_subscribers(self.name):
+            inserted = {doc_id: dict(doc) for doc_id, doc in zip(doc_ids, documents)}
+            Database.publish_table_update(TableUpdatePayload(self.name, inserted=inserted))
+        return doc_ids
+
+    def update(self, fields, cond=None, doc_ids=None):
+        updated_ids = super().update(fields, cond, doc_ids)
+        self._publish_updated(updated_ids)
+        return updated_ids
+
+    def update_multiple(self, updates):
+        updated_ids = super().update_multiple(updates)
+        self._publish_updated(updated_ids)
+        return updated_ids
+
+    def remove(self, cond=None, doc_ids=None):
+        removed_ids = super().remove(cond, doc_ids)
+        if removed_ids and Database.has_update_subscribers(self.name):
+            Database.publish_table_update(TableUpdatePayload(self.name, removed=list(removed_ids)))
+        return removed_ids
+
+    def truncate(self):
+        removed_ids = None
+        if Database.has_update_subscribers(self.name):
+            removed_ids = [doc.doc_id for doc in self.all()]
+        super().truncate()
+        if removed_ids:
+            Database.publish_table_update(TableUpdatePayload(self.name, removed=removed_ids))
+
+    def _publish_updated(self, updated_ids):
+        if not updated_ids or not Database.has_update_subscribers(self.name):
+            return
+        updated = {doc.doc_id: dict(doc) for doc in self.get(doc_ids=list(updated_ids))}
+        Database.publish_table_update(TableUpdatePayload(self.name, updated=updated))
+
+
+class LatencyHistogram:
+    """ Histogram of durations with logarithmic buckets. Durations are given in seconds. """
+    bucket_bounds = (0.0001, 0.001, 0.01, 0.1, 1.0)
+    bucket_names = ("<0.1ms", "<1ms", "<10ms", "<100ms", "<1s", ">=1s")
+
+    def __init__(self):
+        self.counts = [0] * len(self.bucket_names)
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def record(self, duration):
+        bucket = len(self.bucket_bounds)
+        for i, bound in enumerate(self.bucket_bounds):
+            if duration < bound:
+                bucket = i
+                break
+        self.counts[bucket] += 1
+        self.count += 1
+        self.total += duration
+        self.max = max(self.max, duration)
+
+    def asdict(self):
+        return {
+            "buckets": dict(zip(self.bucket_names, self.counts)),
+            "count": self.count,
+            "mean": self.total / self.count if self.count else 0.0,
+            "max": self.max
+        }
+
+
+class TimedTable:
+    """
+    Wraps a TinyDB table and records how long each call blocks the caller.
+    Used for the synchronous table access, where every call stalls the event
+    loop for the recorded duration. Calls hold `lock`, so they don't run
+    concurrently with operations on the worker thread.
+    """
+
+    def __init__(self, table, histogram, lock):
+        self._table = table
+        self._histogram = histogram
+        self._lock = lock
+
+    def __getattr__(self, name):
+        attr = getattr(self._table, name)
+        if not callable(attr):
+            return attr
+
+        @functools.wraps(attr)
+        def timed_call(*args, **kwargs):
+            t = time.perf_counter()
+            try:
+                with self._lock:
+                    return attr(*args, **kwargs)
+            finally:
+                self._histogram.record(time.perf_counter() - t)
+        return timed_call
+
+    def __len__(self):
+        with self._lock:
+            return len(self._table)
+
+    def __iter__(self):
+        with self._lock:
+            return iter(list(self._table))
+
+
+class AsyncTable:
+    """
+    Awaitable interface to a TinyDB table. All operations are executed on the
+    database's single worker thread, so they don't block the event loop. They
+    hold the database's lock like the synchronous tables and flushes do.
+    """
+
+    def __init__(self, table):
+        self._table = table
+
+    async def all(self):
+        return await Database.run(self._table.all)
+
+    async def search(self, cond):
+        return await Database.run(self._table.search, cond)
+
+    async def get(self, cond=None, doc_id=None):
+        return await Database.run(self._table.get, cond, doc_id)
+
+    async def insert(self, document):
+        return await Database.run(self._table.insert, document)
+
+    async def insert_multiple(self, documents):
+        return await Database.run(self._table.insert_multiple, list(documents))
+
+    async def update(self, fields, cond=None, doc_ids=None):
+        return await Database.run(self._table.update, fields, cond, doc_ids)
+
+    async def remove(self, cond=None, doc_ids=None):
+        return await Database.run(self._table.remove, cond, doc_ids)
+
+    async def truncate(self):
+        return await Database.run(self._table.truncate)
 
 
 class Database:
     """
     Serves as storage for data that might change often as well as data that is mostly
     consistent, compiled by one entity and nontheless of interest for other entities.
+
+    With `write_behind` enabled, the database is held in memory and modifications are
+    written to disk every `flush_interval` seconds and on shutdown (see `WriteBehindStorage`).
+    Otherwise, every modification rewrites the database file immediately.
+
+    Tables are available with a synchronous interface (`get_db_for(..)`) which is meant
+    for setup code and with an awaitable one (`get_async_db_for(..)`) which runs all
+    operations on a dedicated worker thread. The time the synchronous calls block the
+    event loop and the execution times on the worker thread are recorded in histograms.
+    All table operations and the serialization of a flush hold one lock, so the worker
+    thread, the event loop and flushes never access the data at the same time.
+
+    Every modification of a table is published on the topic `database_update/<table_name>`
+    with a `TableUpdatePayload` that holds the ids and contents of the affected documents.
+    Modifications made on the worker thread are published on the event loop that awaited
+    the operation, before the awaiting coroutine resumes.
     """
     db = None
+    flush_interval = 30
+
+    _executor = None
+    # held by every table operation and while a flush serializes the data
+    _lock = threading.RLock()
+    # holds the event loop that waits for the operation the worker thread currently executes
+    _worker_state = threading.local()
+    # tables whose modifications are not published
+    _muted_tables = set()
+    # time synchronous calls blocked the calling thread (usually the event loop)
+    blocking_latency = LatencyHistogram()
+    # time operations took on the worker thread
+    worker_latency = LatencyHistogram()
+    # time between submitting an operation and its execution on the worker thread
+    worker_queue_latency = LatencyHistogram()
 
     @classmethod
-    def set_db_path(cls, path):
-        cls.db = TinyDB(path)
+    def set_db_path(cls, path, write_behind=False, flush_interval=30):
+        cls.flush_interval = flush_interval
+        if write_behind:
+            cls.db = TinyDB(path, storage=WriteBehindStorage, lock=cls._lock)
+        else:
+            cls.db = TinyDB(path)
+        cls.db.table_class = ObservedTable
 
     @classmethod
     def get_db_for(cls, name):
-        return cls.db.table(name)
+        return TimedTable(cls.db.table(name), cls.blocking_latency, cls._lock)
+
+    @classmethod
+    def get_async_db_for(cls, name):
+        return AsyncTable(cls.db.table(name))
+
+    @classmethod
+    async def run(cls, func, *args, **kwargs):
+        """ Executes `func` on the database's worker thread while holding the lock and returns its result. """
+        return await cls._run_on_worker(functools.partial(func, *args, **kwargs), hold_lock=True)
+
+    @classmethod
+    async def _run_on_worker(cls, func, hold_lock):
+        if cls._executor is None:
+            cls._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="byb_database")
+        loop = asyncio.get_running_loop()
+        submit_time = time.perf_counter()
+
+        def timed_call():
+            t = time.perf_counter()
+            cls.worker_queue_latency.record(t - submit_time)
+            cls._worker_state.loop = loop
+            try:
+                if not hold_lock:
+                    return func()
+                with cls._lock:
+                    return func()
+            finally:
+                cls._worker_state.loop = None
+                cls.worker_latency.record(time.perf_counter() - t)
+
+        return await loop.run_in_executor(cls._executor, timed_call)
 
     @classmethod
     def as_dict_with_id(cls, query_result, id_tag="doc_id"):
@@ -31,7 +386,72 @@ class Database:
         return [{**dict(e), **{id_tag: e.doc_id}} for e in query_result]
 
     @classmethod
-    def set_table_update_hook(cls, table_name):
-        # TODO: Send a message on a topic as the table is updated.
-        # Structure: "database_update/<table_name>"
-        raise NotImplementedError("Table update hooks not implemented yet.")
+    def flush(cls):
+        """ Writes pending modifications to disk. Does nothing for storages that write immediately. """
+        storage = cls.db.storage if cls.db is not None else None
+        if isinstance(storage, WriteBehindStorage):
+            storage.flush()
+
+    @classmethod
+    async def flush_periodically(cls):
+        """ Coroutine that flushes the database every `flush_interval` seconds until cancelled. """
+        try:
+            while True:
+                await asyncio.sleep(cls.flush_interval)
+                # the flush only holds the lock while serializing, not while writing the file
+                await cls._run_on_worker(cls.flush, hold_lock=False)
+        finally:
+            # finish pending operations before writing to disk one last time
+            if cls._executor is not None:
+                cls._executor.shutdown(wait=True)
+                cls._executor = None
+            cls.flush()
+
+    @classmethod
+    def get_stats(cls):
+        """ Returns the storage's operation counters and the latency histograms. """
+        stats = getattr(cls.db.storage, "stats", None) if cls.db is not None else None
+        return {
+            "storage": stats.asdict() if stats is not None else None,
+            "latency": {
+                "blocking": cls.blocking_latency.asdict(),
+                "worker": cls.worker_latency.asdict(),
+                "worker_queue": cls.worker_queue_latency.asdict()
+            }
+        }
+
+    @classmethod
+    def get_update_topic(cls, table_name):
+        return "database_update/" + table_name
+
+    @classmethod
+    def set_table_update_hook(cls, table_name, enabled=True):
+        """ Enables or disables the change feed of a table. All tables publish their changes by default. """
+        if enabled:
+            cls._muted_tables.discard(table_name)
+        else:
+            cls._muted_tables.add(table_name)
+
+    @classmethod
+    def has_update_subscribers(cls, table_name):
+        if table_name in cls._muted_tables:
+            return False
+        if getattr(cls._worker_state, "loop", None) is not None:
+            # Topics isn't thread-safe. On the worker thread the change is always collected and
+            # the subscribers are looked up on the event loop as the change is published.
+            return True
+        return len(Topics.get_subscribers(cls.get_update_topic(table_name))) > 0
+
+    @classmethod
+    def publish_table_update(cls, payload):
+        """
+        Sends a `TableUpdatePayload` to the subscribers of the table's update topic. Called by
+        the tables. Changes made on the worker thread are handed over to the event loop, as the
+        subscribers' message queues are not thread-safe.
+        """
+        message = BaseMessage(cls.get_update_topic(payload.table), payload)
+        loop = getattr(cls._worker_state, "loop", None)
+        if loop is None:
+            Topics.send_message(message)
+        else:
+            loop.call_soon_threadsafe(Topics.send_message, message)
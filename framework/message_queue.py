@@ -0,0 +1,193 @@
+#
+# message_queue.py
+# backyardbot
+#
+# Created: October 2026
+#
+
+import time
+import asyncio
+from collections import deque
+
+
+PRIORITY_HIGH = 0
+PRIORITY_NORMAL = 1
+PRIORITY_LOW = 2
+
+priority_names = {
+    "high": PRIORITY_HIGH,
+    "normal": PRIORITY_NORMAL,
+    "low": PRIORITY_LOW
+}
+
+# What happens if a message arrives while the queue is full:
+# - drop_oldest: removes the oldest message with the lowest priority to make room
+# - drop_newest: discards the arriving message
+# - coalesce: replaces a queued message on the same topic (and for the same
+#   websocket client) with the arriving one, falls back to drop_oldest
+# - block: producers that use `await Topics.publish(..)` wait until the
+#   queue has space again. Messages from producers that don't wait are still
+#   accepted up to twice the maximum length, then drop_oldest applies.
+OVERFLOW_POLICIES = ("drop_oldest", "drop_newest", "coalesce", "block")
+
+
+class MessageQueue:
+    """
+    Bounded message buffer of an EventComponent. Messages are stored in
+    priority lanes and a message in a higher priority lane is always handed
+    out before any message of a lower priority lane. Within a lane, messages
+    keep their order of arrival.
+
+    Configured with the `message_queue` dict of a component's settings:
+    ```
+    "message_queue": {
+        "max_length": 1000,          // null for an unbounded queue
+        "overflow_policy": "drop_oldest",
+        "topic_priorities": {        // overrides the priorities given by the component
+            "websocket/timetable/backend": "high"
+        }
+    }
+    ```
+    """
+
+    def __init__(self, max_length=1000, overflow_policy="drop_oldest", on_overflow=None):
+        if overflow_policy not in OVERFLOW_POLICIES:
+            raise ValueError(f"Unknown overflow policy: {overflow_policy}")
+
+        self.max_length = max_length
+        self.overflow_policy = overflow_policy
+        # called with (reason, message) whenever the queue overflows
+        self._on_overflow = on_overflow or (lambda reason, msg: None)
+
+        # one deque per priority, holding tuples of (enqueue time, message)
+        self._lanes = [deque() for _ in priority_names]
+        self._length = 0
+        # futures of the producers that wait for space, released one at a time
+        self._space_waiters = deque()
+
+        self.stats = {
+            "enqueued": 0,
+            "dropped": 0,
+            "coalesced": 0,
+            "overflowed": 0,
+            "max_length_seen": 0
+        }
+
+    @classmethod
+    def from_settings(cls, settings, on_overflow=None):
+        queue_settings = settings.get("message_queue", {})
+        return cls(
+            max_length=queue_settings.get("max_length", 1000),
+            overflow_policy=queue_settings.get("overflow_policy", "drop_oldest"),
+            on_overflow=on_overflow)
+
+    # === Public Methods ===
+    # === -------------- ===
+
+    def put(self, msg, priority=PRIORITY_NORMAL):
+        """
+        Enqueues a message. Returns `True` if a new entry was added to the
+        queue and `False` if the message was merged into a queued message or
+        discarded.
+        """
+        if self.is_full():
+            if self.overflow_policy == "coalesce" and self._coalesce(msg):
+                self.stats["coalesced"] += 1
+                self._on_overflow("coalesced", msg)
+                return False
+
+            if self.overflow_policy == "block" and self._length < 2 * self.max_length:
+                self.stats["overflowed"] += 1
+                self._on_overflow("overflowed", msg)
+            elif self.overflow_policy == "drop_newest" or not self._drop_oldest(priority):
+                self.stats["dropped"] += 1
+                self._on_overflow("dropped", msg)
+                return False
+            else:
+                self.stats["dropped"] += 1
+                self._on_overflow("dropped", msg)
+
+        self._lanes[priority].append((time.monotonic(), msg))
+        self._length += 1
+        self.stats["enqueued"] += 1
+        self.stats["max_length_seen"] = max(self.stats["max_length_seen"], self._length)
+        # the producer that was released last used its space, the next one may go on
+        self._release_waiter()
+        return True
+
+    def pop(self):
+        """ Returns the tuple (enqueue time, message) that should be handled next. """
+        for lane in self._lanes:
+            if lane:
+                self._length -= 1
+                self._release_waiter()
+                return lane.popleft()
+        raise IndexError("pop from an empty MessageQueue")
+
+    def is_full(self):
+        return self.max_length is not None and self._length >= self.max_length
+
+    async def wait_for_space(self):
+        """
+        Returns once the queue can take another message without overflowing.
+        Waiting producers are released one at a time in the order in which
+        they started waiting.
+        """
+        if self.overflow_policy != "block":
+            return
+        if not self.is_full() and not self._space_waiters:
+            return
+        waiter = asyncio.get_running_loop().create_future()
+        self._space_waiters.append(waiter)
+        try:
+            await waiter
+        except asyncio.CancelledError:
+            if waiter in self._space_waiters:
+                self._space_waiters.remove(waiter)
+            else:
+                # was released but won't use the space
+                self._release_waiter()
+            raise
+
+    def __len__(self):
+        return self._length
+
+    def __bool__(self):
+        return self._length > 0
+
+    # === Private Methods ===
+    # === --------------- ===
+
+    def _release_waiter(self):
+        if self.is_full():
+            return
+        while self._space_waiters:
+            waiter = self._space_waiters.popleft()
+            if not waiter.done():
+                waiter.set_result(None)
+                return
+
+    def _drop_oldest(self, priority):
+        """
+        Removes the oldest message of the lowest priority lane which doesn't
+        hold more important messages than the arriving one. Returns `False` if
+        there is no such message.
+        """
+        for lane_priority in range(len(self._lanes) - 1, priority - 1, -1):
+            lane = self._lanes[lane_priority]
+            if lane:
+                lane.popleft()
+                self._length -= 1
+                return True
+        return False
+
+    def _coalesce(self, msg):
+        """ Replaces the newest queued message with the same topic and receiver. """
+        key = (msg.topic, getattr(msg, "ws_id", None))
+        for lane in self._lanes:
+            for i in range(len(lane) - 1, -1, -1):
+                queued_msg = lane[i][1]
+                if (queued_msg.topic, getattr(queued_msg, "ws_id", None)) == key:
+                    lane[i] = (lane[i][0], msg)
+                    return True
+        return False
@@ -9,10 +9,10 @@
 
 import os
 import json
-from jinja2 import Template
 from .event import EventComponent
 from .utility import pick_localization
-from .communication import Topics, WebsocketRequest
+from .communication import Topics, WebsocketRequest, StateUpdate
+from .renderer import TemplateCache
 
 
 class Plugin(EventComponent):
@@ -22,7 +22,14 @@ class Plugin(EventComponent):
     Subclass this class to develop plugins. The plugin manager will
     instantiate plugins based on the configuration files and a plugin
     instance will live throughout the lifetime of the server.
+
+    Plugins that set `tracks_render_data_changes = True` promise to call
+    `mark_render_data_changed()` whenever the result of
+    `calc_render_data()` changes. The html fragment that `render()`
+    produces for them is cached and reused without calling
+    `calc_render_data()` at all. Other plugins are rendered on every call.
     """
+    tracks_render_data_changes = False
 
     def __init__(self, name, plugin_settings_path):
         settings = json.load(open(plugin_settings_path))
@@ -33,8 +40,21 @@ class Plugin(EventComponent):
 
         self.name = plugin_settings_path.split("/")[-2]
 
+        self.localization = {}
+        self._localization_version = 0
+        self._render_data_version = 0
+        # (cache key, rendered html fragment), the key consists of
+        # (template, localization version, render data key)
+        self._fragment_cache = (None, None)
+
         self.logger.info(f"created plugin {self.name}")
 
+        # Plugins that only send complete state descriptions to their
+        # frontend may limit the number of state frames per second.
+        frontend_update_rate = self.settings.get("max_frontend_updates_per_second", None)
+        if frontend_update_rate:
+            Topics.coalesce_topic(f"websocket/{self.name}/frontend", frontend_update_rate)
+
         self.html_template_path = os.path.join(plugin_dir, self.settings["html_template"])
         # TODO: relative paths. Must include leading slash from project's root dir.
         self.css_file_paths = [
@@ -55,6 +75,21 @@ class Plugin(EventComponent):
         """ Plugin's localization data consists of global setting and the
         ones given to the plugin. """
         self.localization = pick_localization(self.settings, server_settings)
+        self._localization_version += 1
+
+    def mark_render_data_changed(self):
+        """
+        Informs the plugin that the next call to `calc_render_data()` returns
+        different data, so the cached html fragment has to be rendered again.
+        """
+        self._render_data_version += 1
+
+    def get_stats(self):
+        """
+        Returns a json serializable dict with the plugin's statistics, which
+        `GET /admin/plugins` lists. Plugins may add their own entries.
+        """
+        return {"spin": self.get_spin_metrics(), "queue": self.get_queue_stats()}
 
     # === Websocket Interface ===
 
@@ -72,18 +107,41 @@ class Plugin(EventComponent):
         """
         topic = f"websocket/{self.name}/frontend"
         message = WebsocketRequest(topic, payload=data, ws_id=ws_id)
-        Topics.send_message(message)
+        await Topics.publish(message)
+
+    async def send_state(self, command, state, ws_id=-1):
+        """
+        Sends the complete state for `command` to the clients. The server
+        only transmits what changed since the last state it sent, so this can
+        be called whenever anything changed. Sending to a single client
+        (`ws_id`) transmits the full state to it, e.g. for new clients. If
+        the state changed, the other clients receive the changes as well.
+        The frontend receives `{"command": command, "payload": state}`.
+        Leave out values that change with every call, like the current time,
+        the server sends its time along with every state.
+        """
+        topic = f"websocket/{self.name}/frontend"
+        message = StateUpdate(topic, payload={"command": command, "payload": state}, ws_id=ws_id)
+        await Topics.publish(message)
 
     # === Frontend ===
 
     def render(self, *args, **kwargs):
         # had this previously invoked with: {{ plugin(plugin, css_filelist, js_filelist) }}
-        # TODO: Debug parameter to reload files every time
-        plugin_template_str = open(self.html_template_path).read()
-        t = Template(plugin_template_str)
-        # TODO: Standard parameters with leading underscore
-        # TODO: Integrate data from self.calc_render_data() and kwargs
-        return t.render(plugin_name=self.name, values=self.calc_render_data(), localization=self.localization)
+        t = TemplateCache.get_template(self.html_template_path)
+
+        # without tracked changes, only rendering tells whether the render data changed
+        if not self.tracks_render_data_changes:
+            return self._render_template(t)
+
+        cache_key = (t, self._localization_version, self._render_data_version)
+        cached_key, fragment = self._fragment_cache
+        if cached_key == cache_key:
+            return fragment
+
+        fragment = self._render_template(t)
+        self._fragment_cache = (cache_key, fragment)
+        return fragment
 
     def css_files(self):
         return self.css_file_paths
@@ -93,3 +151,8 @@ class Plugin(EventComponent):
 
     def calc_render_data(self):
         return None
+
+    def _render_template(self, t):
+        # TODO: Standard parameters with leading underscore
+        # TODO: Integrate data from self.calc_render_data() and kwargs
+        return t.render(plugin_name=self.name, values=self.calc_render_data(), localization=self.localization)
@@ -7,33 +7,100 @@
 # montebaur.tech, github.com/montioo
 #
 
-from jinja2 import Template
+import os
 from jinja2 import Environment, meta
 from .utility import create_logger
-from collections import defaultdict
+
+
+class TemplateCache:
+    """
+    Compiles html templates once and keeps them in memory. If
+    `reload_on_change` is enabled (useful while developing templates), a
+    template is compiled again once the modification time of its file
+    changed. Otherwise the files are only read the first time they are used.
+    """
+    _env = Environment()
+    # path -> (mtime, compiled template, undeclared variables)
+    _templates = {}
+    reload_on_change = False
+
+    def __init__(self):
+        raise RuntimeWarning("TemplateCache class is not supposed to be instantiated")
+
+    @classmethod
+    def set_reload_on_change(cls, reload_on_change):
+        cls.reload_on_change = reload_on_change
+
+    @classmethod
+    def get_template(cls, path):
+        """ Returns the compiled template for the given file. """
+        return cls._get_entry(path)[1]
+
+    @classmethod
+    def get_undeclared_variables(cls, path):
+        """ Returns the set of variables that are used by the template but not defined in it. """
+        return cls._get_entry(path)[2]
+
+    @classmethod
+    def _get_entry(cls, path):
+        entry = cls._templates.get(path, None)
+        if entry is not None and not cls.reload_on_change:
+            return entry
+
+        mtime = os.stat(path).st_mtime_ns
+        if entry is not None and entry[0] == mtime:
+            return entry
+
+        with open(path) as f:
+            source = f.read()
+        ast = cls._env.parse(source)
+        entry = (mtime, cls._env.from_string(ast), meta.find_undeclared_variables(ast))
+        cls._templates[path] = entry
+        return entry
 
 
 class Renderer:
-    def __init__(self, plugin_manager, html_template, static_files):
+    def __init__(self, plugin_manager, html_template, static_files, reload_templates=False, static_url=None):
         self.plugins = plugin_manager.get_plugin_list()
         self.ui_module_query = plugin_manager.calc_uimodule_parameter_list
 
         logger_name = __name__ + "." + self.__class__.__name__
         self.logger = create_logger(logger_name)
 
-        self.css_files = [f for f in static_files if f.endswith(".css")]
-        self.js_files = [f for f in static_files if f.endswith(".js")]
+        # maps a file path to the URL that is used in the page
+        static_url = static_url or (lambda path: path)
+        self.css_files = [static_url(f) for f in static_files if f.endswith(".css")]
+        self.js_files = [static_url(f) for f in static_files if f.endswith(".js")]
 
-        with open(html_template) as f:
-            self.main_template_str = f.read()
+        TemplateCache.set_reload_on_change(reload_templates)
+        self.html_template = html_template
+        self._main_template = None
+        self._template_dict = None
+        # compile all templates during startup and not with the first request
+        self._update_template_dict()
+        for plugin in self.plugins:
+            TemplateCache.get_template(plugin.html_template_path)
 
     def render(self, *args, **kwargs):
         """ Gives a list of plugins that are not explicitly mentioned in the template. """
+        self._update_template_dict()
+        template_dict = dict(self._template_dict)
+        template_dict.update(kwargs)
+        return self._main_template.render(template_dict)
+
+    def _update_template_dict(self):
+        """
+        Splits the plugins into the ones that are explicitly used in the main
+        template and the ones that are rendered in the list of remaining
+        plugins. Only done again if the main template was compiled again.
+        """
+        main_template = TemplateCache.get_template(self.html_template)
+        if main_template is self._main_template:
+            return
+        self._main_template = main_template
 
-        env = Environment()
-        ast = env.parse(self.main_template_str)
-        used_vars = meta.find_undeclared_variables(ast)
-        self.logger.info(used_vars)
+        used_vars = TemplateCache.get_undeclared_variables(self.html_template)
+        self.logger.info(f"Variables used in main template: {used_vars}")
         plugin_names = {p.name for p in self.plugins}
         plugin_dict = {p.name: p for p in self.plugins}
 
@@ -41,32 +108,15 @@ class Renderer:
         unlisted_plugins = plugin_names - used_vars
         listed_plugins = plugin_names - unlisted_plugins
 
-        unlisted_renderers = {plugin_dict[up_name].render for up_name in unlisted_plugins}
+        unlisted_renderers = [plugin_dict[up_name].render for up_name in sorted(unlisted_plugins)]
 
         template_dict = {
             "stylesheets": self.css_files,
             "plugin_renderers": unlisted_renderers,
             "scripts": self.js_files
         }
-        template_dict.update(kwargs)
 
         for ls_name in listed_plugins:
             template_dict[ls_name] = plugin_dict[ls_name].render
 
-        # self.logger.debug(template_dict)
-
-        html_template = Template(self.main_template_str)
-        return html_template.render(template_dict)
-
-        # Will not perform a check to see whether the plugin was explicitly used:
-        # plugin_configs = self.ui_module_query()
-        # html_template = Template(self.main_template_str)
-        # template_dict = {
-        #     "stylesheets": self.css_files,
-        #     "scripts": self.js_files,
-        #     # TODO: Better naming?
-        #     "plugin_renderers": [p.render for p in self.plugins],
-        #     "plugins": plugin_configs
-        # }
-        # template_dict.update(kwargs)
-        # return html_template.render(template_dict)
+        self._template_dict = template_dict
@@ -0,0 +1,187 @@
+#
+# state_sync.py
+# backyardbot
+#
+# Created: October 2026
+#
+
+import json
+
+
+def _escape(key):
+    return str(key).replace("~", "~0").replace("/", "~1")
+
+
+def _unescape(segment):
+    return segment.replace("~1", "/").replace("~0", "~")
+
+
+def _same(a, b):
+    # 1 == True and 1 == 1.0 in python, but not in json
+    return type(a) is type(b) and a == b
+
+
+def json_diff(old, new, path=""):
+    """
+    Returns a list of JSON patch operations (RFC 6902, only `add`, `remove`
+    and `replace`) that turn the json serializable object `old` into `new`.
+    Lists are compared after skipping their common beginning and end, so
+    inserting into or removing from a sorted list results in a single
+    operation.
+    """
+    if _same(old, new):
+        return []
+    if isinstance(old, dict) and isinstance(new, dict):
+        ops = []
+        for key in old:
+            if key not in new:
+                ops.append({"op": "remove", "path": f"{path}/{_escape(key)}"})
+        for key, value in new.items():
+            if key not in old:
+                ops.append({"op": "add", "path": f"{path}/{_escape(key)}", "value": value})
+            else:
+                ops += json_diff(old[key], value, f"{path}/{_escape(key)}")
+        return ops
+    if isinstance(old, list) and isinstance(new, list):
+        return _list_diff(old, new, path)
+    return [{"op": "replace", "path": path, "value": new}]
+
+
+def _list_diff(old, new, path):
+    start = 0
+    max_start = min(len(old), len(new))
+    while start < max_start and _same(old[start], new[start]):
+        start += 1
+    old_end, new_end = len(old), len(new)
+    while old_end > start and new_end > start and _same(old[old_end - 1], new[new_end - 1]):
+        old_end -= 1
+        new_end -= 1
+
+    ops = []
+    common = min(old_end, new_end) - start
+    for i in range(start, start + common):
+        ops += json_diff(old[i], new[i], f"{path}/{i}")
+    # removing from the back keeps the indices of the remaining elements valid
+    for i in reversed(range(start + common, old_end)):
+        ops.append({"op": "remove", "path": f"{path}/{i}"})
+    for i in range(start + common, new_end):
+        ops.append({"op": "add", "path": f"{path}/{i}", "value": new[i]})
+    return ops
+
+
+def apply_patch(doc, ops):
+    """
+    Applies JSON patch operations created by `json_diff(..)` to `doc` and
+    returns the result. Containers in `doc` are modified in place.
+    """
+    for op in ops:
+        segments = [_unescape(s) for s in op["path"].split("/")[1:]]
+        if not segments:
+            doc = op["value"]
+            continue
+        parent = doc
+        for segment in segments[:-1]:
+            parent = parent[int(segment)] if isinstance(parent, list) else parent[segment]
+        key = segments[-1]
+        if isinstance(parent, list):
+            key = len(parent) if key == "-" else int(key)
+        if op["op"] == "remove":
+            del parent[key]
+        elif op["op"] == "add" and isinstance(parent, list):
+            parent.insert(key, op["value"])
+        else:
+            parent[key] = op["value"]
+    return doc
+
+
+class SyncedState:
+    """
+    The latest value of a state that was sent to the frontends together with
+    its version number. Each change increases the version by one.
+    """
+
+    def __init__(self):
+        self.version = 0
+        self.value = None
+
+    def update(self, value):
+        """
+        Stores the new value and returns the patch operations from the
+        previous value or `None` if nothing changed. The first update
+        returns an empty list since there is no previous value to patch.
+        """
+        # json round trip, so tuples become lists and the caller may modify its object
+        value = json.loads(json.dumps(value))
+        if self.version > 0 and _same(self.value, value):
+            return None
+        ops = json_diff(self.value, value) if self.version > 0 else []
+        self.value = value
+        self.version += 1
+        return ops
+
+
+class StateSync:
+    """
+    Versioned state synchronization between the server and the frontends.
+    Plugins send their state as a whole with `Plugin.send_state(..)`. The
+    server keeps the last state that was sent for every (plugin, command)
+    and only sends JSON patches against it to the clients. A client that
+    misses a version (e.g. because a message was dropped) or connects later
+    gets a full snapshot.
+
+    Frames sent over the websocket:
+    - snapshot: {"plugin_name": .., "payload": {"command": .., "payload": ..}, "state_version": ..}
+    - patch: {"plugin_name": .., "state_patch": {"command": .., "base_version": .., "version": .., "ops": [..]}}
+
+    Snapshots have the same layout as all other messages, so frontends that
+    don't track versions still understand them.
+    """
+
+    def __init__(self):
+        # (plugin name, command) -> SyncedState
+        self._states = {}
+        self.patches_sent = 0
+        self.snapshots_sent = 0
+
+    def update(self, plugin_name, command, value):
+        """
+        Stores the new state and returns the frame that brings all clients to
+        it, which is a patch or, if it isn't any shorter, a snapshot. Returns
+        `None` if the state didn't change.
+        """
+        state = self._states.setdefault((plugin_name, command), SyncedState())
+        ops = state.update(value)
+        if ops is None:
+            return None
+        if not ops or len(json.dumps(ops)) >= len(json.dumps(state.value)):
+            return self.snapshot_frame(plugin_name, command)
+        self.patches_sent += 1
+        return {
+            "plugin_name": plugin_name,
+            "state_patch": {
+                "command": command,
+                "base_version": state.version - 1,
+                "version": state.version,
+                "ops": ops
+            }
+        }
+
+    def snapshot_frame(self, plugin_name, command):
+        """ Returns the full state frame or `None` if the state was never sent. """
+        state = self._states.get((plugin_name, command), None)
+        if state is None:
+            return None
+        self.snapshots_sent += 1
+        return {
+            "plugin_name": plugin_name,
+            "payload": {"command": command, "payload": state.value},
+            "state_version": state.version
+        }
+
+    def get_stats(self):
+        """ Number of patch and snapshot frames that were created, each of them may go to several clients. """
+        return {"patches_sent": self.patches_sent, "snapshots_sent": self.snapshots_sent}
+
+    def get_version(self, plugin_name, command):
+        state = self._states.get((plugin_name, command), None)
+        return state.version if state is not None else 0
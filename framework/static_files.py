@@ -0,0 +1,147 @@
+#
+# static_files.py
+# backyardbot
+#
+# Created: October 2026
+#
+
+import os
+import gzip
+import hashlib
+import mimetypes
+from aiohttp import web
+
+try:
+    # optional, only used if installed
+    import brotli
+except ImportError:
+    brotli = None
+
+
+class StaticFile:
+    """ Contents of a static file together with its precompressed variants. """
+
+    etag_suffixes = {"identity": "", "gzip": "-gz", "br": "-br"}
+
+    def __init__(self, path):
+        self.path = path
+        self.mtime = os.stat(path).st_mtime_ns
+        with open(path, "rb") as f:
+            data = f.read()
+
+        self.content_hash = hashlib.sha256(data).hexdigest()[:16]
+        self.content_type = mimetypes.guess_type(path)[0] or "application/octet-stream"
+
+        # content encoding -> body, only keeping compressed variants that are smaller
+        self.variants = {"identity": data}
+        compressed = {"gzip": gzip.compress(data, compresslevel=9)}
+        if brotli is not None:
+            compressed["br"] = brotli.compress(data)
+        for encoding, body in compressed.items():
+            if len(body) < len(data):
+                self.variants[encoding] = body
+
+        # strong ETags have to differ between the encodings of the same content
+        self.etags = {encoding: f'"{self.content_hash}{self.etag_suffixes[encoding]}"' for encoding in self.variants}
+
+
+class StaticFileCache:
+    """
+    Serves the whitelisted static files (css, js) from memory. All files are
+    read and compressed with gzip (and brotli, if available) once while the
+    server starts.
+
+    Responses carry a strong ETag per content encoding, so clients can revalidate their copy with
+    a conditional request which is answered with `304 Not Modified`. URLs
+    built with `url_for(..)` contain the file's content hash and responses to
+    such requests may be cached by the browser for a year without
+    revalidation. Changing a file changes its URL and thus invalidates the
+    browser's cache.
+    """
+
+    immutable_cache_control = "public, max-age=31536000, immutable"
+    revalidate_cache_control = "no-cache"
+
+    # preferred encoding first
+    supported_encodings = ("br", "gzip")
+
+    def __init__(self, allowed_files, reload_on_change=False):
+        self.reload_on_change = reload_on_change
+        self._files = {path: StaticFile(path) for path in allowed_files if os.path.isfile(path)}
+
+    def url_for(self, path):
+        """ Returns the URL to a static file that includes its content hash. """
+        static_file = self._get_file(path)
+        if static_file is None:
+            return path
+        return f"{path}?v={static_file.content_hash}"
+
+    def response_for(self, path, request):
+        """ Builds the response for a static file or raises `HTTPNotFound`. """
+        static_file = self._get_file(path)
+        if static_file is None:
+            raise web.HTTPNotFound()
+
+        if request.query.get("v", None) == static_file.content_hash:
+            cache_control = self.immutable_cache_control
+        else:
+            cache_control = self.revalidate_cache_control
+
+        encoding = self._pick_encoding(static_file, request.headers.get("Accept-Encoding", ""))
+        headers = {
+            "ETag": static_file.etags[encoding],
+            "Cache-Control": cache_control,
+            "Vary": "Accept-Encoding"
+        }
+
+        if self._etag_matches(static_file.etags[encoding], request.headers.get("If-None-Match", "")):
+            return web.Response(status=304, headers=headers)
+
+        if encoding != "identity":
+            headers["Content-Encoding"] = encoding
+
+        return web.Response(body=static_file.variants[encoding], content_type=static_file.content_type,
+                            headers=headers)
+
+    # === Private Methods ===
+    # === --------------- ===
+
+    def _get_file(self, path):
+        static_file = self._files.get(path, None)
+        if static_file is not None and self.reload_on_change \
+           and os.stat(path).st_mtime_ns != static_file.mtime:
+            static_file = StaticFile(path)
+            self._files[path] = static_file
+        return static_file
+
+    def _pick_encoding(self, static_file, accept_encoding):
+        accepted = self._accepted_encodings(accept_encoding)
+        for encoding in self.supported_encodings:
+            if encoding in accepted and encoding in static_file.variants:
+                return encoding
+        return "identity"
+
+    @staticmethod
+    def _accepted_encodings(accept_encoding):
+        """ Returns the encodings in an Accept-Encoding header, except for the ones with `q=0`. """
+        accepted = set()
+        for item in accept_encoding.split(","):
+            encoding, *params = [part.strip() for part in item.split(";")]
+            quality = 1.0
+            for param in params:
+                name, _, value = param.partition("=")
+                if name.strip().lower() == "q":
+                    try:
+                        quality = float(value)
+                    except ValueError:
+                        quality = 0.0
+            if encoding and quality > 0:
+                accepted.add(encoding.lower())
+        return accepted
+
+    @staticmethod
+    def _etag_matches(etag, if_none_match):
+        if if_none_match.strip() == "*":
+            return True
+        # weak comparison as required for If-None-Match
+        return etag in {tag.strip().replace("W/", "", 1) for tag in if_none_match.split(",")}
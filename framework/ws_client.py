@@ -0,0 +1,256 @@
+#
+# ws_client.py
+# backyardbot
+#
+# Created: October 2026
+#
+
+import time
+import asyncio
+import itertools
+from .utility import log_coroutine_exceptions
+
+
+class PluginTraffic:
+    """ Message and byte counters of websocket traffic, kept separately for every plugin. """
+
+    def __init__(self):
+        # plugin name -> [messages sent, bytes sent, messages received, bytes received]
+        self._counters = {}
+
+    def record_sent(self, plugin_name, byte_count):
+        counters = self._counters.setdefault(plugin_name, [0, 0, 0, 0])
+        counters[0] += 1
+        counters[1] += byte_count
+
+    def record_received(self, plugin_name, byte_count):
+        counters = self._counters.setdefault(plugin_name, [0, 0, 0, 0])
+        counters[2] += 1
+        counters[3] += byte_count
+
+    def asdict(self):
+        return {
+            plugin_name: {
+                "messages_sent": c[0], "bytes_sent": c[1], "messages_received": c[2], "bytes_received": c[3]
+            }
+            for plugin_name, c in self._counters.items()
+        }
+
+
+class WebsocketClient:
+    """
+    Wraps a websocket connection to a frontend. Messages for the client are
+    put into a bounded outbound buffer and written by a separate coroutine,
+    so that sending to one slow client never delays the server or other
+    clients. A client that repeatedly fails to receive messages (buffer
+    overflows, send timeouts or errors) is evicted and its connection is
+    closed.
+
+    If the client negotiated permessage-deflate and `compression_threshold`
+    is set, only messages of at least that many bytes are compressed. Small
+    messages barely shrink and compressing them costs more cpu time than it
+    saves on the link. aiohttp's public api can only force compression for a
+    message, not skip it, so the threshold relies on the connection writer's
+    `compress` attribute (tested with aiohttp 3.14). Without it, all messages
+    are compressed.
+    """
+
+    def __init__(self, ws, ws_id, logger, buffer_size=100, send_timeout=5, max_failures=3, on_evict=None,
+                 framing=None, compression_threshold=0, total_traffic=None):
+        self.ws = ws
+        self.ws_id = ws_id
+        self.logger = logger
+        # encoding of the frames that were negotiated for this connection, see framework/framing.py
+        self.framing = framing
+
+        self._outbound = asyncio.Queue(maxsize=buffer_size)
+        self._send_timeout = send_timeout
+        self._max_failures = max_failures
+        self._on_evict = on_evict or (lambda client: None)
+
+        self._consecutive_failures = 0
+        self._writer_task = None
+        self.evicted = False
+
+        # deflate window bits to pass for messages above the threshold, 0 if aiohttp decides on its own
+        self._compress = 0
+        self._compression_threshold = compression_threshold
+        if compression_threshold > 0 and ws.compress:
+            self._setup_compression_threshold()
+
+        # connection statistics, timestamps are unix times
+        self.connected_at = time.time()
+        self.last_activity = self.connected_at
+        self.messages_sent = 0
+        self.bytes_sent = 0
+        self.messages_received = 0
+        self.bytes_received = 0
+        self.plugin_traffic = PluginTraffic()
+        # shared by all clients, the traffic is recorded there as well
+        self._total_traffic = total_traffic
+
+    @classmethod
+    def from_settings(cls, ws, ws_id, logger, server_settings, on_evict=None, framing=None, total_traffic=None):
+        return cls(
+            ws, ws_id, logger,
+            buffer_size=server_settings.get("ws_send_buffer", 100),
+            send_timeout=server_settings.get("ws_send_timeout", 5),
+            max_failures=server_settings.get("ws_max_send_failures", 3),
+            on_evict=on_evict,
+            framing=framing,
+            compression_threshold=server_settings.get("ws_compression_threshold", 0),
+            total_traffic=total_traffic)
+
+    # === Public Methods ===
+    # === -------------- ===
+
+    def start(self):
+        """ Launches the coroutine that writes buffered messages to the websocket. """
+        self._writer_task = asyncio.create_task(log_coroutine_exceptions(self._writer(), self.logger))
+
+    def stop(self):
+        if self._writer_task is not None:
+            self._writer_task.cancel()
+            self._writer_task = None
+
+    def send_str(self, data, byte_count=None, plugin_name=None):
+        """
+        Enqueues an already serialized message and returns immediately. If
+        the outbound buffer is full, the message is dropped and counts as a
+        failed send. `byte_count` is the size of the encoded message and
+        allows to compute it only once when broadcasting. `data` of type
+        `bytes` is sent as a binary message. The message is counted for
+        `plugin_name` in `plugin_traffic` once it was sent. Dropped messages
+        aren't counted.
+        """
+        if byte_count is None:
+            byte_count = len(data) if isinstance(data, bytes) else len(data.encode())
+        self._enqueue(data, byte_count, [(plugin_name, byte_count)])
+
+    def send_batch(self, data, frame_sizes):
+        """
+        Like `send_str(..)` for a message that holds several frames.
+        `frame_sizes` lists a (plugin name, byte count) tuple for every frame
+        in the message, so each plugin's traffic is counted.
+        """
+        byte_count = len(data) if isinstance(data, bytes) else len(data.encode())
+        self._enqueue(data, byte_count, frame_sizes)
+
+    def record_received(self, byte_count, plugin_name=None):
+        """ Called by the server for every message that was received from this client. """
+        self.messages_received += 1
+        self.bytes_received += byte_count
+        self.last_activity = time.time()
+        if plugin_name is not None:
+            self.plugin_traffic.record_received(plugin_name, byte_count)
+            if self._total_traffic is not None:
+                self._total_traffic.record_received(plugin_name, byte_count)
+
+    def get_info(self):
+        """ Returns a json serializable description of the connection. """
+        return {
+            "ws_id": self.ws_id,
+            "connected_at": self.connected_at,
+            "last_activity": self.last_activity,
+            "messages_sent": self.messages_sent,
+            "bytes_sent": self.bytes_sent,
+            "messages_received": self.messages_received,
+            "bytes_received": self.bytes_received,
+            "queued_messages": self._outbound.qsize(),
+            "plugins": self.plugin_traffic.asdict()
+        }
+
+    # === Private Methods ===
+    # === --------------- ===
+
+    async def _writer(self):
+        while True:
+            data, byte_count, frame_sizes = await self._outbound.get()
+            compress = self._compress if self._compress and byte_count >= self._compression_threshold else None
+            try:
+                send = self.ws.send_bytes if isinstance(data, bytes) else self.ws.send_str
+                await asyncio.wait_for(send(data, compress=compress), self._send_timeout)
+            except asyncio.TimeoutError:
+                self.logger.warning(f"Sending to ws client {self.ws_id} timed out.")
+                self._register_failure()
+            except (ConnectionError, RuntimeError) as e:
+                self.logger.warning(f"Sending to ws client {self.ws_id} failed: {e}")
+                self._register_failure()
+            else:
+                self._consecutive_failures = 0
+                self.messages_sent += 1
+                self.bytes_sent += byte_count
+                self.last_activity = time.time()
+                for plugin_name, frame_size in frame_sizes:
+                    if plugin_name is not None:
+                        self.plugin_traffic.record_sent(plugin_name, frame_size)
+                        if self._total_traffic is not None:
+                            self._total_traffic.record_sent(plugin_name, frame_size)
+
+    def _setup_compression_threshold(self):
+        writer = getattr(self.ws, "_writer", None)
+        if not isinstance(getattr(writer, "compress", None), int):
+            self.logger.warning("This aiohttp version doesn't allow a compression threshold, compressing all messages.")
+            return
+        self._compress = self.ws.compress
+        # aiohttp compresses every message once deflate was negotiated, the
+        # writer now only compresses the messages it is asked to
+        writer.compress = 0
+
+    def _enqueue(self, data, byte_count, frame_sizes):
+        if self.evicted:
+            return
+        try:
+            self._outbound.put_nowait((data, byte_count, frame_sizes))
+        except asyncio.QueueFull:
+            self.logger.warning(f"Outbound buffer of ws client {self.ws_id} is full, dropping message.")
+            self._register_failure()
+
+    def _register_failure(self):
+        self._consecutive_failures += 1
+        if self._consecutive_failures >= self._max_failures and not self.evicted:
+            self._evict()
+
+    def _evict(self):
+        self.logger.info(f"Evicting ws client {self.ws_id} after {self._consecutive_failures} failed sends.")
+        self.evicted = True
+        self._on_evict(self)
+        # closing the connection ends the server's receive loop for this client
+        asyncio.create_task(log_coroutine_exceptions(self.ws.close(), self.logger))
+        # writer coroutine might be the caller, so it's only cancelled after returning
+        asyncio.get_running_loop().call_soon(self.stop)
+
+
+class ClientRegistry:
+    """
+    Holds all connected websocket clients. Every connection gets a unique
+    id from a monotonic counter, ids are never reused while the server runs.
+    Lookups by id take constant time.
+    """
+
+    def __init__(self):
+        self._clients = {}
+        self._id_counter = itertools.count(1)
+
+    def next_id(self):
+        return next(self._id_counter)
+
+    def add(self, client):
+        self._clients[client.ws_id] = client
+
+    def remove(self, client):
+        self._clients.pop(client.ws_id, None)
+
+    def get(self, ws_id):
+        """ Returns the client with the given id or `None` if it isn't connected (anymore). """
+        return self._clients.get(ws_id, None)
+
+    def get_info(self):
+        return [client.get_info() for client in self._clients.values()]
+
+    def __iter__(self):
+        # copy, so that clients may be removed while iterating
+        return iter(list(self._clients.values()))
+
+    def __len__(self):
+        return len(self._clients)
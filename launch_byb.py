@@ -10,6 +10,7 @@
 #
 
 import sys
+import json
 from framework.main import Server
 from framework.plugin_manager import PluginManager
 from framework.memory import Database
@@ -37,13 +38,20 @@ def main():
         return
 
     # TODO: Create some form of default settings file.
-    Database.set_db_path("byb/db.json")
+    db_settings = json.load(open(settings_file)).get("database", {})
+    Database.set_db_path(
+        db_settings.get("path", "byb/db.json"),
+        write_behind=db_settings.get("write_behind", False),
+        flush_interval=db_settings.get("flush_interval", 30))
 
     # TODO: Load this from settings file.
     pluginManager = PluginManager("plugins/")
 
     Server(settings_file, pluginManager)
 
+    # writes pending database modifications to disk
+    Database.db.close()
+
 
 if __name__ == "__main__":
     main()
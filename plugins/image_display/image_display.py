@@ -19,6 +19,8 @@ class ImageDisplay(Plugin):
     loaded) because the image is base64 encoded and included in the template
     rendering.
     """
+    # The image is loaded once and never changes.
+    tracks_render_data_changes = True
 
     def initialize(self, settings):
         """ Loading the image and saving it as a b64 encoded string. """
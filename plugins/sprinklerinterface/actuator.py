@@ -10,10 +10,9 @@
 from abc import ABC, abstractmethod
 from dataclasses import dataclass
 from typing import List, Optional, Set
-import time
-import asyncio
 
-from framework.utility import create_logger, log_coroutine_exceptions
+from framework.utility import create_logger
+from framework.clock import Clock
 
 
 @dataclass
@@ -35,43 +34,49 @@ class ActuatorInterface(ABC):
     that you could give a channel and a time at which the watering should be
     executed - timing functions are implemented in the timecontrol plugin. An
     ActuatorInterface subclass will always take immediate action.
+
+    Actuators don't run coroutines of their own. They set a wakeup time and
+    the `ActuatorTimer` that is shared by all actuators calls `on_wakeup()`
+    once that time is reached, e.g. to switch the output on or off.
     """
 
     def __init__(self, managed_zones, display_name, config):
-        logger_config = config.get("logging", {})
-        self._should_launch_watering_coroutine = config.get("run_watering_coroutine", True)
+        # actuators in tests may be used without executing their tasks
+        self._executes_tasks = config.get("run_watering_coroutine", True)
         logger_name = __name__ + "." + self.__class__.__name__
-        self.logger = create_logger(logger_name, logger_config)
-
-        # Called when the state of the actuator updated. Will be handled by the
-        # predefined functions for timing and sleeping in this actuator. If
-        # those functions are not used, the callback has to be invoked by the
-        # subclass (i.e. actual actuator impelmentation) to inform the frontend
-        # about updated stated.
-        self.state_updated_callback = lambda: None
+        # the logger configuration is given by the config's "logging" key, as for the gpio interfaces
+        self.logger = create_logger(logger_name, config)
 
         self.display_name = display_name
         self.managed_zones = managed_zones
 
-        # watering coroutine related
-        self._watering_coroutine = None
-
-        # sleeping and event handling
-        self._evt = asyncio.Event()
+        # wakeup handling
+        self._timer = None
         self._sleep_until = None
 
-    def start_background_task(self):
-        """ Should the actuator need to run an async background task, it will
-        be created and launched here. """
-        if self._should_launch_watering_coroutine:
-            self._watering_coroutine = asyncio.create_task(
-                log_coroutine_exceptions(self.watering_execution_coroutine(), self.logger))
+        # If set to a list, every switching of a zone's output is appended to
+        # it as a tuple (unix time, zone, new state), e.g. by the simulation.
+        self.transition_trace = None
+
+    def attach_timer(self, timer):
+        """
+        Connects the actuator to the shared `ActuatorTimer`. Only then the
+        actuator is woken up and executes its tasks. A wakeup time that was
+        set before is handed to the timer.
+        """
+        if not self._executes_tasks:
+            return
+        self._timer = timer
+        if self._sleep_until is not None:
+            self._timer.schedule(self, self._sleep_until)
 
     @abstractmethod
-    async def watering_execution_coroutine(self):
-        """ Will be launched shortly after the backyardbot is started. """
-        # TODO: Introduce `should_shutdown` flag
-        pass
+    def on_wakeup(self):
+        """
+        Called by the timer once the wakeup time is reached. The wakeup time
+        is cleared before, so the actuator may set a new one.
+        """
+        raise NotImplementedError()
 
     @abstractmethod
     def start_watering(self, new_tasks: List[WateringTask]):
@@ -121,6 +126,24 @@ class ActuatorInterface(ABC):
         # Most actuators don't need cooldowns
         return 0
 
+    def get_watering_end_time(self) -> float:
+        """
+        Returns the unix time at which the watering of the current zone
+        ends. Frontends count down to it on their own.
+        """
+        return Clock.time() + self.get_remaining_time_current_zone()
+
+    def get_cooldown_end_time(self) -> float:
+        """ Returns the unix time at which the cooldown ends. """
+        return Clock.time() + self.get_remaining_cooldown_time()
+
+    def estimate_duration(self, tasks: List[WateringTask]) -> int:
+        """
+        Returns an estimate of how many seconds it takes to execute the
+        given tasks. Used to plan which actuators share a water source.
+        """
+        return sum(task.duration for task in tasks)
+
     # TODO: Should reading the water level be implemented by the actuator or should a sensor be maintained by a sensor plugin?
     # @abstractmethod
     # def get_remaining_water(self) -> float:
@@ -130,63 +153,19 @@ class ActuatorInterface(ABC):
     #     """
     #     return 1.0
 
-    # === Background Task Sleeping ===
-    # === ------------------------ ===
+    # === Output Tracing ===
 
-    async def sleep_until_timeout(self):
-        """
-        Will pause the execution of this coroutine while waiting for a
-        timeout. Execution can be resumed if the waiting time elapsed or the
-        waiting time was set to zero by another coroutine.
-        """
-        # wait for: ( event_triggered  or  time_up )
-        while True:
-            if self._sleep_until is None:
-                return
-            sleep_duration = max(0, self._sleep_until - time.time())
-            await self.state_updated_callback()
-            try:
-                # Wait until timeout runs out or event is triggered. Event
-                # trigger can be used to update the sleep duration.
-                await asyncio.wait_for(self._evt.wait(), sleep_duration)
-            except asyncio.TimeoutError:
-                pass
-
-            if not self._evt.is_set():
-                # Timeout ran out. Return
-                self._sleep_until = None
-                self.logger.debug("sleep_until_timeout - timeout ran out")
-                return
-
-            self.logger.debug("sleep_until_timeout - timeout duration updated")
-            # Event triggered. This means the timeout duration was updated.
-            # Clear event and continue.
-            self._evt.clear()
-
-    async def sleep_while_no_timout_set(self):
-        while True:
-            if self._sleep_until is not None:
-                self.logger.debug("sleep_while_no_timout_set - timeout duration added")
-                return
-            await self.state_updated_callback()
-            try:
-                # Wait until event is triggered. Event will be triggered by
-                # another coroutine if it sets a timeout.
-                await asyncio.wait_for(self._evt.wait(), None)
-            except asyncio.TimeoutError:
-                pass
-
-            # Clear event and continue. Will then return if a timeout is set.
-            self._evt.clear()
+    def record_transition(self, zone, state):
+        """ To be called by subclasses after they switched the output of a zone. """
+        if self.transition_trace is not None:
+            self.transition_trace.append((Clock.time(), zone, state))
+
+    # === Wakeup Time ===
+    # === ----------- ===
 
     def set_timeout(self, timeout_duration):
-        """
-        Sets a new timeout. A timeout is defined by the timestamp until which
-        the coroutine should sleep. The sleep duration is updated in the
-        watering coroutine as the event is set. The watering coroutine will
-        update the sleeping duration and continue to sleep.
-        """
-        self.set_wakeup_time(time.time() + timeout_duration)
+        """ Sets the wakeup time to `timeout_duration` seconds from now. """
+        self.set_wakeup_time(Clock.time() + timeout_duration)
 
     def add_to_timeout(self, additional_sleep_duration):
         if not self._sleep_until:
@@ -196,22 +175,28 @@ class ActuatorInterface(ABC):
 
     def set_wakeup_time(self, sleep_until):
         """
-        Sets a new timeout. A timeout is defined by the timestamp until which
-        the coroutine should sleep. The sleep duration is updated in the
-        watering coroutine as the event is set. The watering coroutine will
-        update the sleeping duration and continue to sleep.
+        Sets the unix time at which `on_wakeup()` is called next. Replaces
+        the previous wakeup time.
         """
         self._sleep_until = sleep_until
-        self._evt.set()
-        # sleep timeout will trigger, notice that the timeout duration has been updated and continue to sleep.
+        if self._timer is not None:
+            self._timer.schedule(self, sleep_until)
 
     def reset_timout(self):
-        """ Triggers the event and sets the timeout to zero, which will make
-        the sleep or wait for event coroutine return. """
+        """ Makes the timer call `on_wakeup()` right away. """
+        self.set_wakeup_time(Clock.time())
+
+    def clear_wakeup_time(self):
+        """ Removes the wakeup time, `on_wakeup()` won't be called. """
         self._sleep_until = None
-        self._evt.set()
+        if self._timer is not None:
+            self._timer.cancel(self)
 
     def get_duration_until_wakeup_time(self):
         if not self._sleep_until:
             return None
-        return self._sleep_until - time.time()
+        return self._sleep_until - Clock.time()
+
+    def _woken_up(self):
+        """ Called by the timer right before `on_wakeup()`. """
+        self._sleep_until = None
@@ -0,0 +1,127 @@
+#
+# actuator_timer.py
+# backyardbot
+#
+# Created: October 2026
+#
+
+import heapq
+import asyncio
+import itertools
+from framework.clock import Clock
+
+
+class ActuatorTimer:
+    """
+    Deadline scheduler shared by all actuators. Every actuator has at most
+    one wakeup time at which its `on_wakeup()` method is called, e.g. to
+    switch its output on or off. All wakeup times are kept in one heap and
+    only the earliest one is registered with the event loop, so the number
+    of actuators doesn't add coroutines or timeout handles.
+
+    After the actuators that were due have been woken up, `on_dispatch` is
+    called once with the list of these actuators.
+    """
+
+    def __init__(self, on_dispatch=None):
+        # entries: [wakeup time, insertion counter, actuator or None if cancelled]
+        self._heap = []
+        # actuator -> heap entry of its wakeup time
+        self._entries = {}
+        self._counter = itertools.count()
+        self._stale_count = 0
+        self._handle = None
+        self._handle_time = None
+        self.on_dispatch = on_dispatch or (lambda actuators: None)
+
+    # === Public Methods ===
+    # === -------------- ===
+
+    def schedule(self, actuator, wakeup_time):
+        """ Sets the unix time at which `actuator.on_wakeup()` is called. Replaces a previous wakeup time. """
+        self._invalidate(actuator)
+        entry = [wakeup_time, next(self._counter), actuator]
+        self._entries[actuator] = entry
+        heapq.heappush(self._heap, entry)
+        self._arm()
+
+    def cancel(self, actuator):
+        self._invalidate(actuator)
+        self._arm()
+
+    def get_wakeup_time(self, actuator):
+        """ Returns the actuator's wakeup time or `None` if it has none. """
+        entry = self._entries.get(actuator, None)
+        return entry[0] if entry is not None else None
+
+    def get_upcoming(self):
+        """ Returns a list of (wakeup time, actuator) tuples ordered by time. """
+        return sorted(((entry[0], entry[2]) for entry in self._entries.values()), key=lambda e: e[0])
+
+    def stop(self):
+        """ Cancels the registered event loop callback. Wakeup times are kept. """
+        if self._handle is not None:
+            self._handle.cancel()
+            self._handle = None
+            self._handle_time = None
+
+    # === Private Methods ===
+    # === --------------- ===
+
+    def _invalidate(self, actuator):
+        entry = self._entries.pop(actuator, None)
+        if entry is None:
+            return
+        entry[2] = None
+        self._stale_count += 1
+        if self._stale_count > len(self._entries):
+            self._heap = list(self._entries.values())
+            heapq.heapify(self._heap)
+            self._stale_count = 0
+
+    def _drop_stale_top(self):
+        while self._heap and self._heap[0][2] is None:
+            heapq.heappop(self._heap)
+            self._stale_count -= 1
+
+    def _arm(self):
+        """ Registers the earliest wakeup time with the event loop, if there is a running loop. """
+        self._drop_stale_top()
+        if not self._heap:
+            self.stop()
+            return
+        wakeup_time = self._heap[0][0]
+        if self._handle is not None and self._handle_time == wakeup_time:
+            return
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            # armed once the actuators are used within the event loop
+            return
+        self.stop()
+        self._handle_time = wakeup_time
+        self._handle = loop.call_at(loop.time() + max(0.0, wakeup_time - Clock.time()), self._dispatch)
+
+    def _dispatch(self):
+        self._handle = None
+        self._handle_time = None
+        now = Clock.time()
+        due = []
+        while self._heap and (self._heap[0][2] is None or self._heap[0][0] <= now):
+            _, _, actuator = heapq.heappop(self._heap)
+            if actuator is None:
+                self._stale_count -= 1
+                continue
+            del self._entries[actuator]
+            due.append(actuator)
+
+        # actuators may schedule their next wakeup from within `on_wakeup()`
+        for actuator in due:
+            actuator._woken_up()
+            try:
+                actuator.on_wakeup()
+            except Exception:
+                actuator.logger.exception("Exception while handling the wakeup of an actuator")
+        self._arm()
+        if due:
+            self.on_dispatch(due)
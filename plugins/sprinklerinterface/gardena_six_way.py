@@ -7,14 +7,15 @@
 # montebaur.tech, github.com/montioo
 #
 
-import time
 import asyncio
 from dataclasses import dataclass
 from typing import Set
 
 from plugins.sprinklerinterface.actuator import ActuatorInterface
-from plugins.sprinklerinterface.gpio import DebugGpioInterface, RaspiGpioInterface
+from plugins.sprinklerinterface.gpio import GpioInterface
 from framework.memory import Database
+from framework.clock import Clock
+from framework.utility import log_coroutine_exceptions
 
 
 @dataclass
@@ -32,6 +33,91 @@ class ChannelTask:
         return f"({self.channel}, {self.duration})"
 
 
+class ChannelSchedule:
+    """
+    Ring buffer with the durations for the channels of the six way water
+    distributor in the order in which the distributor switches through them,
+    starting at the head channel. A channel in between the head and the last
+    channel with a duration is watered at least `min_duration` seconds, which
+    switches the distributor to the next channel. The sum of these durations
+    is kept up to date, so adding to a channel, taking the head and querying
+    the remaining time don't depend on the number of channels.
+    """
+
+    def __init__(self, channel_count, min_duration):
+        self._durations = [0] * channel_count
+        self._channel_count = channel_count
+        self._min_duration = min_duration
+        # index of the head channel in _durations
+        self._head = 0
+        # number of channels from the head to the last channel with a duration
+        self._length = 0
+        # sum of the (padded) durations of these channels
+        self._total_duration = 0
+
+    def reset(self, head_channel):
+        """ Removes all durations and lets the schedule start at `head_channel`. """
+        self._durations = [0] * self._channel_count
+        self._head = head_channel - 1
+        self._length = 0
+        self._total_duration = 0
+
+    def add(self, channel, duration):
+        index = channel - 1
+        offset = (index - self._head) % self._channel_count
+        old_duration = self._durations[index]
+        self._durations[index] += duration
+        if offset < self._length:
+            self._total_duration += self._padded(old_duration + duration) - self._padded(old_duration)
+        else:
+            # channels between the previous last channel and this one are skipped quickly
+            self._total_duration += (offset - self._length) * self._min_duration + self._padded(duration)
+            self._length = offset + 1
+
+    def remove(self, channel):
+        """ Removes the duration of a channel. It may still be needed to skip over it. """
+        index = channel - 1
+        if (index - self._head) % self._channel_count >= self._length:
+            return
+        self._total_duration += self._min_duration - self._padded(self._durations[index])
+        self._durations[index] = 0
+        # channels at the end that are only skipped don't need to be switched to
+        while self._length and self._durations[(self._head + self._length - 1) % self._channel_count] == 0:
+            self._length -= 1
+            self._total_duration -= self._min_duration
+
+    def pop(self) -> ChannelTask:
+        """ Removes the head channel and returns its task. The next channel becomes the head. """
+        task = ChannelTask(self._head + 1, self._padded(self._durations[self._head]))
+        self._durations[self._head] = 0
+        self._total_duration -= task.duration
+        self._length -= 1
+        self._head = (self._head + 1) % self._channel_count
+        return task
+
+    @property
+    def head_channel(self):
+        return self._head + 1
+
+    @property
+    def total_duration(self):
+        return self._total_duration
+
+    def __len__(self):
+        return self._length
+
+    def __iter__(self):
+        for offset in range(self._length):
+            index = (self._head + offset) % self._channel_count
+            yield ChannelTask(index + 1, self._padded(self._durations[index]))
+
+    def __repr__(self):
+        return repr(list(self))
+
+    def _padded(self, duration):
+        return max(duration, self._min_duration)
+
+
 class SixWayActuator(ActuatorInterface):
     """
     Watering Handler for Gardena 6 Way Water Distributor.
@@ -47,12 +133,10 @@ class SixWayActuator(ActuatorInterface):
         """
         super().__init__(managed_zones, display_name, config)
 
-        if config.get("use_debug_gpio", False):
-            self._gpio = DebugGpioInterface([config["gpio_pin"]], config)
-        else:
-            self._gpio = RaspiGpioInterface([config["gpio_pin"]], config)
+        self._gpio = GpioInterface.create([config["gpio_pin"]], config)
 
         self._channel_state_db = Database.get_db_for(config["channel_state_db"])
+        self._channel_state_db_async = Database.get_async_db_for(config["channel_state_db"])
 
         self._active_channel = -1
         self._load_active_channel()
@@ -61,59 +145,60 @@ class SixWayActuator(ActuatorInterface):
         self._channel_count = len(managed_zones)
         self._zone_channel_mapping = {z: i+1 for i, z in enumerate(managed_zones)}
 
-        self._watering_tasks = []
-
         self._watering_stop_time = 0
         self._cooldown_duration = config["cooldown_duration"]
 
+        self._watering_tasks = ChannelSchedule(self._channel_count, self._cooldown_duration)
+        self._watering_tasks.reset(self._active_channel)
+
     # === Private methods ===
     # === --------------- ===
 
-    async def watering_execution_coroutine(self):
+    def on_wakeup(self):
         """
-        Method that will run forever in a separate thread and take care
-        of the actual watering. It will read tasks from the list that this
-        class holds.
+        Called by the shared actuator timer at the next deadline: the end of
+        the current channel's watering or the end of the cooldown after the
+        last watering. Both are moved by `update_watering_tasks(..)` and
+        `stop_watering(..)`.
         """
-        # TODO: Adapt to use advantages of new ActuatorInterface
-        while True:
-
-            if not self._watering_tasks or \
-               self._watering_stop_time + self._cooldown_duration > time.time():
-                await asyncio.sleep(1)
-                continue
-
-            self._watering_stop_time = time.time()
-            self._gpio.set_state(self._gpio_pin, 1)
-            self.logger.debug(f"Activated watering on channel {self._active_channel}, scheduled tasks: {self._watering_tasks}")
-
-            while True:
+        if self.is_watering_active():
+            self._watering_stop_time = Clock.time()
+            self._gpio.set_state(self._gpio_pin, 0)
+            self.record_transition(self._get_active_zone(), 0)
+            self.logger.info("Done watering.")
+            self._increase_watering_channel()
+            if self._watering_tasks:
+                self.set_wakeup_time(self._watering_stop_time + self._cooldown_duration)
+            return
 
-                if self._watering_tasks and \
-                   self._watering_tasks[0].channel == self._active_channel:
+        if not self._watering_tasks:
+            return
 
-                    current_task = self._watering_tasks.pop(0)
-                    self._watering_stop_time += current_task.duration
-                    await self.state_updated_callback()
-                    self.logger.info(f"Found new watering task for current channel: {current_task}")
+        self._watering_stop_time = Clock.time()
+        self._gpio.set_state(self._gpio_pin, 1)
+        self.record_transition(self._get_active_zone(), 1)
+        self.logger.debug(f"Activated watering on channel {self._active_channel}, scheduled tasks: {self._watering_tasks}")
 
-                await asyncio.sleep(1)
+        self._take_active_channel_task()
+        self.set_wakeup_time(self._watering_stop_time)
 
-                if time.time() > self._watering_stop_time:
-                    self.logger.info("Done watering.")
-                    break
+    # === utility ===
 
-            self._gpio.set_state(self._gpio_pin, 0)
-            self._increase_watering_channel()
-            await self.state_updated_callback()
+    def _get_active_zone(self):
+        return self.managed_zones[self._active_channel - 1]
 
-    # === utility ===
+    def _take_active_channel_task(self):
+        """ Adds the duration of a task for the active channel to the running watering. """
+        if self._watering_tasks and self._watering_tasks.head_channel == self._active_channel:
+            current_task = self._watering_tasks.pop()
+            self._watering_stop_time += current_task.duration
+            self.logger.info(f"Found new watering task for current channel: {current_task}")
 
     def _increase_watering_channel(self):
         self._active_channel += 1
         if self._active_channel > self._channel_count:
             self._active_channel = 1
-        self._store_active_channel()
+        asyncio.create_task(log_coroutine_exceptions(self._store_active_channel(), self.logger))
         self.logger.info(f"Active watering channel: {self._active_channel}")
 
     def _load_active_channel(self):
@@ -128,9 +213,9 @@ class SixWayActuator(ActuatorInterface):
             self._active_channel = db_contents[0]["active_channel"]
             self.logger.info(f"Loaded last active channel from db: {self._active_channel}")
 
-    def _store_active_channel(self):
+    async def _store_active_channel(self):
         # table has active channel in it => overwrite
-        self._channel_state_db.update({"active_channel": self._active_channel})
+        await self._channel_state_db_async.update({"active_channel": self._active_channel})
 
     # === Public methods ===
     # === -------------- ===
@@ -156,51 +241,54 @@ class SixWayActuator(ActuatorInterface):
             self.update_watering_tasks(channel_tasks)
 
     def update_watering_tasks(self, new_tasks=[]):
-        # create dict with durations from new and planned tasks. (no need to look at
-        #   current task, because this was 'transfered' to self.watering_stop_time)
-        tasks_dict = {i: 0 for i in range(1, self._channel_count+1)}
-        for task in new_tasks + self._watering_tasks:
+        """
+        Adds the durations of the new tasks to the channel schedule. Tasks
+        for the channel that is watered at the moment extend the watering.
+        """
+        watering_active = self.is_watering_active()
+        if not self._watering_tasks and not watering_active:
+            self._watering_tasks.reset(self._active_channel)
+
+        for task in new_tasks:
             if task.channel < 0 or task.channel > self._channel_count or task.duration <= 0:
                 continue
             if task.channel != 0:
-                # if task.channel == self._active_channel or task.duration > self._cooldown_duration:
-                if task.duration > self._cooldown_duration:
-                    tasks_dict[task.channel] += task.duration
+                # short tasks for single channels are dropped as a channel can't be watered shorter than the cooldown
+                if task.duration <= self._cooldown_duration:
+                    continue
+                channels = [task.channel]
             else:
-                for i in range(1, self._channel_count+1):
-                    tasks_dict[i] += task.duration
-
-        tasks = [ChannelTask(c, tasks_dict[c]) for c in range(1, self._channel_count+1)]
-        ordered_tasks = tasks[self._active_channel-1:] + tasks[:self._active_channel-1]
+                channels = range(1, self._channel_count+1)
 
-        # create list and sort it to
-        final_tasks = []
-        for task in reversed(ordered_tasks):
-            if not final_tasks and task.duration == 0:
-                continue
-            allow_current_padding = task.channel != self._active_channel or not self.is_watering_active()
-            if task.duration < self._cooldown_duration and allow_current_padding:
-                final_tasks.append(ChannelTask(task.channel, self._cooldown_duration))
-                continue
-            final_tasks.append(task)
-        self._watering_tasks = list(reversed(final_tasks))
+            for channel in channels:
+                if watering_active and channel == self._active_channel:
+                    self._watering_stop_time += task.duration
+                else:
+                    self._watering_tasks.add(channel, task.duration)
         self.logger.debug(f"Updated watering tasks: {self._watering_tasks}")
 
+        if watering_active:
+            # extends the running watering right away
+            self.set_wakeup_time(self._watering_stop_time)
+        elif self._watering_tasks and self._sleep_until is None:
+            # wakes up the actuator once the cooldown is over
+            self.set_wakeup_time(max(Clock.time(), self._watering_stop_time + self._cooldown_duration))
+
     def stop_watering(self, zones: Set[str]):
         channels_to_stop = {self._zone_channel_mapping[z] for z in zones if z in self._zone_channel_mapping}
         if not channels_to_stop:
             # stop all zones if no zones are given
-            self._watering_tasks = []
+            self._watering_tasks.reset(self._watering_tasks.head_channel)
             self.logger.info("Stop watering for all zones")
         else:
             # remove zones in question from watering tasks
-            self._watering_tasks = [wt for wt in self._watering_tasks if wt.channel not in channels_to_stop]
+            for channel in channels_to_stop:
+                self._watering_tasks.remove(channel)
             self.logger.info(f"Stop watering for channels: {channels_to_stop}")
-        if self._active_channel in channels_to_stop:
+        if self._active_channel in channels_to_stop and self.is_watering_active():
             # if channel is active, stop the watering for this zone.
-            self._watering_stop_time = time.time()
-        if self._watering_tasks:
-            self.update_watering_tasks()
+            self._watering_stop_time = Clock.time()
+            self.set_wakeup_time(self._watering_stop_time)
 
     # === system state info ===
 
@@ -215,22 +303,29 @@ class SixWayActuator(ActuatorInterface):
         return self.is_watering_active() or self._watering_tasks
 
     def get_remaining_time_current_zone(self):
-        return max(0, int(self._watering_stop_time - time.time()))
+        return max(0, int(self._watering_stop_time - Clock.time()))
 
     def get_remaining_time_all_zones(self):
         if not self._watering_tasks:
             return 0
-        duration = self.get_remaining_time_current_zone()
-        for task in self._watering_tasks:
-            duration += task.duration
-        duration += self._cooldown_duration * len(self._watering_tasks)
-        return duration
+        return self.get_remaining_time_current_zone() + self._watering_tasks.total_duration \
+            + self._cooldown_duration * len(self._watering_tasks)
+
+    def estimate_duration(self, tasks):
+        # every watering is followed by a cooldown, switching channels isn't included
+        return sum(max(task.duration, self._cooldown_duration) + self._cooldown_duration for task in tasks)
 
     def get_current_zone(self):
         return self._active_channel
 
+    def get_watering_end_time(self):
+        return self._watering_stop_time
+
+    def get_cooldown_end_time(self):
+        return self._watering_stop_time + self._cooldown_duration
+
     def get_remaining_cooldown_time(self):
-        t = time.time()
+        t = Clock.time()
         lower_bound = self._watering_stop_time
         upper_bound = self._watering_stop_time + self._cooldown_duration
         if lower_bound < t < upper_bound:
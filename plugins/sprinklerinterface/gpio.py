@@ -25,6 +25,20 @@ except:
 class GpioInterface:
     """ Interface that defines interactions with GPIO ports. """
 
+    # Set by the simulation to never switch real GPIO ports.
+    simulated = False
+
+    @classmethod
+    def create(cls, pins, config):
+        """
+        Creates the GPIO interface that an actuator's config asks for. Uses
+        the debug implementation if `use_debug_gpio` is set or if running in
+        a simulation.
+        """
+        if config.get("use_debug_gpio", False) or GpioInterface.simulated:
+            return DebugGpioInterface(pins, config)
+        return RaspiGpioInterface(pins, config)
+
     def __init__(self, pins, logger_config={}):
         """ Set pin to output pin and so on. """
         # config is only necessary to define the logger
@@ -8,7 +8,8 @@
 #
 
 from plugins.sprinklerinterface.actuator import ActuatorInterface, WateringTask
-from plugins.sprinklerinterface.gpio import DebugGpioInterface, RaspiGpioInterface
+from plugins.sprinklerinterface.gpio import GpioInterface
+from framework.clock import Clock
 from typing import List, Optional, Set
 
 
@@ -19,8 +20,8 @@ class SingleActuator(ActuatorInterface):
     communicate with other actuators. This means, that if five instances of
     this actuator are active at the same time, the waterpressure might drop
     significantly and reach a point where driving a sprinkler is not really
-    possible. To have only one actuator active at a time, look the
-    MultiActuator class.
+    possible. To limit how many actuators are active at a time, assign them
+    a water source with a flow budget in the plugin's settings.
     """
 
     def __init__(self, managed_zones, display_name, config):
@@ -28,42 +29,47 @@ class SingleActuator(ActuatorInterface):
 
         self.gpio_pin = config["gpio_pin"]
 
-        if config.get("use_debug_gpio", False):
-            self._gpio = DebugGpioInterface([self.gpio_pin], config)
-        else:
-            self._gpio = RaspiGpioInterface([self.gpio_pin], config)
-
-    async def watering_execution_coroutine(self):
-        """ Is active as long as there are tasks. """
-        while True:
-            self.logger.debug("Waiting for timeout to be set.")
-            await self.sleep_while_no_timout_set()
+        self._gpio = GpioInterface.create([self.gpio_pin], config)
+        self._watering_end_time = 0
 
-            # Timeout was set -> activate watering
+    def on_wakeup(self):
+        """ Switches the output on when new tasks arrived and off once their duration is over. """
+        if not self.is_watering_active() and self._watering_end_time > Clock.time():
             self._gpio.set_state(self.gpio_pin, 1)
-            self.logger.debug("Activated GPIO. Waiting for timeout to end.")
+            self.record_transition(self.managed_zones[0], 1)
+            self.logger.debug("Activated GPIO. Waiting for watering to end.")
+            self.set_wakeup_time(self._watering_end_time)
+            return
 
-            await self.sleep_until_timeout()
-
-            self.logger.debug("Timout ended. Will stop watering.")
-            self._gpio.set_state(self.gpio_pin, 0)
+        self.logger.debug("Watering duration is over. Will stop watering.")
+        self._gpio.set_state(self.gpio_pin, 0)
+        self.record_transition(self.managed_zones[0], 0)
 
     def start_watering(self, new_tasks: List[WateringTask]):
         """
-        Adds the durations of the arrived tasks to the timeout for the
-        watering coroutine. But only if the zone in the task matches the zone
-        that this actuator manages.
+        Adds the durations of the arrived tasks to the end of the watering.
+        But only if the zone in the task matches the zone that this actuator
+        manages.
         """
         self.logger.info(f"Received new watering tasks: {new_tasks}")
-        for nt in new_tasks:
-            if nt.zone == self.managed_zones[0]:
-                self.add_to_timeout(nt.duration)
+        durations = [nt.duration for nt in new_tasks if nt.zone == self.managed_zones[0]]
+        if not durations:
+            return
+        self._watering_end_time = max(self._watering_end_time, Clock.time()) + sum(durations)
+        if self.is_watering_active():
+            self.set_wakeup_time(self._watering_end_time)
+        else:
+            # switches the output on right away
+            self.reset_timout()
 
     def stop_watering(self, zones=Set[str]):
         if self.managed_zones[0] in zones:
-            # sets the timeout to zero, thus making sleep_until_timeout()
-            # return in the execution coroutine
-            self.reset_timout()
+            # ends the watering, the timer switches the output off right away
+            self._watering_end_time = Clock.time()
+            if self.is_watering_active():
+                self.reset_timout()
+            else:
+                self.clear_wakeup_time()
 
     # === system state info ===
 
@@ -77,7 +83,12 @@ class SingleActuator(ActuatorInterface):
 
     def get_remaining_time_current_zone(self) -> int:
         """ Returns the remaining watering duration for the current zone in seconds. """
-        return self.get_duration_until_wakeup_time()
+        if not self.is_watering_active():
+            return 0
+        return max(0, int(self._watering_end_time - Clock.time()))
+
+    def get_watering_end_time(self) -> float:
+        return self._watering_end_time
 
     def get_remaining_time_all_zones(self) -> int:
         """ Returns the remaining watering duration for all zones in seconds. """
@@ -9,34 +9,48 @@
 
 
 class ZoneDisplayTimer {
-    // Constructs a timer that will count down a number of seconds an update its
-    // time as a string in a html tag with a certain id. The id is randomly
-    // generated when the object is created and it's the responsibility of the
-    // code that initializes the timer to create an object with the
-    // corresponding id.
-
-    constructor(start_time_sec) {
+    // Constructs a timer that will count down to a deadline and update the
+    // remaining time as a string in a html tag with a certain id. The id is
+    // randomly generated when the object is created and it's the
+    // responsibility of the code that initializes the timer to create an
+    // object with the corresponding id.
+    // end_time: unix time in seconds on the server's clock
+    // clock_offset: seconds that the server's clock is ahead of this one
+
+    constructor(end_time, clock_offset) {
         this.time_content_div_id = this.make_id(8);
-        this.remaining_time = start_time_sec;
+        this.end_time = end_time;
+        this.clock_offset = clock_offset;
+        this.remaining_time = this.compute_remaining_time();
 
         // Bind the method like this to make `this` refer to the class instance
         this.timer = setInterval(this.update_displayed_time.bind(this), 1000);
     }
 
+    compute_remaining_time() {
+        // computed from the deadline, so late intervals don't add up
+        const server_now = Date.now() / 1000 + this.clock_offset;
+        return Math.max(0, Math.round(this.end_time - server_now));
+    }
+
     update_displayed_time() {
         // Normally when called by setInterval, `this` will refer to window.
         // Circumvent by binding `this` to the class instance.
 
-        this.remaining_time -= 1;
+        this.remaining_time = this.compute_remaining_time();
         const timer_div = document.getElementById(this.time_content_div_id);
         if (timer_div != null) {
             timer_div.innerHTML = this.build_remaining_time_str();
         }
         if (this.remaining_time <= 0) {
-            clearInterval(this.timer);
+            this.stop();
         }
     }
 
+    stop() {
+        clearInterval(this.timer);
+    }
+
     build_remaining_time_str() {
         var time_str = "";
         const min = Math.floor(this.remaining_time / 60);
@@ -90,15 +104,20 @@ class SprinklerInterfacePlugin extends BybPluginInterface {
         }
     }
 
-    display_updated_watering_state(actuator_states) {
+    display_updated_watering_state(state) {
+        // Timers of the previous state would otherwise keep running.
+        for (var old_timer of this.zone_timers) {
+            old_timer.stop();
+        }
         this.zone_timers = [];
+
+        const clock_offset = bybConnection.clock_offset;
         var d = "";
-        for (var actuator_state of actuator_states) {
+        for (var actuator_state of state["actuators"]) {
             const description = actuator_state["description"];
-            const remaining_time = actuator_state["remaining_time"];
-            if (remaining_time != null) {
-                console.log("received update with remaining time:", Math.round(remaining_time));
-                const timer = new ZoneDisplayTimer(Math.round(remaining_time));
+            const end_time = actuator_state["end_time"];
+            if (end_time != null) {
+                const timer = new ZoneDisplayTimer(end_time, clock_offset);
                 d += description + '<span id="' + timer.time_content_div_id + '">' + timer.build_remaining_time_str() + "</span><br>";
                 this.zone_timers.push(timer);
             } else {
@@ -7,12 +7,17 @@
 # montebaur.tech, github.com/montioo
 #
 
+import asyncio
 from framework.plugin import Plugin
 from framework.memory import Database
 from framework.communication import Topics, BaseMessage
+from framework.message_queue import PRIORITY_HIGH
+from framework.utility import log_coroutine_exceptions
 from byb.byb_common import TOPIC_START_WATERING, ZONE_DB_NAME, TOPIC_ZONES_UPDATED, ZonesUpdatedPayload
 
 from plugins.sprinklerinterface.actuator import WateringTask
+from plugins.sprinklerinterface.actuator_timer import ActuatorTimer
+from plugins.sprinklerinterface.water_source_planner import WaterSourcePlanner
 from plugins.sprinklerinterface.single_actuator import SingleActuator
 from plugins.sprinklerinterface.gardena_six_way import SixWayActuator
 
@@ -32,6 +37,8 @@ class WateringPlugin(Plugin):
     - Take lists of zones and durations and call actuators
     - asyncio events to start/stop watering and no loops with sleep(1)
     """
+    # render data only contains the zones, which are updated in `_update_zone_db(..)`
+    tracks_render_data_changes = True
 
     def initialize(self, settings):
         self._command_handlers = {
@@ -42,22 +49,30 @@ class WateringPlugin(Plugin):
         # IDEA: Expand websocket communication so that frontend js can send to any topic?
         self.zone_db = Database.get_db_for(ZONE_DB_NAME)
 
+        # Commands to start or stop watering control the hardware and are
+        # handled before other messages.
         ws_backend_topic = f"websocket/{self.name}/backend"
-        self.register_topic_callback(ws_backend_topic, self.ws_message_from_frontend)
+        self.register_topic_callback(ws_backend_topic, self.ws_message_from_frontend, priority=PRIORITY_HIGH)
 
         ws_new_client_topic = "websocket/new_client"
         self.register_topic_callback(ws_new_client_topic, self.new_ws_client)
 
-        self.register_topic_callback(TOPIC_START_WATERING, self.start_watering_callback_topic)
+        self.register_topic_callback(TOPIC_START_WATERING, self.start_watering_callback_topic, priority=PRIORITY_HIGH)
         self.actuators = []
+        self._sent_actuator_states = None
+        # one timer wakes up all actuators, no coroutine per actuator
+        self.timer = ActuatorTimer(on_dispatch=self.actuators_woken_up)
+        # holds back tasks for actuators whose water source is at its limit
+        self.planner = WaterSourcePlanner.from_settings(self.settings["plugin_settings"])
         zones = self._initialize_actuators()
         self._update_zone_db(zones)
 
     async def event_loop(self):
         for actuator in self.actuators:
-            actuator.start_background_task()
+            actuator.attach_timer(self.timer)
 
         await self.spin()
+        self.timer.stop()
 
     # === WebSocket Interaction ===
 
@@ -90,9 +105,18 @@ class WateringPlugin(Plugin):
         if not isinstance(data, list):
             return
         zones_to_stop = set(data if data else self.zones)
+        self.planner.remove_zones(zones_to_stop)
         for actuator in self.actuators:
             # only hand zones to the actuator that it manages
             actuator.stop_watering(set(actuator.managed_zones) & zones_to_stop)
+        # actuators that are woken up by the timer free their water when woken up
+        startable = []
+        for actuator in self.actuators:
+            if not actuator.are_tasks_left() and actuator.get_duration_until_wakeup_time() is None:
+                startable += self.planner.release(actuator)
+        self._start_actuators(startable)
+        # removing queued or waiting tasks doesn't wake up an actuator, which would send the state
+        await self.send_state_update_to_clients()
 
     async def new_ws_client(self, msg):
         """ Sends the current system state only to the new websocket client. """
@@ -100,12 +124,14 @@ class WateringPlugin(Plugin):
 
     async def send_state_update_to_clients(self, ws_id=-1):
         actuator_states = self.get_actuator_states()
-        msg = {
-            "command": "update_frontend_state",
-            "payload": actuator_states
-        }
+        if ws_id == -1 and actuator_states == self._sent_actuator_states:
+            # deadlines didn't move, the frontends keep counting down on their own
+            return
+        # a state for a single client reaches the others as well, see `Plugin.send_state(..)`
+        self._sent_actuator_states = actuator_states
         # self.logger.info("compiled state:", actuator_states)
-        await self.send_to_clients(msg, ws_id)
+        # the server's time is sent along with the state, see `Plugin.send_state(..)`
+        await self.send_state("update_frontend_state", {"actuators": actuator_states}, ws_id)
 
     # === Topic Callbacks ===
 
@@ -134,13 +160,25 @@ class WateringPlugin(Plugin):
             else:
                 self.logger.warn(f"Received task for unknown zone: {task}")
 
-        # hand collected task lists to actuators
+        # hand collected task lists to actuators once their water source allows it
+        startable = []
         for actuator in self.actuators:
             new_task_list = task_mapping[actuator.managed_zones[0]]
-            actuator.start_watering(new_task_list)
+            startable += self.planner.submit(actuator, new_task_list)
+        self._start_actuators(startable)
 
         # Frontends are informed about updated watering state as soon as
-        # actuators start doing the actual watering.
+        # actuators start doing the actual watering. Tasks that extend a
+        # running watering move its end time right away.
+        await self.send_state_update_to_clients()
+
+    def _start_actuators(self, startable):
+        """ Hands tasks to actuators. Actuators that drop all of their tasks free their water right away. """
+        while startable:
+            actuator, tasks = startable.pop(0)
+            actuator.start_watering(tasks)
+            if not actuator.are_tasks_left() and actuator.get_duration_until_wakeup_time() is None:
+                startable += self.planner.release(actuator)
 
     # === Actuator and Zone Setup ===
 
@@ -162,7 +200,7 @@ class WateringPlugin(Plugin):
             display_name = actuator_config.get("display_name", actuator_class_name)
             actuator_specific_settings = actuator_config.get("actuator_specific_settings", {})
             actuator = actuator_implementations[actuator_class_name](managed_zones, display_name, actuator_specific_settings)
-            actuator.state_updated_callback = self.actuator_state_updated
+            self.planner.add_actuator(actuator, actuator_config.get("water_source", None), actuator_config.get("flow_rate", 0))
             self.actuators.append(actuator)
 
         return all_zones
@@ -184,30 +222,38 @@ class WateringPlugin(Plugin):
             Topics.send_message(m)
 
         self.zones = sorted(new_zones)
+        self.mark_render_data_changed()
 
     # === Frontend Data ===
 
     def get_actuator_states(self):
+        """
+        Describes the state of every actuator. Running waterings and cooldowns
+        come with the unix time at which they end (`end_time`), so frontends
+        count down on their own and only need an update when the state changes.
+        """
         actuator_states = []
 
         for actuator in self.actuators:
 
             # building descriptive string
             desc = f"{actuator.display_name}: "
-            remaining_time = None
+            end_time = None
 
             if actuator.is_watering_active():
                 desc += f"Watering Zone {actuator.get_current_zone()}, remaining time:"
-                remaining_time = actuator.get_remaining_time_current_zone()
+                end_time = actuator.get_watering_end_time()
             elif actuator.is_watering_cooldown_active():
                 desc += "Cooldown active:"
-                remaining_time = actuator.get_remaining_cooldown_time()
+                end_time = actuator.get_cooldown_end_time()
+            elif self.planner.is_waiting(actuator):
+                desc += self.localization["actuator_state_waiting_label"]
             else:
                 # watering is off:
                 desc += self.localization["actuator_state_off_label"]
 
             # dict for a state per actuator:
-            state_dict = {"description": desc, "remaining_time": remaining_time}
+            state_dict = {"description": desc, "end_time": end_time}
             actuator_states.append(state_dict)
 
         return actuator_states
@@ -217,10 +263,21 @@ class WateringPlugin(Plugin):
             "zones": self.zones
         }
 
+    def get_upcoming_transitions(self):
+        """ Returns a list of (unix time, actuator display name) for the next wakeup of each actuator. """
+        return [(t, actuator.display_name) for t, actuator in self.timer.get_upcoming()]
+
+    def get_stats(self):
+        upcoming = [{"time": t, "actuator": name} for t, name in self.get_upcoming_transitions()]
+        return {**super().get_stats(), "upcoming_transitions": upcoming}
+
     # === Actuator State Callback ===
 
-    async def actuator_state_updated(self):
-        # Launch new coroutine here to not block execution? No, because the
-        # actuator will wait for the next time after the watering state
-        # changed.
-        await self.send_state_update_to_clients()
+    def actuators_woken_up(self, actuators):
+        """ Called by the timer once per batch of actuators that were woken up at the same time. """
+        startable = []
+        for actuator in actuators:
+            if not actuator.are_tasks_left():
+                startable += self.planner.release(actuator)
+        self._start_actuators(startable)
+        asyncio.create_task(log_coroutine_exceptions(self.send_state_update_to_clients(), self.logger))
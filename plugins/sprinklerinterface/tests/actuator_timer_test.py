@@ -0,0 +1,112 @@
+#
+# actuator_timer_test.py
+# backyardbot
+#
+# Created: October 2026
+#
+
+import asyncio
+import logging
+import unittest
+from plugins.sprinklerinterface.actuator_timer import ActuatorTimer
+from framework.clock import Clock, VirtualTimeEventLoop
+
+
+class RecordingActuator:
+    """ Stands in for an actuator and records the times at which it was woken up. """
+
+    def __init__(self, name, wakeups, follow_up=None):
+        self.name = name
+        self.wakeups = wakeups
+        self.follow_up = follow_up
+        self.timer = None
+        self.logger = logging.getLogger(name)
+
+    def _woken_up(self):
+        pass
+
+    def on_wakeup(self):
+        self.wakeups.append((Clock.time(), self.name))
+        if self.follow_up is not None:
+            self.timer.schedule(self, Clock.time() + self.follow_up)
+            self.follow_up = None
+
+
+class TestActuatorTimer(unittest.TestCase):
+
+    def setUp(self):
+        self.loop = VirtualTimeEventLoop(0)
+        Clock.set_time_source(self.loop.wall_time)
+        self.wakeups = []
+        self.dispatches = []
+        self.timer = ActuatorTimer(on_dispatch=self.dispatches.append)
+
+    def tearDown(self):
+        self.timer.stop()
+        Clock.set_time_source(None)
+        self.loop.close()
+
+    def create_actuator(self, name, follow_up=None):
+        actuator = RecordingActuator(name, self.wakeups, follow_up)
+        actuator.timer = self.timer
+        return actuator
+
+    def run_for(self, duration, scenario=None):
+        async def main():
+            if scenario is not None:
+                scenario()
+            await asyncio.sleep(duration)
+        self.loop.run_until_complete(main())
+
+    def test_wakeups_are_ordered(self):
+        a, b, c = self.create_actuator("a"), self.create_actuator("b"), self.create_actuator("c")
+
+        def scenario():
+            self.timer.schedule(a, 30)
+            self.timer.schedule(b, 10)
+            self.timer.schedule(c, 20)
+            self.assertEqual(self.timer.get_upcoming(), [(10, b), (20, c), (30, a)])
+
+        self.run_for(100, scenario)
+        self.assertEqual(self.wakeups, [(10, "b"), (20, "c"), (30, "a")])
+        self.assertEqual(self.timer.get_upcoming(), [])
+
+    def test_reschedule_and_cancel(self):
+        a, b = self.create_actuator("a"), self.create_actuator("b")
+
+        def scenario():
+            self.timer.schedule(a, 10)
+            self.timer.schedule(b, 20)
+            # only the latest wakeup time of an actuator is used
+            self.timer.schedule(a, 40)
+            self.timer.cancel(b)
+            self.assertIsNone(self.timer.get_wakeup_time(b))
+
+        self.run_for(100, scenario)
+        self.assertEqual(self.wakeups, [(40, "a")])
+
+    def test_simultaneous_wakeups_are_dispatched_together(self):
+        a, b = self.create_actuator("a", follow_up=5), self.create_actuator("b")
+
+        def scenario():
+            self.timer.schedule(a, 10)
+            self.timer.schedule(b, 10)
+
+        self.run_for(100, scenario)
+        self.assertEqual(self.wakeups, [(10, "a"), (10, "b"), (15, "a")])
+        self.assertEqual(self.dispatches, [[a, b], [a]])
+
+    def test_many_reschedules_keep_heap_small(self):
+        actuators = [self.create_actuator(str(i)) for i in range(5)]
+
+        def scenario():
+            for t in range(1000):
+                self.timer.schedule(actuators[t % 5], 1000 - t)
+
+        self.run_for(2000, scenario)
+        self.assertLessEqual(len(self.timer._heap), 10)
+        self.assertEqual([name for _, name in self.wakeups], ["4", "3", "2", "1", "0"])
+
+
+if __name__ == "__main__":
+    unittest.main()
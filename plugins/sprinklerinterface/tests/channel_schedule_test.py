@@ -0,0 +1,73 @@
+#
+# channel_schedule_test.py
+# backyardbot
+#
+# Created: October 2026
+#
+
+import random
+import unittest
+from plugins.sprinklerinterface.gardena_six_way import ChannelSchedule, ChannelTask
+
+
+def rebuild_task_list(tasks, new_tasks, head_channel, channel_count, cooldown):
+    """ How the six way actuator merged its tasks before the channel schedule was used. """
+    tasks_dict = {i: 0 for i in range(1, channel_count+1)}
+    for task in new_tasks + tasks:
+        if task.duration > cooldown:
+            tasks_dict[task.channel] += task.duration
+
+    ordered = [ChannelTask(c, tasks_dict[c]) for c in range(1, channel_count+1)]
+    ordered = ordered[head_channel-1:] + ordered[:head_channel-1]
+    final_tasks = []
+    for task in reversed(ordered):
+        if not final_tasks and task.duration == 0:
+            continue
+        final_tasks.append(ChannelTask(task.channel, max(task.duration, cooldown)))
+    return list(reversed(final_tasks))
+
+
+class TestChannelSchedule(unittest.TestCase):
+
+    def test_matches_rebuilt_task_list(self):
+        rng = random.Random(20)
+        channel_count, cooldown = 6, 7
+        schedule = ChannelSchedule(channel_count, cooldown)
+        schedule.reset(3)
+        tasks, head = [], 3
+
+        for _ in range(5000):
+            action = rng.random()
+            if action < 0.6:
+                task = ChannelTask(rng.randint(1, channel_count), rng.choice([cooldown + 1, 20, 60, 300]))
+                schedule.add(task.channel, task.duration)
+                tasks = rebuild_task_list(tasks, [task], head, channel_count, cooldown)
+            elif action < 0.8:
+                channel = rng.randint(1, channel_count)
+                schedule.remove(channel)
+                tasks = [t for t in tasks if t.channel != channel]
+                tasks = rebuild_task_list(tasks, [], head, channel_count, cooldown)
+            elif tasks:
+                self.assertEqual(schedule.pop(), tasks.pop(0))
+                head = head % channel_count + 1
+
+            self.assertEqual(list(schedule), tasks)
+            self.assertEqual(len(schedule), len(tasks))
+            self.assertEqual(schedule.total_duration, sum(t.duration for t in tasks))
+            if tasks:
+                self.assertEqual(schedule.head_channel, tasks[0].channel)
+
+    def test_skipped_channels_are_padded(self):
+        schedule = ChannelSchedule(4, 7)
+        schedule.reset(2)
+        schedule.add(1, 30)
+        self.assertEqual(list(schedule), [ChannelTask(2, 7), ChannelTask(3, 7), ChannelTask(4, 7), ChannelTask(1, 30)])
+        self.assertEqual(schedule.total_duration, 51)
+
+        schedule.remove(1)
+        self.assertEqual(list(schedule), [])
+        self.assertEqual(schedule.total_duration, 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -59,19 +59,19 @@ class TestSixWayActuator(unittest.TestCase):
         task_correct_1 = [CT(3, 20), CT(4, 85), CT(1, 35), CT(2, 20)]
 
         self.actuator.start_watering(task_input_1)
-        self.assertEqual(self.actuator._watering_tasks, task_correct_1)
+        self.assertEqual(list(self.actuator._watering_tasks), task_correct_1)
 
         task_input_2 = [WT("Z4", 45), WT("Z4", -20), WT("Z1", 15), WT("Z3", 15)]
         task_correct_2 = [CT(3, 35), CT(4, 130), CT(1, 50), CT(2, 20)]
 
         self.actuator.start_watering(task_input_2)
-        self.assertEqual(self.actuator._watering_tasks, task_correct_2)
+        self.assertEqual(list(self.actuator._watering_tasks), task_correct_2)
 
         task_input_3 = [WT("Z1", 20), WT("Z2", 20), WT("Z3", 20), WT("Z4", 20)]  # replacing WT(0, 20),
         task_correct_3 = [CT(3, 55), CT(4, 150), CT(1, 70), CT(2, 40)]
 
         self.actuator.start_watering(task_input_3)
-        self.assertEqual(self.actuator._watering_tasks, task_correct_3)
+        self.assertEqual(list(self.actuator._watering_tasks), task_correct_3)
 
     def test_watering_list2(self):
         """ Tests padding with short activations and replacing those later. """
@@ -81,13 +81,13 @@ class TestSixWayActuator(unittest.TestCase):
         task_correct_1 = [CT(3, 7), CT(4, 7), CT(1, 7), CT(2, 20)]
 
         self.actuator.start_watering(task_input_1)
-        self.assertEqual(self.actuator._watering_tasks, task_correct_1)
+        self.assertEqual(list(self.actuator._watering_tasks), task_correct_1)
 
         task_input_2 = [WT("Z4", 15)]
         task_correct_2 = [CT(3, 7), CT(4, 15), CT(1, 7), CT(2, 20)]
 
         self.actuator.start_watering(task_input_2)
-        self.assertEqual(self.actuator._watering_tasks, task_correct_2)
+        self.assertEqual(list(self.actuator._watering_tasks), task_correct_2)
 
     def test_watering_list3(self):
         """ Tests stopping all zones. """
@@ -97,12 +97,12 @@ class TestSixWayActuator(unittest.TestCase):
         task_correct_1 = [CT(3, 20), CT(4, 20)]
 
         self.actuator.start_watering(task_input_1)
-        self.assertEqual(self.actuator._watering_tasks, task_correct_1)
+        self.assertEqual(list(self.actuator._watering_tasks), task_correct_1)
 
         self.actuator.stop_watering()
 
         task_correct_2 = []
-        self.assertEqual(self.actuator._watering_tasks, task_correct_2)
+        self.assertEqual(list(self.actuator._watering_tasks), task_correct_2)
 
     def test_watering_list4(self):
         """ Tests stopping individual zones. """
@@ -112,12 +112,12 @@ class TestSixWayActuator(unittest.TestCase):
         task_correct_1 = [CT(3, 20), CT(4, 20)]
 
         self.actuator.start_watering(task_input_1)
-        self.assertEqual(self.actuator._watering_tasks, task_correct_1)
+        self.assertEqual(list(self.actuator._watering_tasks), task_correct_1)
 
         self.actuator.stop_watering(zones=[1, 4])
 
         task_correct_2 = [CT(3, 20)]
-        self.assertEqual(self.actuator._watering_tasks, task_correct_2)
+        self.assertEqual(list(self.actuator._watering_tasks), task_correct_2)
 
 
 if __name__ == '__main__':
@@ -0,0 +1,84 @@
+#
+# six_way_execution_test.py
+# backyardbot
+#
+# Created: October 2026
+#
+
+import os
+import asyncio
+import tempfile
+import unittest
+from plugins.sprinklerinterface.gardena_six_way import SixWayActuator
+from plugins.sprinklerinterface.actuator import WateringTask
+from plugins.sprinklerinterface.actuator_timer import ActuatorTimer
+from framework.clock import Clock, VirtualTimeEventLoop
+from framework.memory import Database
+
+"""
+Runs the six way actuator with an actuator timer on virtual time and checks
+that outputs are switched exactly at the deadlines given by the durations
+and the cooldown.
+"""
+
+
+class TestSixWayExecution(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        Database.set_db_path(os.path.join(self.tmp_dir.name, "db.json"), write_behind=True)
+        self.start_time = 1000
+        self.loop = VirtualTimeEventLoop(self.start_time)
+        Clock.set_time_source(self.loop.wall_time)
+
+        actuator_config = {
+            "cooldown_duration": 7,
+            "use_debug_gpio": True,
+            "gpio_pin": 13,
+            "channel_state_db": "six_way_execution_test_db",
+            "logging": {"log_to_stream": False, "log_to_file": False}
+        }
+        self.actuator = SixWayActuator(["Z1", "Z2", "Z3"], "test", actuator_config)
+        self.actuator.transition_trace = []
+        self.dispatches = []
+        self.timer = ActuatorTimer(on_dispatch=self.dispatches.append)
+
+    def tearDown(self):
+        Clock.set_time_source(None)
+        self.loop.close()
+        self.tmp_dir.cleanup()
+
+    def run_actuator(self, scenario):
+        async def main():
+            self.actuator.attach_timer(self.timer)
+            await scenario()
+            self.timer.stop()
+        self.loop.run_until_complete(main())
+        return [(t - self.start_time, zone, state) for t, zone, state in self.actuator.transition_trace]
+
+    def test_exact_deadlines_and_merging(self):
+        async def scenario():
+            await asyncio.sleep(10)
+            self.actuator.start_watering([WateringTask("Z1", 60), WateringTask("Z2", 20)])
+            await asyncio.sleep(30)
+            # extends the running watering of the active channel
+            self.actuator.start_watering([WateringTask("Z1", 30)])
+            await asyncio.sleep(1000)
+
+        self.assertEqual(self.run_actuator(scenario), [
+            (10, "Z1", 1), (100, "Z1", 0), (107, "Z2", 1), (127, "Z2", 0)])
+
+    def test_stop_active_channel(self):
+        async def scenario():
+            self.actuator.start_watering([WateringTask("Z1", 60), WateringTask("Z2", 20)])
+            await asyncio.sleep(15)
+            self.actuator.stop_watering({"Z1"})
+            await asyncio.sleep(1000)
+
+        self.assertEqual(self.run_actuator(scenario), [
+            (0, "Z1", 1), (15, "Z1", 0), (22, "Z2", 1), (42, "Z2", 0)])
+        self.assertEqual(len(self.dispatches), 4)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,202 @@
+#
+# water_source_planner_test.py
+# backyardbot
+#
+# Created: October 2026
+#
+
+import os
+import json
+import asyncio
+import logging
+import tempfile
+import unittest
+from plugins.sprinklerinterface.actuator import WateringTask
+from plugins.sprinklerinterface.water_source_planner import WaterSourcePlanner
+from plugins.sprinklerinterface.sprinklerinterface import WateringPlugin
+from plugins.sprinklerinterface.gpio import GpioInterface
+from framework.clock import Clock, VirtualTimeEventLoop
+from framework.communication import Topics
+from framework.memory import Database
+
+
+class PlannedActuator:
+    """ Stands in for an actuator, the planner only needs the duration estimate. """
+
+    def __init__(self, name):
+        self.name = name
+
+    def estimate_duration(self, tasks):
+        return sum(task.duration for task in tasks)
+
+    def __repr__(self):
+        return self.name
+
+
+class TestWaterSourcePlanner(unittest.TestCase):
+
+    def setUp(self):
+        self.planner = WaterSourcePlanner.from_settings({
+            "water_sources": [{"name": "tap", "flow_budget": 20}]
+        })
+        self.a, self.b, self.c, self.free = [PlannedActuator(n) for n in ("a", "b", "c", "free")]
+        self.planner.add_actuator(self.a, "tap", 12)
+        self.planner.add_actuator(self.b, "tap", 8)
+        self.planner.add_actuator(self.c, "tap", 10)
+        self.planner.add_actuator(self.free)
+
+    def test_actuators_without_source_start_right_away(self):
+        tasks = [WateringTask("free", 60)]
+        self.assertEqual(self.planner.submit(self.free, tasks), [(self.free, tasks)])
+        self.assertEqual(self.planner.submit(self.free, []), [])
+        self.assertTrue(self.planner.is_running(self.free))
+
+    def test_unknown_source(self):
+        with self.assertRaises(ValueError):
+            self.planner.add_actuator(PlannedActuator("x"), "well", 5)
+
+    def test_budget_is_respected(self):
+        self.assertEqual(len(self.planner.submit(self.a, [WateringTask("a", 60)])), 1)
+        self.assertEqual(len(self.planner.submit(self.b, [WateringTask("b", 60)])), 1)
+        # 12 + 8 + 10 exceeds the budget of 20
+        self.assertEqual(self.planner.submit(self.c, [WateringTask("c", 60)]), [])
+        self.assertTrue(self.planner.is_waiting(self.c))
+
+        # running actuators may extend their watering
+        self.assertEqual(len(self.planner.submit(self.a, [WateringTask("a", 30)])), 1)
+
+        self.assertEqual(self.planner.release(self.b), [])
+        started = self.planner.release(self.a)
+        self.assertEqual(started, [(self.c, [WateringTask("c", 60)])])
+        self.assertFalse(self.planner.is_waiting(self.c))
+        self.assertTrue(self.planner.is_running(self.c))
+
+    def test_longest_waiting_actuator_that_fits_starts_first(self):
+        d = PlannedActuator("d")
+        self.planner.add_actuator(d, "tap", 10)
+        self.planner.submit(self.a, [WateringTask("a", 10)])
+        self.planner.submit(self.b, [WateringTask("b", 10)])
+        self.planner.submit(self.c, [WateringTask("c", 20)])
+        self.planner.submit(d, [WateringTask("d", 50), WateringTask("d", 50)])
+
+        # only one of c and d fits next to b, d was submitted later but waters longer
+        self.assertEqual([actuator for actuator, _ in self.planner.release(self.a)], [d])
+        # a new actuator has to wait behind the ones that are already waiting
+        self.assertEqual(self.planner.submit(self.a, [WateringTask("a", 5)]), [])
+        self.assertEqual([actuator for actuator, _ in self.planner.release(self.b)], [self.c])
+        self.assertEqual(self.planner.release(d), [])
+        self.assertEqual([actuator for actuator, _ in self.planner.release(self.c)], [self.a])
+
+    def test_oversized_actuator_runs_alone(self):
+        planner = WaterSourcePlanner({"tap": 5})
+        big, small = PlannedActuator("big"), PlannedActuator("small")
+        planner.add_actuator(big, "tap", 12)
+        planner.add_actuator(small, "tap", 2)
+        self.assertEqual(len(planner.submit(big, [WateringTask("big", 10)])), 1)
+        self.assertEqual(planner.submit(small, [WateringTask("small", 10)]), [])
+        self.assertEqual(len(planner.release(big)), 1)
+
+    def test_remove_zones(self):
+        self.planner.submit(self.a, [WateringTask("a", 10)])
+        self.planner.submit(self.b, [WateringTask("b", 10)])
+        self.planner.submit(self.c, [WateringTask("c", 10)])
+        self.planner.remove_zones({"c"})
+        self.assertFalse(self.planner.is_waiting(self.c))
+        self.assertEqual(self.planner.release(self.a), [])
+
+
+class TestPlannedWatering(unittest.TestCase):
+    """ Runs the plugin on virtual time with three valves on a tap that can only drive two at once. """
+
+    def setUp(self):
+        logging.disable(logging.INFO)
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        Database.set_db_path(os.path.join(self.tmp_dir.name, "db.json"), write_behind=True)
+
+        plugin_dir = os.path.join(self.tmp_dir.name, "sprinklerinterface")
+        os.mkdir(plugin_dir)
+        with open("plugins/sprinklerinterface/settings.json") as f:
+            settings = json.load(f)
+        quiet_logging = {"log_to_stream": False, "log_to_file": False}
+        settings["logging"] = quiet_logging
+        settings["plugin_settings"] = {
+            "water_sources": [{"name": "tap", "flow_budget": 20}],
+            "actuators": [{
+                "python_class": "SingleActuator",
+                "zones": [zone],
+                "water_source": "tap",
+                "flow_rate": 10,
+                "actuator_specific_settings": {"use_debug_gpio": True, "gpio_pin": pin, "logging": quiet_logging}
+            } for zone, pin in (("V1", 1), ("V2", 2), ("V3", 3))]
+        }
+        self.settings_path = os.path.join(plugin_dir, "settings.json")
+        with open(self.settings_path, "w") as f:
+            json.dump(settings, f)
+
+        self.start_time = 1000
+        self.loop = VirtualTimeEventLoop(self.start_time)
+        Clock.set_time_source(self.loop.wall_time)
+        GpioInterface.simulated = True
+
+    def tearDown(self):
+        GpioInterface.simulated = False
+        Clock.set_time_source(None)
+        self.loop.close()
+        self.tmp_dir.cleanup()
+        logging.disable(logging.NOTSET)
+
+    def test_third_valve_waits_for_water(self):
+        transitions = []
+
+        async def main():
+            plugin = WateringPlugin("sprinklerinterface", self.settings_path)
+            plugin.set_localization_data({"general": {"language": ["en"]}})
+            for actuator in plugin.actuators:
+                actuator.transition_trace = transitions
+            task = asyncio.create_task(plugin.event_loop())
+            await asyncio.sleep(0)
+            await plugin.start_watering([WateringTask("V1", 60), WateringTask("V2", 30), WateringTask("V3", 40)])
+            await asyncio.sleep(10)
+            self.assertTrue(plugin.planner.is_waiting(plugin.actuators[2]))
+            self.assertIn("waiting", plugin.get_actuator_states()[2]["description"])
+            # frontends count down to the end of the watering on their own
+            self.assertEqual(plugin.get_actuator_states()[0]["end_time"], self.start_time + 60)
+            # the waiting valve has no wakeup time until water is available
+            self.assertEqual(plugin.get_stats()["upcoming_transitions"], [
+                {"time": self.start_time + 30, "actuator": plugin.actuators[1].display_name},
+                {"time": self.start_time + 60, "actuator": plugin.actuators[0].display_name}])
+            await asyncio.sleep(1000)
+            plugin.shutdown()
+            Topics.unregister(plugin)
+            await asyncio.gather(task, return_exceptions=True)
+
+        self.loop.run_until_complete(main())
+        self.assertEqual(sorted((t - self.start_time, zone, state) for t, zone, state in transitions), [
+            (0, "V1", 1), (0, "V2", 1), (30, "V2", 0), (30, "V3", 1), (60, "V1", 0), (70, "V3", 0)])
+
+    def test_stopping_a_waiting_valve_updates_frontends(self):
+        sent_states = []
+
+        async def main():
+            plugin = WateringPlugin("sprinklerinterface", self.settings_path)
+            plugin.set_localization_data({"general": {"language": ["en"]}})
+
+            async def record_state(command, state, ws_id=-1):
+                sent_states.append(state)
+
+            plugin.send_state = record_state
+            await plugin.start_watering([WateringTask("V1", 60), WateringTask("V2", 30), WateringTask("V3", 40)])
+            self.assertIn("waiting", sent_states[-1]["actuators"][2]["description"])
+
+            # no actuator is woken up by removing a task that didn't start yet
+            await plugin.stop_watering_callback_ws(["V3"])
+            self.assertFalse(plugin.planner.is_waiting(plugin.actuators[2]))
+            self.assertNotIn("waiting", sent_states[-1]["actuators"][2]["description"])
+            plugin.shutdown()
+            Topics.unregister(plugin)
+
+        self.loop.run_until_complete(main())
+
+
+if __name__ == "__main__":
+    unittest.main()
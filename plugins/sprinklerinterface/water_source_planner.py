@@ -0,0 +1,162 @@
+#
+# water_source_planner.py
+# backyardbot
+#
+# Created: October 2026
+#
+
+from dataclasses import dataclass, field
+from typing import Dict, List
+
+
+@dataclass
+class WaterSource:
+    """
+    A water supply that is shared by several actuators, e.g. a tap or a
+    pump. While an actuator is watering, it draws its flow rate from the
+    source. The sum of the flow rates of all running actuators must not
+    exceed the source's flow budget, otherwise the pressure drops and the
+    sprinklers don't reach their zones anymore.
+    """
+    name: str
+    flow_budget: float
+    # actuator -> flow rate of the running actuators
+    running: Dict = field(default_factory=dict)
+    # actuator -> list of WateringTasks that wait for enough flow
+    pending: Dict = field(default_factory=dict)
+
+    def used_flow(self):
+        return sum(self.running.values())
+
+    def fits(self, flow_rate):
+        # An actuator that needs more than the whole budget may still run, but only on its own.
+        return not self.running or self.used_flow() + flow_rate <= self.flow_budget
+
+
+class WaterSourcePlanner:
+    """
+    Decides when the tasks for an actuator may be handed to it. Actuators
+    without a water source run right away, just as without the planner. For
+    actuators that share a water source, as many are started at the same time
+    as the source's flow budget allows. The others wait until a running
+    actuator is done. Among the waiting actuators that fit into the remaining
+    budget, the one with the longest estimated watering duration is started
+    first, which keeps the total wall time of all waterings short.
+
+    The planner doesn't track time. The plugin reports with `release(..)`
+    once an actuator has no tasks left.
+    """
+
+    def __init__(self, flow_budgets: Dict[str, float]):
+        """ :param flow_budgets: Maps the names of the water sources to their flow budgets. """
+        self.sources = {name: WaterSource(name, budget) for name, budget in flow_budgets.items()}
+        # actuator -> (water source, flow rate)
+        self._actuator_sources = {}
+        # waiting actuator -> (-estimated duration, submission counter), smallest starts first
+        self._submission_counter = 0
+        self._pending_priority = {}
+
+    @classmethod
+    def from_settings(cls, plugin_settings):
+        """
+        Reads the water sources from the plugin settings, e.g.
+        `"water_sources": [{"name": "tap", "flow_budget": 20}]`.
+        """
+        sources = plugin_settings.get("water_sources", [])
+        return cls({source["name"]: source["flow_budget"] for source in sources})
+
+    # === Public Methods ===
+    # === -------------- ===
+
+    def add_actuator(self, actuator, source_name=None, flow_rate=0):
+        """
+        Registers the water source that the actuator draws from. Actuators
+        without a known source are not restricted.
+        """
+        if source_name is None:
+            return
+        if source_name not in self.sources:
+            raise ValueError(f"Unknown water source: {source_name}")
+        self._actuator_sources[actuator] = (self.sources[source_name], flow_rate)
+
+    def submit(self, actuator, tasks) -> List:
+        """
+        Takes new tasks for an actuator. Returns a list of (actuator, tasks)
+        that may be started right away, which is either the given actuator
+        or nothing.
+        """
+        if not tasks:
+            return []
+        if actuator not in self._actuator_sources:
+            return [(actuator, tasks)]
+
+        source, flow_rate = self._actuator_sources[actuator]
+        if actuator in source.running:
+            # the actuator is already drawing water and adds the tasks to its own schedule
+            return [(actuator, tasks)]
+        if actuator not in source.pending and not source.pending and source.fits(flow_rate):
+            source.running[actuator] = flow_rate
+            return [(actuator, tasks)]
+
+        if actuator not in source.pending:
+            source.pending[actuator] = []
+            self._submission_counter += 1
+        source.pending[actuator] += tasks
+        self._update_priority(actuator, source)
+        return []
+
+    def release(self, actuator) -> List:
+        """
+        To be called once the actuator has no tasks left. Frees its flow and
+        returns a list of (actuator, tasks) that may be started now.
+        """
+        if actuator not in self._actuator_sources:
+            return []
+        source, _ = self._actuator_sources[actuator]
+        if source.running.pop(actuator, None) is None:
+            return []
+        return self._start_pending(source)
+
+    def remove_zones(self, zones):
+        """ Drops waiting tasks for the given zones. """
+        for source in self.sources.values():
+            for actuator in list(source.pending.keys()):
+                source.pending[actuator] = [t for t in source.pending[actuator] if t.zone not in zones]
+                if not source.pending[actuator]:
+                    del source.pending[actuator]
+                    del self._pending_priority[actuator]
+                else:
+                    self._update_priority(actuator, source)
+
+    def is_running(self, actuator):
+        """ Returns whether the actuator is allowed to draw water. Unrestricted actuators always are. """
+        if actuator not in self._actuator_sources:
+            return True
+        return actuator in self._actuator_sources[actuator][0].running
+
+    def is_waiting(self, actuator):
+        """ Returns whether there are tasks for the actuator that wait for enough flow. """
+        if actuator not in self._actuator_sources:
+            return False
+        return actuator in self._actuator_sources[actuator][0].pending
+
+    # === Private Methods ===
+    # === --------------- ===
+
+    def _update_priority(self, actuator, source):
+        """ Estimates the duration once per change instead of every time a start is planned. """
+        order = self._pending_priority.get(actuator, (0, self._submission_counter))[1]
+        self._pending_priority[actuator] = (-actuator.estimate_duration(source.pending[actuator]), order)
+
+    def _start_pending(self, source):
+        started = []
+        while source.pending:
+            candidates = [a for a in source.pending if source.fits(self._actuator_sources[a][1])]
+            if not candidates:
+                break
+            actuator = min(candidates, key=self._pending_priority.__getitem__)
+            tasks = source.pending.pop(actuator)
+            del self._pending_priority[actuator]
+            source.running[actuator] = self._actuator_sources[actuator][1]
+            started.append((actuator, tasks))
+        return started
@@ -10,10 +10,46 @@
 import time
 import datetime
 from dataclasses import dataclass
+from framework.clock import Clock
 
 # TODO: This one may need refactoring to not consist of three classes for one simple job.
 
 
+def _local_timestamp(day, hour, minute):
+    """ Unix timestamp of the local time `hour:minute` on `day`. DST is resolved by `mktime`. """
+    return time.mktime((day.year, day.month, day.day, hour, minute, 0, 0, 0, -1))
+
+
+def _first_day(earliest_time):
+    """ Occurrences are searched from today on, even if `earliest_time` lies in the past. """
+    return max(datetime.date.fromtimestamp(earliest_time), datetime.date.fromtimestamp(Clock.time()))
+
+
+def next_occurrences(scheduled_times, earliest_time=None):
+    """
+    Batched version of `ScheduledTime.next_occurrence(..)` for many scheduled
+    times with the same `earliest_time`. The local timestamps of equal times
+    of day are only computed once.
+    """
+    if earliest_time is None:
+        earliest_time = Clock.time()
+    first_day = _first_day(earliest_time)
+    cache = {}
+
+    def cached_local_timestamp(day, hour, minute):
+        key = (day, hour, minute)
+        if key not in cache:
+            cache[key] = _local_timestamp(day, hour, minute)
+        return cache[key]
+
+    timestamps = []
+    for scheduled_time in scheduled_times:
+        scheduled_time.next_execution_timestamp = scheduled_time._next_occurrence_from(
+            first_day, earliest_time, cached_local_timestamp)
+        timestamps.append(scheduled_time.next_execution_timestamp)
+    return timestamps
+
+
 class ScheduledTime(object):
 
     def __init__(self, time_hh, time_mm, weekday):
@@ -28,23 +64,26 @@ class ScheduledTime(object):
         self.minute = time_mm
         # If weekday == 7, watering should happen every day.
         self.weekdays = set(range(7)) if weekday == 7 else {weekday}
+        # bit i is set if watering happens on weekday i (Mon = 0)
+        self.weekday_mask = sum(1 << day for day in self.weekdays)
 
         self.next_execution_timestamp = 0
 
     # === Public methods ===
     # === -------------- ===
 
-    def next_occurrence(self, earliest_time=time.time()):
-        now = datetime.datetime.now()
+    def next_occurrence(self, earliest_time=None):
+        """
+        Returns the unix timestamp of the first occurrence that lies after
+        `earliest_time` (default: now) and not before today. Takes constant
+        time, the weekday is found with a bitmask of the scheduled weekdays.
+        """
         # TODO: If minutes are equal because this task was just activated, the just activated
         #   task will be listed as the next scheduled task.
-        next_execution_datetime = datetime.datetime(now.year, now.month, now.day, self.hour, self.minute)
-
-        while True:
-            self.next_execution_timestamp = time.mktime(next_execution_datetime.timetuple())
-            if self.next_execution_timestamp > earliest_time and next_execution_datetime.weekday() in self.weekdays:
-                break
-            next_execution_datetime += datetime.timedelta(days=1)
+        if earliest_time is None:
+            earliest_time = Clock.time()
+        self.next_execution_timestamp = self._next_occurrence_from(
+            _first_day(earliest_time), earliest_time, _local_timestamp)
         return self.next_execution_timestamp
 
     def asdict(self):
@@ -77,6 +116,16 @@ class ScheduledTime(object):
     def _get_time_str_hh_mm(self):
         return "{:02}:{:02}".format(self.hour, self.minute)
 
+    def _next_occurrence_from(self, first_day, earliest_time, local_timestamp):
+        # rotate the weekday mask, so that bit 0 stands for the first day
+        weekday = first_day.weekday()
+        days_mask = ((self.weekday_mask >> weekday) | (self.weekday_mask << (7 - weekday))) & 0x7f
+        if local_timestamp(first_day, self.hour, self.minute) <= earliest_time:
+            days_mask &= ~1
+        # index of the lowest set bit is the number of days until the next occurrence
+        days = (days_mask & -days_mask).bit_length() - 1 if days_mask else 7
+        return local_timestamp(first_day + datetime.timedelta(days=days), self.hour, self.minute)
+
     # === Computed properties ===
     # === ------------------- ===
 
@@ -105,7 +154,7 @@ class Task:
     """
 
     # def __init__(self, specification=None, sensor_handle=None):
-    def __init__(self, db_timetable_entry):
+    def __init__(self, db_timetable_entry, compute_next_execution=True):
 
         # Timetable database structure
         # {
@@ -122,7 +171,16 @@ class Task:
         self.planned_time = ScheduledTime(time_hh, time_mm, weekday)
         self.duration = db_timetable_entry["duration"]
         # self.modifier = []
-        self.next_execution_timestamp = self.planned_time.next_occurrence()
+        self.next_execution_timestamp = self.planned_time.next_occurrence() if compute_next_execution else 0
+
+    @classmethod
+    def from_entries(cls, db_timetable_entries, earliest_time=None):
+        """ Creates tasks for many timetable entries and computes their next execution times in one batch. """
+        tasks = [cls(entry, compute_next_execution=False) for entry in db_timetable_entries]
+        timestamps = next_occurrences([task.planned_time for task in tasks], earliest_time)
+        for task, timestamp in zip(tasks, timestamps):
+            task.next_execution_timestamp = timestamp
+        return tasks
 
     def update_next_execution_timestamp(self):
         """ Finds the next execution timestamp after the current one. """
@@ -0,0 +1,118 @@
+#
+# tc_task_queue.py
+# backyardbot
+#
+# Created: October 2026
+#
+
+import heapq
+import itertools
+
+
+class TaskQueue:
+    """
+    Holds the tasks of the time control ordered by their next execution
+    timestamp. Built on a binary heap, so adding, removing and rescheduling
+    a task takes O(log n) and the next task is available in O(1).
+
+    Tasks are identified by their id. Removed or rescheduled tasks leave a
+    stale entry in the heap that is skipped once it reaches the top. The
+    heap is rebuilt as soon as the stale entries outnumber the valid ones.
+    """
+
+    def __init__(self, tasks=()):
+        # entries: [timestamp, insertion counter, task or None if stale]
+        self._heap = []
+        # task id -> heap entry of that task
+        self._entries = {}
+        self._counter = itertools.count()
+        self._stale_count = 0
+        self.rebuild(tasks)
+
+    # === Public Methods ===
+    # === -------------- ===
+
+    def add(self, task):
+        """ Adds a task or replaces the task with the same id. """
+        self._invalidate(task.id)
+        entry = [task.next_execution_timestamp, next(self._counter), task]
+        self._entries[task.id] = entry
+        heapq.heappush(self._heap, entry)
+
+    def remove(self, task_id):
+        """ Removes the task with the given id. Returns the task or `None` if it isn't queued. """
+        entry = self._invalidate(task_id)
+        return entry[2] if entry is not None else None
+
+    def reschedule(self, task):
+        """ To be called after the next execution timestamp of a queued task changed. """
+        self.add(task)
+
+    def rebuild(self, tasks):
+        """ Replaces all queued tasks. Takes O(n). """
+        self._entries = {}
+        for task in tasks:
+            self._entries[task.id] = [task.next_execution_timestamp, next(self._counter), task]
+        self._heap = list(self._entries.values())
+        heapq.heapify(self._heap)
+        self._stale_count = 0
+
+    def peek(self):
+        """ Returns the task that will be executed next or `None` if the queue is empty. """
+        self._drop_stale_top()
+        return self._heap[0][2] if self._heap else None
+
+    def next_timestamp(self):
+        """ Returns the earliest next execution timestamp or `None` if the queue is empty. """
+        self._drop_stale_top()
+        return self._heap[0][0] if self._heap else None
+
+    def next_group(self):
+        """
+        Returns all tasks that share the earliest next execution timestamp
+        in the order they were queued. Takes O(k log n) for a group of k tasks.
+        """
+        timestamp = self.next_timestamp()
+        if timestamp is None:
+            return []
+        entries = []
+        while self._heap and self._heap[0][0] == timestamp:
+            entry = heapq.heappop(self._heap)
+            if entry[2] is not None:
+                entries.append(entry)
+            else:
+                self._stale_count -= 1
+        for entry in entries:
+            heapq.heappush(self._heap, entry)
+        return [entry[2] for entry in entries]
+
+    def get(self, task_id):
+        entry = self._entries.get(task_id, None)
+        return entry[2] if entry is not None else None
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __bool__(self):
+        return bool(self._entries)
+
+    def __iter__(self):
+        """ Iterates over all tasks, not in execution order. """
+        return iter([entry[2] for entry in self._entries.values()])
+
+    # === Private Methods ===
+    # === --------------- ===
+
+    def _invalidate(self, task_id):
+        entry = self._entries.pop(task_id, None)
+        if entry is not None:
+            entry[2] = None
+            self._stale_count += 1
+            if self._stale_count > len(self._entries):
+                self.rebuild([e[2] for e in self._entries.values()])
+        return entry
+
+    def _drop_stale_top(self):
+        while self._heap and self._heap[0][2] is None:
+            heapq.heappop(self._heap)
+            self._stale_count -= 1
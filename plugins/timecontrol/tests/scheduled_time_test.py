@@ -0,0 +1,114 @@
+#
+# scheduled_time_test.py
+# backyardbot
+#
+# Created: October 2026
+#
+
+import os
+import time
+import random
+import datetime
+import unittest
+from plugins.timecontrol.tc_task import ScheduledTime, Task, next_occurrences
+
+"""
+Compares the closed-form computation of the next occurrence with the
+iterative implementation it replaced, for random schedules and reference
+times in several time zones, including times around DST transitions.
+"""
+
+time_zones = ["UTC", "Europe/Berlin", "America/New_York", "Australia/Lord_Howe", "Pacific/Chatham"]
+
+
+def iterative_next_occurrence(hour, minute, weekdays, earliest_time):
+    """ The previous implementation of `ScheduledTime.next_occurrence(..)`. """
+    now = datetime.datetime.now()
+    next_execution_datetime = datetime.datetime(now.year, now.month, now.day, hour, minute)
+    while True:
+        timestamp = time.mktime(next_execution_datetime.timetuple())
+        if timestamp > earliest_time and next_execution_datetime.weekday() in weekdays:
+            return timestamp
+        next_execution_datetime += datetime.timedelta(days=1)
+
+
+def dst_transitions(start, end):
+    """ Unix timestamps in [start, end) at which the UTC offset of the local time zone changes. """
+    transitions = []
+    t = start
+    while t < end:
+        if time.localtime(t).tm_gmtoff != time.localtime(t + 3600).tm_gmtoff:
+            transitions.append(t + 3600)
+        t += 3600
+    return transitions
+
+
+class TestNextOccurrence(unittest.TestCase):
+
+    def setUp(self):
+        self.previous_tz = os.environ.get("TZ", None)
+        self.rng = random.Random(42)
+
+    def tearDown(self):
+        if self.previous_tz is None:
+            os.environ.pop("TZ", None)
+        else:
+            os.environ["TZ"] = self.previous_tz
+        time.tzset()
+
+    def set_time_zone(self, tz):
+        os.environ["TZ"] = tz
+        time.tzset()
+
+    def random_schedule(self):
+        # weekday 7 stands for daily watering
+        return ScheduledTime(self.rng.randrange(24), self.rng.choice([0, 15, 30, 45, self.rng.randrange(60)]),
+                             self.rng.randrange(8))
+
+    def reference_times(self, now):
+        year = 365 * 24 * 3600
+        times = [now + self.rng.uniform(-30 * 24 * 3600, 2 * year) for _ in range(150)]
+        for transition in dst_transitions(int(now), int(now + year)):
+            times += [transition + self.rng.uniform(-2 * 24 * 3600, 2 * 24 * 3600) for _ in range(30)]
+        return times
+
+    def test_matches_iterative_implementation(self):
+        now = time.time()
+        for tz in time_zones:
+            self.set_time_zone(tz)
+            for earliest_time in self.reference_times(now):
+                st = self.random_schedule()
+                expected = iterative_next_occurrence(st.hour, st.minute, st.weekdays, earliest_time)
+                self.assertEqual(st.next_occurrence(earliest_time), expected,
+                                 f"{tz}, {st}, earliest time {earliest_time}")
+                self.assertEqual(st.next_execution_timestamp, expected)
+
+                # an occurrence itself is never returned as the next occurrence
+                following = iterative_next_occurrence(st.hour, st.minute, st.weekdays, expected)
+                self.assertEqual(st.next_occurrence(expected), following)
+
+    def test_batched_matches_single(self):
+        for tz in time_zones:
+            self.set_time_zone(tz)
+            earliest_time = time.time() + self.rng.uniform(0, 365 * 24 * 3600)
+            schedules = [self.random_schedule() for _ in range(500)]
+            expected = [ScheduledTime(st.hour, st.minute, 7 if len(st.weekdays) == 7 else min(st.weekdays))
+                        .next_occurrence(earliest_time) for st in schedules]
+            self.assertEqual(next_occurrences(schedules, earliest_time), expected)
+
+    def test_default_is_evaluated_per_call(self):
+        st = ScheduledTime(12, 0, 7)
+        first = st.next_occurrence()
+        self.assertGreater(first, time.time())
+        self.assertLessEqual(first - time.time(), 24 * 3600)
+
+    def test_tasks_from_entries(self):
+        entries = [{"ID": i, "zones": ["Z1"], "time_hh": 6, "time_mm": i, "weekday": i % 8, "duration": 60}
+                   for i in range(50)]
+        tasks = Task.from_entries(entries)
+        self.assertEqual([t.next_execution_timestamp for t in tasks],
+                         [Task(entry).next_execution_timestamp for entry in entries])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,69 @@
+#
+# task_queue_test.py
+# backyardbot
+#
+# Created: October 2026
+#
+
+import random
+import unittest
+from plugins.timecontrol.tc_task_queue import TaskQueue
+
+
+class FakeTask:
+
+    def __init__(self, task_id, timestamp):
+        self.id = task_id
+        self.next_execution_timestamp = timestamp
+
+
+class TestTaskQueue(unittest.TestCase):
+
+    def test_order_and_groups(self):
+        tasks = [FakeTask(1, 30), FakeTask(2, 10), FakeTask(3, 20), FakeTask(4, 10)]
+        queue = TaskQueue(tasks)
+        self.assertEqual(queue.peek().id, 2)
+        self.assertEqual([t.id for t in queue.next_group()], [2, 4])
+        # next_group doesn't remove the tasks
+        self.assertEqual(len(queue), 4)
+
+        queue.remove(2)
+        self.assertEqual([t.id for t in queue.next_group()], [4])
+
+        tasks[3].next_execution_timestamp = 40
+        queue.reschedule(tasks[3])
+        self.assertEqual(queue.next_timestamp(), 20)
+        self.assertEqual(queue.peek().id, 3)
+
+        queue.add(FakeTask(3, 50))  # replaces the task with the same id
+        self.assertEqual(queue.peek().id, 1)
+        self.assertEqual(queue.get(3).next_execution_timestamp, 50)
+        self.assertEqual(len(queue), 3)
+
+    def test_matches_sorted_list(self):
+        rng = random.Random(7)
+        queue = TaskQueue()
+        reference = {}
+        for i in range(2000):
+            task_id = rng.randrange(200)
+            if rng.random() < 0.3:
+                queue.remove(task_id)
+                reference.pop(task_id, None)
+            else:
+                task = FakeTask(task_id, rng.randrange(100))
+                queue.add(task)
+                reference[task_id] = task
+
+            self.assertEqual(len(queue), len(reference))
+            if reference:
+                earliest = min(t.next_execution_timestamp for t in reference.values())
+                expected = {t.id for t in reference.values() if t.next_execution_timestamp == earliest}
+                self.assertEqual({t.id for t in queue.next_group()}, expected)
+            else:
+                self.assertIsNone(queue.peek())
+        # stale entries don't pile up
+        self.assertLessEqual(len(queue._heap), 2 * len(queue) + 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
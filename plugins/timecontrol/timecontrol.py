@@ -9,10 +9,11 @@
 
 from framework.plugin import Plugin
 from framework.communication import Topics, BaseMessage
-from framework.memory import Database
+from framework.clock import Clock
+from framework.memory import Database, LatencyHistogram
 from byb.byb_common import TOPIC_START_WATERING, StartWateringPayload, TIMETABLE_DB_NAME
 from plugins.timecontrol.tc_task import Task
-import time
+from plugins.timecontrol.tc_task_queue import TaskQueue
 
 
 class TimeControlPlugin(Plugin):
@@ -24,19 +25,25 @@ class TimeControlPlugin(Plugin):
 
     def initialize(self, settings):
 
-        # Holds all defined tasks. It is assumed to be sorted by next execution timestamp
-        #  Tasks are sorted using the timestamp at which they will be executed next
-        #  which uses the magic method __gt__. Tasks are checked for equality (__eq__) by
-        #  comparing their ids, NOT their timestamps.
-        self._tasks = []
+        # Holds all defined tasks ordered by the timestamp at which they will be
+        #  executed next. Tasks are identified by their ids, which are the doc ids
+        #  of their timetable DB entries.
+        self._tasks = TaskQueue()
         self._auto_mode_enabled = True
 
+        # The event loop never sleeps longer than this, so that the schedule
+        # recovers if the system clock is adjusted (e.g. by NTP after booting).
+        self._max_sleep = settings.get("max_sleep_seconds", 60)
+        # time between a group's planned execution time and its dispatch
+        self._dispatch_lateness = LatencyHistogram()
+
         self.command_map = {
             "skip_next_watering": lambda _: self.skip_next_watering(),
             "toggle_auto_mode": self.toggle_auto_mode
         }
 
         self.timetable_db = Database.get_db_for(TIMETABLE_DB_NAME)
+        self.timetable_db_async = Database.get_async_db_for(TIMETABLE_DB_NAME)
         self.register_topic_callback("database_update/" + TIMETABLE_DB_NAME, self._timetable_updated_callback)
 
         ws_backend_topic = f"websocket/{self.name}/backend"
@@ -71,30 +78,43 @@ class TimeControlPlugin(Plugin):
 
     async def send_updated_state(self, ws_id=-1):
         """ Prepares a message that tells the frontend to update the UI with new data. """
-        m = {
-            "command": "plugin_state",
-            "payload": self.get_system_state()
-        }
-        await self.send_to_clients(m, ws_id=ws_id)
+        await self.send_state("plugin_state", self.get_system_state(), ws_id=ws_id)
 
     # === Task Scheduling ===
 
     async def _timetable_updated_callback(self, msg):
         """
-        Loads the updated timetable from the database and sends the updated
-        system state to all clients.
+        Applies the changes of the timetable DB to the queued tasks and sends
+        the updated system state to all clients.
         """
-        self._load_tasks()
+        if msg.payload is None:
+            self._create_tasks(await self.timetable_db_async.all())
+        else:
+            self._apply_table_update(msg.payload)
+        self.wake_up()
         await self.send_updated_state()
 
+    def _apply_table_update(self, update):
+        """ Adds, replaces and removes only the tasks whose DB entries changed. """
+        for doc_id in update.removed:
+            self._tasks.remove(doc_id)
+        for doc_id, entry in {**update.inserted, **update.updated}.items():
+            task = Task({**entry, "ID": doc_id})
+            self._tasks.add(task)
+            self.logger.info(f"Updated task: {task}")
+
     def _load_tasks(self):
+        """ Synchronously loads the tasks from the timetable DB. Only used during setup. """
+        self._create_tasks(self.timetable_db.all())
+
+    def _create_tasks(self, db_entries):
         """
-        Loads entries from timetable DB, creates Task objects from them (i.e.
-        objects that know the soonest possible execution time) and sorts
-        them, so that the next task is first in the list.
+        Creates Task objects from timetable DB entries (i.e. objects that
+        know the soonest possible execution time) and replaces all queued
+        tasks with them.
         """
-        entries = Database.as_dict_with_id(self.timetable_db.all(), id_tag="ID")
-        self._tasks = sorted([Task(entry) for entry in entries])
+        entries = Database.as_dict_with_id(db_entries, id_tag="ID")
+        self._tasks.rebuild(Task.from_entries(entries))
 
         self.logger.info("Fetched tasks from DB:")
         for task in self._tasks:
@@ -103,13 +123,12 @@ class TimeControlPlugin(Plugin):
     def _reschedule_tasks(self, to_update):
         """
         Updates the next execution times for the tasks that are given and
-        makes sure that the list of tasks is still sorted by next execution
-        time.
+        moves them to their new position in the task queue.
         """
         for task in to_update:
             # TODO: Even if auto mode was disabled, the previous execution timestamps were still saved in the task object.
             task.update_next_execution_timestamp()
-        self._tasks.sort()
+            self._tasks.reschedule(task)
 
     def _get_next_group(self):
         """
@@ -118,27 +137,29 @@ class TimeControlPlugin(Plugin):
         sorting or merging isn't necessary as this is handled by the
         sprinkler interface.
         """
-        task_group = []
-        for task in self._tasks:
-            if task.next_execution_timestamp != self._tasks[0].next_execution_timestamp:
-                break
-            task_group.append(task)
-        return task_group
+        return self._tasks.next_group()
+
+    def _next_wakeup_time(self):
+        """ Returns the time at which the event loop has to check the tasks again. """
+        if not self._tasks or not self._auto_mode_enabled:
+            return None
+        return min(self._tasks.next_timestamp(), Clock.time() + self._max_sleep)
 
     async def event_loop(self):
         """
         Coroutine that runs forever and hands new watering tasks to the
-        sprinkler interface when it's time.
+        sprinkler interface when it's time. Sleeps until the next task is due
+        and is woken up early if the timetable, the auto mode or the next
+        task changes.
         """
-        # TODO: Don't run every second but wait for the next task. But: How to change the waiting time as the table gets updated? -> with an event?
-        rate = 1
-        while await self.spin_once(rate):
+        while await self.spin_until(self._next_wakeup_time()):
 
             if not self._tasks or not self._auto_mode_enabled:
                 continue
 
-            next_task_ts = self._tasks[0].next_execution_timestamp
-            if time.time() >= next_task_ts and next_task_ts != 0:
+            next_task_ts = self._tasks.next_timestamp()
+            now = Clock.time()
+            if now >= next_task_ts and next_task_ts != 0:
                 group = self._get_next_group()
                 self._reschedule_tasks(to_update=group)
 
@@ -148,7 +169,10 @@ class TimeControlPlugin(Plugin):
                 p = StartWateringPayload(zones, durations)
                 m = BaseMessage(TOPIC_START_WATERING, payload=p)
                 Topics.send_message(m)
-                self.logger.info(f"Sent new watering action: {p}")
+
+                lateness = now - next_task_ts
+                self._dispatch_lateness.record(lateness)
+                self.logger.info(f"Sent new watering action: {p}, {lateness:.3f} s after its planned time")
 
     # === Plugin State ===
     # === ------------ ===
@@ -164,14 +188,17 @@ class TimeControlPlugin(Plugin):
         self.logger.info("Will skip next watering - for real")
         group = self._get_next_group()
         self._reschedule_tasks(to_update=group)
+        self.wake_up()
 
     def start_auto_mode(self):
         self._reschedule_tasks(to_update=self._tasks)
         if self._tasks:
             self._auto_mode_enabled = True
+        self.wake_up()
 
     def stop_auto_mode(self):
         self._auto_mode_enabled = False
+        self.wake_up()
 
     def toggle_auto_mode(self, new_state):
         if new_state:
@@ -184,11 +211,18 @@ class TimeControlPlugin(Plugin):
     def is_auto_mode_enabled(self):
         return self._auto_mode_enabled
 
+    def get_dispatch_stats(self):
+        """ Histogram of how late watering groups were dispatched compared to their planned time. """
+        return self._dispatch_lateness.asdict()
+
+    def get_stats(self):
+        return {**super().get_stats(), "dispatch_lateness": self.get_dispatch_stats()}
+
     def get_system_state(self):
         auto_state = self.is_auto_mode_enabled()
         if auto_state:
             # auto_state == True  =>  len(self._tasks) > 0
-            task = self._tasks[0]
+            task = self._tasks.peek()
             ld = self.localization
             hh_mm, weekdays = task.get_time_day()
             day_s_localized = ld["day_singular"] if len(weekdays) == 1 else ld["day_plural"]
@@ -7,10 +7,10 @@
 # montebaur.tech, github.com/montioo
 #
 
+import bisect
 from framework.plugin import Plugin
 from framework.memory import Database
-from framework.communication import Topics, BaseMessage
-from byb.byb_common import TIMETABLE_DB_NAME, ZONE_DB_NAME
+from byb.byb_common import TIMETABLE_DB_NAME, ZONE_DB_NAME, TOPIC_ZONES_UPDATED
 
 
 class TimetablePlugin(Plugin):
@@ -18,6 +18,9 @@ class TimetablePlugin(Plugin):
     Plugin implementation. Can do useful things like altering the database or
     almost nothing like this example demonstrates.
     """
+    # Render data is built from the timetable and zone tables. Changes to
+    # those are tracked with `mark_render_data_changed()`.
+    tracks_render_data_changes = True
 
     def initialize(self, settings):
         self._command_handlers = {
@@ -27,6 +30,7 @@ class TimetablePlugin(Plugin):
 
         self.tt_db = Database.get_db_for(TIMETABLE_DB_NAME)
         self.zone_db = Database.get_db_for(ZONE_DB_NAME)
+        self.tt_db_async = Database.get_async_db_for(TIMETABLE_DB_NAME)
 
         # Registering standard websocket message handler.
         ws_backend_topic = f"websocket/{self.name}/backend"
@@ -35,6 +39,16 @@ class TimetablePlugin(Plugin):
         ws_new_client_topic = "websocket/new_client"
         self.register_topic_callback(ws_new_client_topic, self.new_ws_client)
 
+        self.register_topic_callback(TOPIC_ZONES_UPDATED, self.zones_updated)
+        self.register_topic_callback(Database.get_update_topic(TIMETABLE_DB_NAME), self.timetable_updated)
+
+        # Timetable entries in the order in which they are displayed. Kept
+        # sorted with the changes from the DB instead of sorting all entries
+        # after every change.
+        self._load_sorted_entries(self.tt_db.all())
+        # names of the zones, updated by the sprinkler interface
+        self._zone_names = [zone["name"] for zone in self.zone_db.all() if "name" in zone]
+
     async def ws_message_from_frontend(self, msg):
         self.logger.info("timetable plugin has received a message.")
         data = msg.payload
@@ -49,54 +63,78 @@ class TimetablePlugin(Plugin):
         # 2. send msg to clients with updated watering list
 
         # TODO: Make sure that the data is valid
-        for entry in new_entries:
-            self.tt_db.insert(entry)
-
-        # tmp solution
-        topic = "database_update/" + TIMETABLE_DB_NAME
-        msg = BaseMessage(topic)
-        Topics.send_message(msg)
-        #
-
-        await self.send_updated_table()
+        # Clients receive the new entries once the DB reports the change.
+        await self.tt_db_async.insert_multiple(new_entries)
 
     async def handle_remove_entry(self, data):
         doc_id_to_remove = data
         self.logger.info(f"-------> going to remove entry with id {doc_id_to_remove}")
-        self.tt_db.remove(doc_ids=[doc_id_to_remove])
-
-        # TODO: tmp solution to raise awareness for DB updates
-        topic = "database_update/" + TIMETABLE_DB_NAME
-        msg = BaseMessage(topic)
-        Topics.send_message(msg)
-        #
-
-        await self.send_updated_table()
+        await self.tt_db_async.remove(doc_ids=[doc_id_to_remove])
 
     async def send_updated_table(self, ws_id=-1):
-        all_entries = self.get_all_entries()
-        # sort entries by day and insert spacers
-        all_entries.sort(key=lambda e: (e["weekday"], 60*e["time_hh"] + e["time_mm"], e["duration"], e["zones"][0]))
-        await self.send_to_clients({
-            "command": "timetable_contents",
-            "payload": all_entries
-        }, ws_id=ws_id)
+        # the server only sends the changed entries to clients that have the table already
+        await self.send_state("timetable_contents", self._sorted_entries, ws_id=ws_id)
+
+    async def timetable_updated(self, msg):
+        """ Applies the changes of the timetable DB to the sorted entries and informs the clients. """
+        update = msg.payload
+        if update is None:
+            self._load_sorted_entries(await self.tt_db_async.all())
+        else:
+            for doc_id in update.removed + list(update.updated.keys()):
+                self._remove_sorted_entry(doc_id)
+            for doc_id, entry in {**update.inserted, **update.updated}.items():
+                self._insert_sorted_entry({**entry, "doc_id": doc_id})
+        self.mark_render_data_changed()
+        await self.send_updated_table()
 
     def get_all_entries(self):
-        return Database.as_dict_with_id(self.tt_db.all())
+        # copy of the entries kept up to date by the change feed, no DB access on the event loop
+        return [dict(entry) for entry in self._sorted_entries]
+
+    def zones_updated(self, msg):
+        self._zone_names = list(msg.payload.zones)
+        self.mark_render_data_changed()
 
     async def new_ws_client(self, msg):
         await self.send_updated_table(ws_id=msg.ws_id)
 
+    # === Sorted Timetable ===
+
+    @staticmethod
+    def _sort_key(entry):
+        # sorted by day and time, the doc id makes keys unique
+        return (entry["weekday"], 60*entry["time_hh"] + entry["time_mm"], entry["duration"], entry["zones"][0], entry["doc_id"])
+
+    def _load_sorted_entries(self, db_entries):
+        self._sorted_entries = sorted(Database.as_dict_with_id(db_entries), key=self._sort_key)
+        self._sort_keys = [self._sort_key(e) for e in self._sorted_entries]
+        self._keys_by_id = {e["doc_id"]: key for e, key in zip(self._sorted_entries, self._sort_keys)}
+
+    def _insert_sorted_entry(self, entry):
+        key = self._sort_key(entry)
+        index = bisect.bisect_left(self._sort_keys, key)
+        self._sort_keys.insert(index, key)
+        self._sorted_entries.insert(index, entry)
+        self._keys_by_id[entry["doc_id"]] = key
+
+    def _remove_sorted_entry(self, doc_id):
+        key = self._keys_by_id.pop(doc_id, None)
+        if key is None:
+            return
+        index = bisect.bisect_left(self._sort_keys, key)
+        del self._sort_keys[index]
+        del self._sorted_entries[index]
+
     def query_db_for_timetable(self):
         """
         The json serializable object that is returned here, will be available
         in the variable `values` in the html template of this plugin.
         """
 
-        # TODO: Would prefer async execution for all DB related things
+        # Synchronous because rendering is. Only called if the render data changed.
         return {
-            "zones": [zone["name"] for zone in self.zone_db.all() if "name" in zone],
+            "zones": list(self._zone_names),
             "timetable": self.get_all_entries()
         }
 
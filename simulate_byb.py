@@ -0,0 +1,148 @@
+#!/usr/bin/env python3
+
+#
+# simulate_byb.py
+# backyardbot
+#
+# Created: October 2026
+#
+
+"""
+Replays the timetable with the time control and sprinkler interface plugins
+on virtual time, so a whole season is simulated in seconds. No GPIO ports
+are switched and the database file is not modified. The result is an
+execution trace that lists when the output of each zone was switched on and
+off and can be compared against a previous run for regression checks.
+
+Usage from the repository's root directory:
+`python3 simulate_byb.py --start 2027-04-01 --days 180 --output trace.json`
+"""
+
+import os
+import json
+import asyncio
+import logging
+import argparse
+import datetime
+from framework.clock import Clock, VirtualTimeEventLoop
+from framework.memory import Database
+from framework.communication import Topics
+from byb.byb_common import TIMETABLE_DB_NAME
+from plugins.sprinklerinterface.gpio import GpioInterface
+from plugins.sprinklerinterface.sprinklerinterface import WateringPlugin
+from plugins.timecontrol.timecontrol import TimeControlPlugin
+
+
+def build_intervals(transitions):
+    """
+    Turns the recorded transitions (unix time, zone, state) into a list of
+    watering intervals. Zones that are still watered at the end of the
+    simulation have no `off` time.
+    """
+    switched_on = {}
+    intervals = []
+    for timestamp, zone, state in transitions:
+        if state:
+            switched_on.setdefault(zone, timestamp)
+        elif zone in switched_on:
+            intervals.append((zone, switched_on.pop(zone), timestamp))
+    intervals += [(zone, timestamp, None) for zone, timestamp in switched_on.items()]
+    intervals.sort(key=lambda interval: interval[1])
+
+    def format_time(timestamp):
+        return datetime.datetime.fromtimestamp(timestamp).isoformat(timespec="seconds")
+
+    return [{
+        "zone": zone,
+        "on": format_time(on),
+        "off": format_time(off) if off is not None else None,
+        "duration": round(off - on, 3) if off is not None else None
+    } for zone, on, off in intervals]
+
+
+async def simulate(server_settings, duration, plugin_dir="plugins"):
+    """ Runs the scheduling plugins for `duration` seconds and returns the recorded transitions. """
+    transitions = []
+    time_control = TimeControlPlugin("timecontrol", os.path.join(plugin_dir, "timecontrol", "settings.json"))
+    watering = WateringPlugin("sprinklerinterface", os.path.join(plugin_dir, "sprinklerinterface", "settings.json"))
+    plugins = [time_control, watering]
+
+    for plugin in plugins:
+        plugin.set_localization_data(server_settings)
+    for actuator in watering.actuators:
+        actuator.transition_trace = transitions
+
+    tasks = [asyncio.create_task(plugin.event_loop()) for plugin in plugins]
+    await asyncio.sleep(duration)
+
+    for plugin in plugins:
+        plugin.shutdown()
+        Topics.unregister(plugin)
+    await asyncio.gather(*tasks, return_exceptions=True)
+    return transitions
+
+
+def run_simulation(db_path, start_time, days, server_settings, timetable=None, plugin_dir="plugins"):
+    """
+    Simulates `days` days from the unix timestamp `start_time` on. The
+    database at `db_path` is only read. If `timetable` (a list of timetable
+    entries) is given, it replaces the database's timetable. The plugins'
+    settings are read from `<plugin_dir>/<plugin name>/settings.json`.
+    """
+    Database.set_db_path(db_path, write_behind=True)
+    if timetable is not None:
+        timetable_db = Database.get_db_for(TIMETABLE_DB_NAME)
+        timetable_db.truncate()
+        timetable_db.insert_multiple(timetable)
+
+    GpioInterface.simulated = True
+    loop = VirtualTimeEventLoop(start_time)
+    Clock.set_time_source(loop.wall_time)
+    try:
+        asyncio.set_event_loop(loop)
+        transitions = loop.run_until_complete(simulate(server_settings, days * 24 * 3600, plugin_dir))
+    finally:
+        Clock.set_time_source(None)
+        GpioInterface.simulated = False
+        asyncio.set_event_loop(None)
+        loop.close()
+    return build_intervals(transitions)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Simulates the watering schedule on virtual time.")
+    parser.add_argument("--settings", default="byb/settings.json", help="global settings file")
+    parser.add_argument("--db", default=None, help="database to read the timetable from, default from settings")
+    parser.add_argument("--timetable", default=None, help="json file with a list of timetable entries to use instead")
+    parser.add_argument("--start", default=None, help="start date (YYYY-MM-DD), default: today")
+    parser.add_argument("--days", type=float, default=7, help="number of days to simulate")
+    parser.add_argument("--output", default=None, help="file to write the execution trace to (json)")
+    parser.add_argument("--verbose", action="store_true", help="show the plugins' log messages")
+    args = parser.parse_args()
+
+    if not args.verbose:
+        logging.disable(logging.INFO)
+
+    server_settings = json.load(open(args.settings))
+    db_path = args.db or server_settings.get("database", {}).get("path", "byb/db.json")
+    timetable = json.load(open(args.timetable)) if args.timetable else None
+    start_date = datetime.date.fromisoformat(args.start) if args.start else datetime.date.today()
+    start_time = datetime.datetime(start_date.year, start_date.month, start_date.day).timestamp()
+
+    intervals = run_simulation(db_path, start_time, args.days, server_settings, timetable)
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(intervals, f, indent=2)
+
+    totals = {}
+    for interval in intervals:
+        count, duration = totals.get(interval["zone"], (0, 0))
+        totals[interval["zone"]] = (count + 1, duration + (interval["duration"] or 0))
+    print(f"Simulated {args.days:g} days from {start_date.isoformat()} on, {len(intervals)} waterings.")
+    for zone, (count, duration) in sorted(totals.items()):
+        print(f"  {zone}: {count} waterings, {duration / 60:.1f} min")
+
+
+if __name__ == "__main__":
+    main()
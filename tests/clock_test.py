@@ -0,0 +1,112 @@
+#
+# clock_test.py
+# backyardbot
+#
+# Created: October 2026
+#
+
+import os
+import json
+import time
+import asyncio
+import logging
+import tempfile
+import unittest
+import datetime
+from framework.clock import Clock, VirtualTimeEventLoop
+from framework.communication import Topics
+from framework.event import EventComponent
+from simulate_byb import run_simulation
+
+
+quiet_settings = {"logging": {"log_to_stream": False, "log_to_file": False}}
+
+
+class TestVirtualTime(unittest.TestCase):
+
+    def setUp(self):
+        self.start_time = 1800000000.0
+        self.loop = VirtualTimeEventLoop(self.start_time)
+        Clock.set_time_source(self.loop.wall_time)
+
+    def tearDown(self):
+        Clock.set_time_source(None)
+        self.loop.close()
+
+    def test_sleep_advances_virtual_time(self):
+        async def main():
+            await asyncio.sleep(7 * 24 * 3600)
+            return Clock.time()
+
+        t = time.perf_counter()
+        self.assertEqual(self.loop.run_until_complete(main()), self.start_time + 7 * 24 * 3600)
+        self.assertLess(time.perf_counter() - t, 1)
+
+    def test_spin_until_on_virtual_time(self):
+        component = EventComponent(quiet_settings)
+
+        async def main():
+            returned = []
+            for delay in (3600, 60, 24 * 3600):
+                await component.spin_until(Clock.time() + delay)
+                returned.append(Clock.time())
+            return returned
+
+        try:
+            returned = self.loop.run_until_complete(main())
+        finally:
+            Topics.unregister(component)
+        self.assertEqual([round(t - self.start_time) for t in returned], [3600, 3660, 90060])
+
+
+class TestSimulation(unittest.TestCase):
+
+    def setUp(self):
+        logging.disable(logging.INFO)
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.plugin_dir = os.path.join(self.tmp_dir.name, "plugins")
+        for name in ("timecontrol", "sprinklerinterface"):
+            self._write_quiet_settings(name)
+
+    def tearDown(self):
+        logging.disable(logging.NOTSET)
+        self.tmp_dir.cleanup()
+
+    def _write_quiet_settings(self, plugin_name):
+        """ Copies the plugin's settings with file and stream logging turned off. """
+        with open(os.path.join("plugins", plugin_name, "settings.json")) as f:
+            settings = json.load(f)
+        quiet_logging = {"log_to_stream": False, "log_to_file": False}
+        settings["logging"] = quiet_logging
+        for actuator in settings.get("plugin_settings", {}).get("actuators", []):
+            actuator["actuator_specific_settings"]["logging"] = quiet_logging
+        os.makedirs(os.path.join(self.plugin_dir, plugin_name))
+        with open(os.path.join(self.plugin_dir, plugin_name, "settings.json"), "w") as f:
+            json.dump(settings, f)
+
+    def test_daily_watering_trace(self):
+        timetable = [
+            {"time_hh": 6, "time_mm": 0, "weekday": 7, "zones": ["Z1"], "duration": 120},
+            {"time_hh": 21, "time_mm": 30, "weekday": 7, "zones": ["ZS"], "duration": 60}
+        ]
+        start_time = datetime.datetime(2027, 3, 27).timestamp()
+        settings = {"general": {"language": ["en"]}}
+        intervals = run_simulation(
+            os.path.join(self.tmp_dir.name, "db.json"), start_time, 2, settings, timetable, self.plugin_dir)
+
+        # the six way distributor switches through the other channels with
+        # short waterings to get back to the first channel
+        padding = [i for i in intervals if i["zone"] in ("Z2", "Z3", "Z4")]
+        self.assertEqual([i["zone"] for i in padding], ["Z2", "Z3", "Z4"])
+        self.assertTrue(all(i["duration"] < 10 for i in padding))
+
+        scheduled = [i for i in intervals if i["zone"] in ("Z1", "ZS")]
+        self.assertEqual([i["zone"] for i in scheduled], ["Z1", "ZS", "Z1", "ZS"])
+        # on the second day, Z1 is reached after three paddings and cooldowns of 7 s each
+        self.assertEqual([i["on"] for i in scheduled],
+                         ["2027-03-27T06:00:00", "2027-03-27T21:30:00", "2027-03-28T06:00:42", "2027-03-28T21:30:00"])
+        self.assertEqual([i["duration"] for i in scheduled], [120, 60, 120, 60])
+
+
+if __name__ == "__main__":
+    unittest.main()
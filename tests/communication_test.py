@@ -0,0 +1,149 @@
+#
+# communication_test.py
+# backyardbot
+#
+# Created: October 2026
+#
+
+import asyncio
+import unittest
+from framework.communication import Topics, BaseMessage, WebsocketRequest, topic_matches
+from framework.event import EventComponent
+
+
+quiet_settings = {"logging": {"log_to_stream": False, "log_to_file": False}}
+
+
+class RecordingComponent(EventComponent):
+
+    def __init__(self, settings):
+        super().__init__(settings)
+        self.received = []
+        self.payloads = []
+
+    def receive_message(self, msg):
+        self.received.append(msg.topic)
+        self.payloads.append(msg.payload)
+
+    def handle(self, msg):
+        pass
+
+
+class TestTopicRouting(unittest.TestCase):
+
+    def setUp(self):
+        self.a = RecordingComponent(quiet_settings)
+        self.b = RecordingComponent(quiet_settings)
+
+    def tearDown(self):
+        Topics.unregister(self.a)
+        Topics.unregister(self.b)
+
+    def test_topic_matches(self):
+        self.assertTrue(topic_matches("websocket/*/frontend", "websocket/timetable/frontend"))
+        self.assertFalse(topic_matches("websocket/*/frontend", "websocket/timetable/backend"))
+        self.assertFalse(topic_matches("websocket/*/frontend", "websocket/frontend"))
+        self.assertTrue(topic_matches("will_shutdown", "will_shutdown"))
+
+    def test_only_subscribers_receive(self):
+        self.a.register_topic_callback("topic_a", self.a.handle)
+        self.b.register_topic_callback("topic_b", self.b.handle)
+
+        Topics.send_message(BaseMessage("topic_a"))
+        Topics.send_message(BaseMessage("unknown_topic"))
+
+        self.assertEqual(self.a.received, ["topic_a"])
+        self.assertEqual(self.b.received, [])
+
+    def test_wildcard_subscription(self):
+        self.a.register_topic_callback("websocket/*/frontend", self.a.handle)
+        self.b.register_topic_callback("websocket/timetable/frontend", self.b.handle)
+
+        Topics.send_message(BaseMessage("websocket/timetable/frontend"))
+        Topics.send_message(BaseMessage("websocket/debug/frontend"))
+
+        self.assertEqual(self.a.received, ["websocket/timetable/frontend", "websocket/debug/frontend"])
+        self.assertEqual(self.b.received, ["websocket/timetable/frontend"])
+
+    def test_unregister(self):
+        self.a.register_topic_callback("topic_a", self.a.handle)
+        Topics.send_message(BaseMessage("topic_a"))
+        Topics.unregister(self.a)
+        Topics.send_message(BaseMessage("topic_a"))
+        self.assertEqual(self.a.received, ["topic_a"])
+
+    def test_route_cache_is_bounded(self):
+        self.a.register_topic_callback("websocket/*/frontend", self.a.handle)
+        for i in range(100):
+            Topics.send_message(BaseMessage(f"unknown_topic_{i}"))
+        self.assertEqual(Topics._route_cache, {})
+
+        for i in range(Topics._route_cache_size + 10):
+            Topics.send_message(BaseMessage(f"websocket/plugin_{i}/frontend"))
+        self.assertLessEqual(len(Topics._route_cache), Topics._route_cache_size)
+        self.assertEqual(len(self.a.received), Topics._route_cache_size + 10)
+
+    def test_handler_lookup_prefers_exact_topic(self):
+        self.a.register_topic_callback("websocket/*/frontend", "wildcard")
+        self.a.register_topic_callback("websocket/debug/frontend", "exact")
+        self.assertEqual(self.a._get_message_handler("websocket/debug/frontend"), "exact")
+        self.assertEqual(self.a._get_message_handler("websocket/timetable/frontend"), "wildcard")
+        self.assertIsNone(self.a._get_message_handler("websocket/new_client"))
+
+
+class TestCoalescedTopics(unittest.TestCase):
+
+    def setUp(self):
+        self.a = RecordingComponent(quiet_settings)
+        self.a.register_topic_callback("state", self.a.handle)
+        Topics.coalesce_topic("state", 20)  # windows of 50 ms
+
+    def tearDown(self):
+        Topics.coalesce_topic("state", None)
+        Topics.unregister(self.a)
+
+    def test_latest_value_wins(self):
+        coalesced_count = Topics.coalesced_count
+
+        async def main():
+            for i in range(5):
+                Topics.send_message(WebsocketRequest("state", payload=i))
+            # unicast messages are coalesced independently of broadcasts
+            Topics.send_message(WebsocketRequest("state", payload="unicast", ws_id=1))
+            await asyncio.sleep(0.02)
+            self.assertEqual(self.a.payloads, [0, "unicast"])
+            await asyncio.sleep(0.05)
+            self.assertEqual(self.a.payloads, [0, "unicast", 4])
+            self.assertEqual(Topics.coalesced_count - coalesced_count, 3)
+            await asyncio.sleep(0.1)
+            Topics.send_message(WebsocketRequest("state", payload=5))
+            self.assertEqual(self.a.payloads, [0, "unicast", 4, 5])
+
+        asyncio.run(main())
+
+    def test_held_back_message_waits_for_queue_space(self):
+        settings = {**quiet_settings, "message_queue": {"max_length": 1, "overflow_policy": "block"}}
+        component = EventComponent(settings)
+        component.register_topic_callback("state", None)
+
+        async def main():
+            await Topics.publish(WebsocketRequest("state", payload=0))
+            # held back until the end of the window
+            await Topics.publish(WebsocketRequest("state", payload=1))
+            await asyncio.sleep(0.07)
+            # the queue is still full with the first message, the second one waits
+            self.assertEqual(component.get_queue_stats()["length"], 1)
+            self.assertEqual(component.get_queue_stats()["overflowed"], 0)
+
+            component._message_queue.pop()
+            await asyncio.sleep(0)
+            self.assertEqual(component._message_queue.pop()[1].payload, 1)
+
+        try:
+            asyncio.run(main())
+        finally:
+            Topics.unregister(component)
+
+
+if __name__ == "__main__":
+    unittest.main()
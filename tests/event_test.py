@@ -0,0 +1,111 @@
+#
+# event_test.py
+# backyardbot
+#
+# Created: October 2026
+#
+
+import time
+import asyncio
+import unittest
+from framework.communication import Topics, BaseMessage
+from framework.event import EventComponent
+
+
+quiet_settings = {"logging": {"log_to_stream": False, "log_to_file": False}}
+
+
+class SpinningComponent(EventComponent):
+
+    def __init__(self, settings):
+        super().__init__(settings)
+        self.log = []
+        self.register_topic_callback("example_topic", self.message_callback)
+
+    async def message_callback(self, msg):
+        self.log.append("msg")
+
+    async def event_loop(self):
+        rate = 20  # executed every 50 ms
+        while await self.spin_once(rate):
+            self.log.append("tick")
+
+
+class TestSpin(unittest.TestCase):
+
+    def setUp(self):
+        self.component = SpinningComponent(quiet_settings)
+
+    def tearDown(self):
+        Topics.unregister(self.component)
+
+    def test_ticks_messages_and_shutdown(self):
+        async def main():
+            task = asyncio.create_task(self.component.event_loop())
+            await asyncio.sleep(0.125)
+            Topics.send_message(BaseMessage("example_topic"))
+            await asyncio.sleep(0.05)
+            self.component.shutdown()
+            await asyncio.wait_for(task, 1)
+
+        asyncio.run(main())
+        self.assertEqual(self.component.log, ["tick", "tick", "tick", "msg", "tick"])
+
+        metrics = self.component.get_spin_metrics()
+        self.assertEqual(metrics["ticks"], 4)
+        self.assertEqual(metrics["callbacks"], 1)
+        self.assertLess(metrics["drift_max"], 0.02)
+
+
+class DeadlineComponent(EventComponent):
+
+    def __init__(self, settings):
+        super().__init__(settings)
+        self.wakeup_time = None
+        self.returns = []
+        self.register_topic_callback("reschedule", self.reschedule)
+
+    def reschedule(self, msg):
+        self.wakeup_time = msg.payload
+        self.wake_up()
+
+    async def event_loop(self):
+        while await self.spin_until(self.wakeup_time):
+            self.returns.append(time.time())
+            if self.wakeup_time is not None and time.time() >= self.wakeup_time:
+                self.wakeup_time = None  # job done
+
+
+class TestSpinUntil(unittest.TestCase):
+
+    def setUp(self):
+        self.component = DeadlineComponent(quiet_settings)
+
+    def tearDown(self):
+        Topics.unregister(self.component)
+
+    def test_sleeps_until_deadline_and_wakes_up_early(self):
+        async def main():
+            task = asyncio.create_task(self.component.event_loop())
+            await asyncio.sleep(0.05)
+            # without a wakeup time, the component only returns if woken up
+            self.assertEqual(self.component.returns, [])
+
+            deadline = time.time() + 0.1
+            Topics.send_message(BaseMessage("reschedule", deadline))
+            await asyncio.sleep(0.02)
+            self.assertEqual(len(self.component.returns), 1)  # woken up by the message
+            await asyncio.sleep(0.1)
+            self.assertEqual(len(self.component.returns), 2)  # deadline reached
+            self.assertGreaterEqual(self.component.returns[1], deadline)
+
+            self.component.shutdown()
+            await asyncio.wait_for(task, 1)
+
+        asyncio.run(main())
+        metrics = self.component.get_spin_metrics()
+        self.assertLess(metrics["drift_max"], 0.02)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,83 @@
+#
+# framing_test.py
+# backyardbot
+#
+# Created: October 2026
+#
+
+import json
+import unittest
+from framework import framing
+from framework.framing import JsonFraming, MsgpackFraming, create_framings, JSON_PROTOCOL, MSGPACK_PROTOCOL
+
+
+TIMETABLE = [{"time_hh": 7, "time_mm": i % 60, "weekday": i % 8, "zones": ["Z1", "Z2"], "duration": 600, "doc_id": i}
+             for i in range(200)]
+
+
+@unittest.skipIf(framing.msgpack is None, "msgpack is not installed")
+class TestMsgpackFraming(unittest.TestCase):
+
+    def setUp(self):
+        self.framing = MsgpackFraming(["timetable", "sprinklerinterface"])
+
+    def unpack(self, data):
+        return framing.msgpack.unpackb(data, raw=False)
+
+    def test_frames_use_plugin_ids(self):
+        self.assertEqual(self.unpack(self.framing.dictionary_frame()), [3, ["timetable", "sprinklerinterface"]])
+        message = {"plugin_name": "sprinklerinterface", "payload": {"command": "x", "payload": None}}
+        self.assertEqual(self.unpack(self.framing.encode(message)), [0, 1, {"command": "x", "payload": None}])
+        # plugins that aren't in the dictionary are sent by name
+        message["plugin_name"] = "debug"
+        self.assertEqual(self.unpack(self.framing.encode(message))[1], "debug")
+
+    def test_state_frames(self):
+        snapshot = {"plugin_name": "timetable", "payload": {"command": "c", "payload": TIMETABLE}, "state_version": 4}
+        self.assertEqual(self.unpack(self.framing.encode(snapshot)), [1, 0, snapshot["payload"], 4])
+        ops = [{"op": "remove", "path": "/3"}]
+        patch = {"plugin_name": "timetable",
+                 "state_patch": {"command": "c", "base_version": 4, "version": 5, "ops": ops}}
+        self.assertEqual(self.unpack(self.framing.encode(patch)), [2, 0, "c", 4, 5, ops])
+        # the server's time is appended to state frames that carry it
+        patch["server_time"] = 1800000000.5
+        self.assertEqual(self.unpack(self.framing.encode(patch)), [2, 0, "c", 4, 5, ops, 1800000000.5])
+
+        # the binary frame is much smaller than the json text
+        self.assertLess(len(self.framing.encode(snapshot)), 0.8 * len(JsonFraming().encode(snapshot).encode()))
+
+    def test_decode_client_frames(self):
+        pack = framing.msgpack.packb
+        self.assertEqual(self.framing.decode(pack([0, 0, {"command": "add_entries"}])),
+                         {"plugin_name": "timetable", "payload": {"command": "add_entries"}})
+        self.assertEqual(self.framing.decode(pack([4, 1, "update_frontend_state"])),
+                         {"plugin_name": "sprinklerinterface", "sync_request": "update_frontend_state"})
+        self.assertEqual(self.framing.decode(pack([0, "debug", 1]))["plugin_name"], "debug")
+        with self.assertRaises(ValueError):
+            self.framing.decode(pack([2, 0, "c", 1, 2, []]))
+
+    def test_batch_frames(self):
+        for count in (1, 15, 16, 70000):
+            frames = [{"plugin_name": "timetable", "payload": i} for i in range(count)]
+            batch = self.framing.encode_batch([self.framing.encode(f) for f in frames])
+            self.assertEqual(self.unpack(batch), [5, [[0, 0, i] for i in range(count)]])
+
+
+class TestCreateFramings(unittest.TestCase):
+
+    def test_json_is_always_offered_last(self):
+        framings = create_framings(["timetable"], {})
+        self.assertEqual(list(framings)[-1], JSON_PROTOCOL)
+        self.assertEqual(MSGPACK_PROTOCOL in framings, framing.msgpack is not None)
+        self.assertEqual(list(create_framings(["timetable"], {"ws_compact_framing": False})), [JSON_PROTOCOL])
+
+        frame = {"plugin_name": "timetable", "payload": [1, 2]}
+        self.assertEqual(json.loads(framings[JSON_PROTOCOL].encode(frame)), frame)
+        self.assertIsNone(framings[JSON_PROTOCOL].dictionary_frame())
+
+        batch = framings[JSON_PROTOCOL].encode_batch([framings[JSON_PROTOCOL].encode(frame)] * 2)
+        self.assertEqual(json.loads(batch), [frame, frame])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,223 @@
+#
+# memory_test.py
+# backyardbot
+#
+# Created: October 2026
+#
+
+import os
+import json
+import asyncio
+import shutil
+import tempfile
+import threading
+import unittest
+from unittest import mock
+from tinydb import Query
+from framework.memory import Database
+from framework.event import EventComponent
+from framework.communication import Topics
+
+
+quiet_settings = {"logging": {"log_to_stream": False, "log_to_file": False}}
+
+
+class RecordingComponent(EventComponent):
+
+    def __init__(self, settings):
+        super().__init__(settings)
+        self.payloads = []
+
+    def receive_message(self, msg):
+        self.payloads.append(msg.payload)
+
+
+class TestWriteBehindStorage(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.path = os.path.join(self.tmp_dir, "db.json")
+        Database.set_db_path(self.path, write_behind=True)
+
+    def tearDown(self):
+        Database.db.close()
+        shutil.rmtree(self.tmp_dir)
+
+    def read_file(self):
+        if not os.path.exists(self.path):
+            return None
+        with open(self.path) as f:
+            return json.load(f)
+
+    def test_writes_are_deferred(self):
+        table = Database.get_db_for("example_table")
+        table.insert({"value": 1})
+        table.insert({"value": 2})
+        self.assertEqual([e["value"] for e in table.all()], [1, 2])
+        self.assertIsNone(self.read_file())
+
+        Database.flush()
+        self.assertEqual(len(self.read_file()["example_table"]), 2)
+        self.assertFalse(os.path.exists(self.path + ".tmp"))
+
+        stats = Database.get_stats()["storage"]["total"]
+        self.assertEqual(stats["writes"], 2)
+        self.assertEqual(stats["flushes"], 1)
+
+    def test_flush_waits_for_table_operations(self):
+        table = Database.get_db_for("example_table")
+        table.insert({"value": 1})
+        operation_running = threading.Event()
+        finish_operation = threading.Event()
+
+        def slow_search(doc):
+            operation_running.set()
+            finish_operation.wait(5)
+            return True
+
+        searcher = threading.Thread(target=table.search, args=(Query().value.test(slow_search),))
+        searcher.start()
+        operation_running.wait(5)
+        flusher = threading.Thread(target=Database.flush)
+        flusher.start()
+        flusher.join(0.1)
+        # the data isn't serialized while a table operation accesses it
+        self.assertTrue(flusher.is_alive())
+        self.assertIsNone(self.read_file())
+
+        finish_operation.set()
+        searcher.join()
+        flusher.join()
+        self.assertEqual(self.read_file()["example_table"], {"1": {"value": 1}})
+
+    def test_failed_directory_fsync_isnt_counted(self):
+        Database.get_db_for("example_table").insert({"value": 1})
+        storage = Database.db.storage
+        with mock.patch.object(storage, "_fsync_directory", return_value=False):
+            Database.flush()
+        self.assertEqual(Database.get_stats()["storage"]["total"]["fsyncs"], 1)
+
+        storage.write(storage.read())
+        Database.flush()
+        self.assertEqual(Database.get_stats()["storage"]["total"]["fsyncs"], 3)
+
+    def test_write_during_file_write_is_flushed_later(self):
+        table = Database.get_db_for("example_table")
+        table.insert({"value": 1})
+        fsync = os.fsync
+
+        def insert_during_fsync(fd):
+            # the file is written without holding the lock, tables can be modified meanwhile
+            os.fsync = fsync
+            table.insert({"value": 2})
+            fsync(fd)
+
+        with mock.patch("os.fsync", insert_during_fsync):
+            Database.flush()
+        self.assertEqual(self.read_file()["example_table"], {"1": {"value": 1}})
+
+        Database.flush()
+        self.assertEqual(self.read_file()["example_table"], {"1": {"value": 1}, "2": {"value": 2}})
+
+    def test_reload_from_disk(self):
+        Database.get_db_for("example_table").insert({"value": 3})
+        Database.db.close()
+        Database.set_db_path(self.path, write_behind=True)
+        self.assertEqual(Database.get_db_for("example_table").all(), [{"value": 3}])
+
+
+class TestAsyncTable(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        Database.set_db_path(os.path.join(self.tmp_dir, "db.json"), write_behind=True)
+
+    def tearDown(self):
+        Database.db.close()
+        shutil.rmtree(self.tmp_dir)
+
+    def test_async_operations(self):
+        async def main():
+            table = Database.get_async_db_for("example_table")
+            doc_ids = await table.insert_multiple([{"value": 1}, {"value": 2}])
+            await table.update({"value": 5}, doc_ids=[doc_ids[0]])
+            await table.remove(doc_ids=[doc_ids[1]])
+            return await table.all()
+
+        worker_count = Database.worker_latency.count
+        self.assertEqual(asyncio.run(main()), [{"value": 5}])
+        self.assertEqual(Database.worker_latency.count - worker_count, 4)
+        self.assertEqual(Database.get_db_for("example_table").all(), [{"value": 5}])
+
+
+class TestChangeFeed(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        Database.set_db_path(os.path.join(self.tmp_dir, "db.json"), write_behind=True)
+        self.subscriber = RecordingComponent(quiet_settings)
+        self.subscriber.register_topic_callback(Database.get_update_topic("example_table"), None)
+
+    def tearDown(self):
+        Topics.unregister(self.subscriber)
+        Database.db.close()
+        shutil.rmtree(self.tmp_dir)
+
+    def test_sync_modifications(self):
+        table = Database.get_db_for("example_table")
+        doc_id = table.insert({"value": 1})
+        table.update({"value": 2}, doc_ids=[doc_id])
+        table.remove(doc_ids=[doc_id])
+        # tables without subscribers don't publish anything
+        Database.get_db_for("other_table").insert({"value": 1})
+
+        inserted, updated, removed = self.subscriber.payloads
+        self.assertEqual(inserted.inserted, {doc_id: {"value": 1}})
+        self.assertEqual(updated.updated, {doc_id: {"value": 2}})
+        self.assertEqual(removed.removed, [doc_id])
+        self.assertEqual(removed.changed_doc_ids(), {doc_id})
+
+    def test_async_modifications_arrive_before_await_returns(self):
+        async def main():
+            table = Database.get_async_db_for("example_table")
+            doc_ids = await table.insert_multiple([{"value": 1}, {"value": 2}])
+            self.assertEqual(len(self.subscriber.payloads), 1)
+            await table.truncate()
+            self.assertEqual(len(self.subscriber.payloads), 2)
+            return doc_ids
+
+        doc_ids = asyncio.run(main())
+        inserted, removed = self.subscriber.payloads
+        self.assertEqual(inserted.table, "example_table")
+        self.assertEqual(inserted.inserted, {doc_ids[0]: {"value": 1}, doc_ids[1]: {"value": 2}})
+        self.assertEqual(sorted(removed.removed), doc_ids)
+
+    def test_subscribers_are_looked_up_on_the_event_loop(self):
+        threads = set()
+        get_subscribers = Topics.get_subscribers
+
+        def recording_get_subscribers(topic_name):
+            threads.add(threading.current_thread())
+            return get_subscribers(topic_name)
+
+        async def main():
+            table = Database.get_async_db_for("example_table")
+            await table.insert({"value": 1})
+            await Database.get_async_db_for("unobserved_table").insert({"value": 2})
+
+        with mock.patch.object(Topics, "get_subscribers", recording_get_subscribers):
+            asyncio.run(main())
+        self.assertEqual(threads, {threading.main_thread()})
+        self.assertEqual(len(self.subscriber.payloads), 1)
+
+    def test_disabled_hook(self):
+        Database.set_table_update_hook("example_table", enabled=False)
+        try:
+            Database.get_db_for("example_table").insert({"value": 1})
+        finally:
+            Database.set_table_update_hook("example_table")
+        self.assertEqual(self.subscriber.payloads, [])
+
+
+if __name__ == "__main__":
+    unittest.main()
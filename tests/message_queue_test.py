@@ -0,0 +1,119 @@
+#
+# message_queue_test.py
+# backyardbot
+#
+# Created: October 2026
+#
+
+import asyncio
+import unittest
+from framework.communication import Topics, BaseMessage, WebsocketRequest
+from framework.event import EventComponent
+from framework.message_queue import MessageQueue, PRIORITY_HIGH, PRIORITY_NORMAL, PRIORITY_LOW
+
+
+def drain(queue):
+    topics = []
+    while queue:
+        topics.append(queue.pop()[1].topic)
+    return topics
+
+
+class TestMessageQueue(unittest.TestCase):
+
+    def test_priority_lanes(self):
+        q = MessageQueue(max_length=None)
+        q.put(BaseMessage("ui_1"), PRIORITY_LOW)
+        q.put(BaseMessage("cmd_1"), PRIORITY_NORMAL)
+        q.put(BaseMessage("will_shutdown"), PRIORITY_HIGH)
+        q.put(BaseMessage("cmd_2"), PRIORITY_NORMAL)
+        self.assertEqual(drain(q), ["will_shutdown", "cmd_1", "cmd_2", "ui_1"])
+
+    def test_drop_oldest(self):
+        q = MessageQueue(max_length=2, overflow_policy="drop_oldest")
+        q.put(BaseMessage("cmd"), PRIORITY_HIGH)
+        q.put(BaseMessage("ui_1"), PRIORITY_LOW)
+        self.assertTrue(q.put(BaseMessage("ui_2"), PRIORITY_LOW))
+        self.assertEqual(drain(q), ["cmd", "ui_2"])
+        self.assertEqual(q.stats["dropped"], 1)
+
+        # a less important message never pushes out a more important one
+        q.put(BaseMessage("cmd_1"), PRIORITY_HIGH)
+        q.put(BaseMessage("cmd_2"), PRIORITY_HIGH)
+        self.assertFalse(q.put(BaseMessage("ui_3"), PRIORITY_LOW))
+        self.assertEqual(drain(q), ["cmd_1", "cmd_2"])
+
+    def test_drop_newest(self):
+        q = MessageQueue(max_length=1, overflow_policy="drop_newest")
+        self.assertTrue(q.put(BaseMessage("first")))
+        self.assertFalse(q.put(BaseMessage("second")))
+        self.assertEqual(drain(q), ["first"])
+        self.assertEqual(q.stats["dropped"], 1)
+
+    def test_coalesce(self):
+        q = MessageQueue(max_length=2, overflow_policy="coalesce")
+        q.put(WebsocketRequest("state", payload=1))
+        q.put(WebsocketRequest("other", payload=2))
+        self.assertFalse(q.put(WebsocketRequest("state", payload=3)))
+        self.assertEqual([q.pop()[1].payload for _ in range(2)], [3, 2])
+        self.assertEqual(q.stats["coalesced"], 1)
+
+    def test_block_keeps_messages(self):
+        q = MessageQueue(max_length=1, overflow_policy="block")
+        q.put(BaseMessage("first"))
+        self.assertTrue(q.put(BaseMessage("second")))
+        self.assertEqual(q.stats["overflowed"], 1)
+        self.assertEqual(drain(q), ["first", "second"])
+
+    def test_block_releases_one_waiter_at_a_time(self):
+        async def main():
+            q = MessageQueue(max_length=2, overflow_policy="block")
+            q.put(BaseMessage("a"))
+            q.put(BaseMessage("b"))
+            released = []
+
+            async def producer(name):
+                await q.wait_for_space()
+                released.append(name)
+                q.put(BaseMessage(name))
+
+            tasks = [asyncio.create_task(producer(f"p{i}")) for i in range(3)]
+            await asyncio.sleep(0)
+            self.assertEqual(released, [])
+
+            q.pop()
+            await asyncio.sleep(0)
+            # the first producer filled the queue again, the others still wait
+            self.assertEqual(released, ["p0"])
+            self.assertEqual(len(q), 2)
+
+            drain(q)
+            await asyncio.gather(*tasks)
+            self.assertEqual(released, ["p0", "p1", "p2"])
+            self.assertEqual(q.stats["overflowed"], 0)
+
+        asyncio.run(main())
+
+
+class TestBlockingComponentQueue(unittest.TestCase):
+
+    def test_send_message_stays_bounded(self):
+        settings = {
+            "logging": {"log_to_stream": False, "log_to_file": False},
+            "message_queue": {"max_length": 5, "overflow_policy": "block"}
+        }
+        component = EventComponent(settings)
+        component.register_topic_callback("flood", None)
+        try:
+            # producers that don't await `Topics.publish(..)` can't grow the queue without limit
+            for i in range(100):
+                Topics.send_message(BaseMessage("flood", i))
+            stats = component.get_queue_stats()
+            self.assertEqual(stats["length"], 10)
+            self.assertEqual(stats["overflowed"], 5)
+            self.assertEqual(stats["dropped"], 90)
+        finally:
+            Topics.unregister(component)
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,76 @@
+#
+# plugin_render_test.py
+# backyardbot
+#
+# Created: October 2026
+#
+
+import os
+import json
+import shutil
+import tempfile
+import unittest
+from framework.plugin import Plugin
+from framework.communication import Topics
+
+
+class CountingPlugin(Plugin):
+
+    def initialize(self, settings):
+        self.value = 1
+        self.calc_count = 0
+
+    def calc_render_data(self):
+        self.calc_count += 1
+        return {"value": self.value}
+
+
+class TrackingPlugin(CountingPlugin):
+    tracks_render_data_changes = True
+
+
+class TestFragmentCache(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        plugin_dir = os.path.join(self.tmp_dir, "example")
+        os.mkdir(plugin_dir)
+        with open(os.path.join(plugin_dir, "example.html"), "w") as f:
+            f.write("{{ localization['label'] }}: {{ values['value'] }}")
+        self.settings_path = os.path.join(plugin_dir, "settings.json")
+        with open(self.settings_path, "w") as f:
+            json.dump({
+                "html_template": "example.html",
+                "logging": {"log_to_stream": False, "log_to_file": False},
+                "localization": {"en": {"label": "Value"}}
+            }, f)
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir)
+
+    def create_plugin(self, plugin_class):
+        plugin = plugin_class("example", self.settings_path)
+        plugin.set_localization_data({"general": {"language": ["en"]}})
+        self.addCleanup(Topics.unregister, plugin)
+        return plugin
+
+    def test_untracked_render_data(self):
+        # isn't cached, the render data is computed for every page request
+        plugin = self.create_plugin(CountingPlugin)
+        self.assertEqual(plugin.render(), "Value: 1")
+        plugin.value = 2
+        self.assertEqual(plugin.render(), "Value: 2")
+        self.assertEqual(plugin.calc_count, 2)
+
+    def test_tracked_render_data(self):
+        plugin = self.create_plugin(TrackingPlugin)
+        self.assertEqual(plugin.render(), "Value: 1")
+        plugin.value = 2
+        self.assertEqual(plugin.render(), "Value: 1")
+        self.assertEqual(plugin.calc_count, 1)
+        plugin.mark_render_data_changed()
+        self.assertEqual(plugin.render(), "Value: 2")
+
+
+if __name__ == "__main__":
+    unittest.main()
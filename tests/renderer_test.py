@@ -0,0 +1,47 @@
+#
+# renderer_test.py
+# backyardbot
+#
+# Created: October 2026
+#
+
+import os
+import tempfile
+import unittest
+from framework.renderer import TemplateCache
+
+
+class TestTemplateCache(unittest.TestCase):
+
+    def setUp(self):
+        fd, self.path = tempfile.mkstemp(suffix=".html")
+        os.close(fd)
+        self.write_template("Hello {{ name }}", mtime=1)
+
+    def tearDown(self):
+        TemplateCache.set_reload_on_change(False)
+        os.remove(self.path)
+
+    def write_template(self, text, mtime):
+        with open(self.path, "w") as f:
+            f.write(text)
+        os.utime(self.path, (mtime, mtime))
+
+    def test_compiled_once(self):
+        TemplateCache.set_reload_on_change(False)
+        t = TemplateCache.get_template(self.path)
+        self.assertEqual(TemplateCache.get_undeclared_variables(self.path), {"name"})
+        self.write_template("Bye {{ name }}", mtime=2)
+        self.assertIs(TemplateCache.get_template(self.path), t)
+
+    def test_reload_on_mtime_change(self):
+        TemplateCache.set_reload_on_change(True)
+        t = TemplateCache.get_template(self.path)
+        self.assertIs(TemplateCache.get_template(self.path), t)
+        self.write_template("Bye {{ person }}", mtime=2)
+        self.assertEqual(TemplateCache.get_template(self.path).render(person="you"), "Bye you")
+        self.assertEqual(TemplateCache.get_undeclared_variables(self.path), {"person"})
+
+
+if __name__ == "__main__":
+    unittest.main()
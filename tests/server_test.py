@@ -0,0 +1,61 @@
+#
+# server_test.py
+# backyardbot
+#
+# Created: October 2026
+#
+
+import os
+import json
+import asyncio
+import shutil
+import tempfile
+import unittest
+from framework.main import Server
+from framework.memory import Database
+
+
+class IdlePlugin:
+    """ Stands in for a plugin whose event loop runs until it's cancelled. """
+
+    def __init__(self, name):
+        self.name = name
+        self.logger = None
+
+    async def event_loop(self):
+        await asyncio.Event().wait()
+
+
+class TestShutdown(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.path = os.path.join(self.tmp_dir, "db.json")
+        Database.set_db_path(self.path, write_behind=True)
+
+    def tearDown(self):
+        Database.db.close()
+        shutil.rmtree(self.tmp_dir)
+
+    def test_pending_writes_reach_disk(self):
+        # the constructor starts serving, only the parts used by the background tasks are set up
+        server = Server.__new__(Server)
+        server.plugins_list = [IdlePlugin("first"), IdlePlugin("second")]
+        server.event_loop = IdlePlugin("server").event_loop
+        server.logger = None
+        app = {}
+
+        async def run_app():
+            await server.start_background_tasks(app)
+            await asyncio.sleep(0)
+            Database.get_db_for("example_table").insert({"value": 1})
+            await server.cleanup_background_tasks(app)
+
+        asyncio.run(run_app())
+        self.assertTrue(all(app[name].cancelled() for name in ("server_msg_loop", "first", "second")))
+        with open(self.path) as f:
+            self.assertEqual(json.load(f)["example_table"], {"1": {"value": 1}})
+
+
+if __name__ == "__main__":
+    unittest.main()
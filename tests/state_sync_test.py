@@ -0,0 +1,99 @@
+#
+# state_sync_test.py
+# backyardbot
+#
+# Created: October 2026
+#
+
+import copy
+import json
+import random
+import unittest
+from framework.state_sync import json_diff, apply_patch, StateSync
+
+
+def random_entry(rng, doc_id):
+    return {
+        "time_hh": rng.randint(0, 23), "time_mm": rng.randint(0, 59), "weekday": rng.randint(0, 7),
+        "zones": rng.sample(["Z1", "Z2", "Z3", "Z/4", "Z~5"], rng.randint(1, 3)),
+        "duration": rng.choice([60, 300, 600]), "doc_id": doc_id
+    }
+
+
+class TestJsonDiff(unittest.TestCase):
+
+    def assert_patch_turns(self, old, new):
+        ops = json_diff(old, new)
+        self.assertEqual(apply_patch(copy.deepcopy(old), ops), new)
+        return ops
+
+    def test_single_change_in_sorted_list(self):
+        entries = [{"doc_id": i, "duration": 60} for i in range(100)]
+        inserted = entries[:40] + [{"doc_id": 500, "duration": 120}] + entries[40:]
+        self.assertEqual(self.assert_patch_turns(entries, inserted), [
+            {"op": "add", "path": "/40", "value": {"doc_id": 500, "duration": 120}}])
+        self.assertEqual(self.assert_patch_turns(entries, entries[:10] + entries[11:]), [
+            {"op": "remove", "path": "/10"}])
+
+    def test_nested_changes(self):
+        old = {"a": [1, 2, {"b": True}], "c": "x", "d/e": 1, "f": None}
+        new = {"a": [1, 3, {"b": 1}, 4], "d/e": 2, "f": {"g": []}, "h": 0.5}
+        self.assert_patch_turns(old, new)
+        self.assert_patch_turns([1, 2], {"a": 1})
+        self.assertEqual(json_diff({"x": [1]}, {"x": [1]}), [])
+
+    def test_random_timetables(self):
+        rng = random.Random(21)
+        for _ in range(300):
+            old = [random_entry(rng, i) for i in range(rng.randint(0, 30))]
+            new = copy.deepcopy(old)
+            for _ in range(rng.randint(1, 4)):
+                action = rng.random()
+                if action < 0.4 or not new:
+                    new.insert(rng.randint(0, len(new)), random_entry(rng, rng.randint(100, 200)))
+                elif action < 0.7:
+                    del new[rng.randrange(len(new))]
+                else:
+                    new[rng.randrange(len(new))]["zones"].append("Z6")
+            self.assert_patch_turns(old, new)
+
+
+class TestStateSync(unittest.TestCase):
+
+    def setUp(self):
+        self.sync = StateSync()
+        self.table = [{"doc_id": i, "zones": ["Z1"], "duration": 600} for i in range(50)]
+
+    def test_versions_and_patches(self):
+        first = self.sync.update("timetable", "timetable_contents", self.table)
+        self.assertEqual(first["state_version"], 1)
+        self.assertEqual(first["payload"], {"command": "timetable_contents", "payload": self.table})
+
+        # unchanged state isn't sent again
+        self.assertIsNone(self.sync.update("timetable", "timetable_contents", self.table))
+
+        client_state = copy.deepcopy(first["payload"]["payload"])
+        self.table.insert(3, {"doc_id": 99, "zones": ["Z2"], "duration": 60})
+        patch = self.sync.update("timetable", "timetable_contents", self.table)["state_patch"]
+        self.assertEqual((patch["base_version"], patch["version"]), (1, 2))
+        self.assertEqual(apply_patch(client_state, patch["ops"]), self.table)
+        # the patch is much shorter than the table
+        self.assertLess(len(json.dumps(patch)), len(json.dumps(self.table)) / 10)
+        self.assertEqual(self.sync.get_stats(), {"patches_sent": 1, "snapshots_sent": 1})
+
+    def test_large_changes_are_sent_as_snapshot(self):
+        self.sync.update("p", "state", {"a": 1})
+        frame = self.sync.update("p", "state", {"b": 2})
+        self.assertEqual(frame["state_version"], 2)
+        self.assertEqual(self.sync.get_version("p", "state"), 2)
+
+    def test_snapshot_for_new_client(self):
+        self.assertIsNone(self.sync.snapshot_frame("p", "state"))
+        self.sync.update("p", "state", (1, 2))
+        self.sync.update("p", "state", (1, 2, 3))
+        self.assertEqual(self.sync.snapshot_frame("p", "state"), {
+            "plugin_name": "p", "payload": {"command": "state", "payload": [1, 2, 3]}, "state_version": 2})
+
+
+if __name__ == "__main__":
+    unittest.main()
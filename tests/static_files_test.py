@@ -0,0 +1,68 @@
+#
+# static_files_test.py
+# backyardbot
+#
+# Created: October 2026
+#
+
+import gzip
+import unittest
+from aiohttp import web
+from aiohttp.test_utils import make_mocked_request
+from framework.static_files import StaticFileCache
+
+
+class TestStaticFileCache(unittest.TestCase):
+
+    def setUp(self):
+        self.path = "web/byb.js"
+        self.cache = StaticFileCache([self.path])
+        with open(self.path, "rb") as f:
+            self.data = f.read()
+
+    def request(self, url, **headers):
+        return make_mocked_request("GET", url, headers=headers)
+
+    def test_versioned_url_is_immutable(self):
+        url = self.cache.url_for(self.path)
+        response = self.cache.response_for(self.path, self.request("/" + url))
+        self.assertEqual(response.headers["Cache-Control"], StaticFileCache.immutable_cache_control)
+
+        response = self.cache.response_for(self.path, self.request("/" + self.path))
+        self.assertEqual(response.headers["Cache-Control"], StaticFileCache.revalidate_cache_control)
+        self.assertEqual(response.body, self.data)
+
+    def test_conditional_request(self):
+        etag = self.cache.response_for(self.path, self.request("/" + self.path)).headers["ETag"]
+        response = self.cache.response_for(self.path, self.request("/" + self.path, **{"If-None-Match": etag}))
+        self.assertEqual(response.status, 304)
+        response = self.cache.response_for(self.path, self.request("/" + self.path, **{"If-None-Match": '"x"'}))
+        self.assertEqual(response.status, 200)
+
+    def test_precompressed(self):
+        response = self.cache.response_for(self.path, self.request("/" + self.path, **{"Accept-Encoding": "gzip"}))
+        self.assertEqual(response.headers["Content-Encoding"], "gzip")
+        self.assertEqual(gzip.decompress(response.body), self.data)
+
+    def test_etag_per_encoding(self):
+        identity = self.cache.response_for(self.path, self.request("/" + self.path))
+        compressed = self.cache.response_for(self.path, self.request("/" + self.path, **{"Accept-Encoding": "gzip"}))
+        self.assertNotEqual(identity.headers["ETag"], compressed.headers["ETag"])
+        # the identity version's ETag doesn't validate the compressed one
+        response = self.cache.response_for(self.path, self.request(
+            "/" + self.path, **{"Accept-Encoding": "gzip", "If-None-Match": identity.headers["ETag"]}))
+        self.assertEqual(response.status, 200)
+
+    def test_rejected_encoding(self):
+        response = self.cache.response_for(self.path, self.request(
+            "/" + self.path, **{"Accept-Encoding": "br;q=0, gzip;q=0"}))
+        self.assertNotIn("Content-Encoding", response.headers)
+        self.assertEqual(response.body, self.data)
+
+    def test_unknown_file(self):
+        with self.assertRaises(web.HTTPNotFound):
+            self.cache.response_for("web/index.html", self.request("/web/index.html"))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,151 @@
+#
+# ws_client_test.py
+# backyardbot
+#
+# Created: October 2026
+#
+
+import asyncio
+import logging
+import unittest
+from framework.ws_client import WebsocketClient, ClientRegistry, PluginTraffic
+
+
+class FakeWriter:
+    def __init__(self, compress):
+        self.compress = compress
+
+
+class FakeWebsocket:
+
+    def __init__(self, send_delay=0, compress=0):
+        self.send_delay = send_delay
+        self.sent = []
+        # window bits per sent message if it was compressed on request
+        self.compressed = []
+        self.closed = False
+        # negotiated permessage-deflate window bits, 0 without compression
+        self.compress = compress
+        self._writer = FakeWriter(compress)
+
+    async def send_str(self, data, compress=None):
+        await asyncio.sleep(self.send_delay)
+        self.sent.append(data)
+        self.compressed.append(compress)
+
+    async def send_bytes(self, data, compress=None):
+        await self.send_str(data, compress)
+
+    async def close(self):
+        self.closed = True
+
+
+class TestWebsocketClient(unittest.TestCase):
+
+    def setUp(self):
+        self.logger = logging.getLogger("ws_client_test")
+        self.logger.addHandler(logging.NullHandler())
+        self.logger.propagate = False
+
+    def test_slow_client_doesnt_block_others(self):
+        async def main():
+            fast_ws, slow_ws = FakeWebsocket(), FakeWebsocket(send_delay=10)
+            evicted = []
+            fast = WebsocketClient(fast_ws, 1, self.logger)
+            slow = WebsocketClient(slow_ws, 2, self.logger, send_timeout=0.01, max_failures=2,
+                                   on_evict=evicted.append)
+            for client in (fast, slow):
+                client.start()
+
+            for i in range(3):
+                fast.send_str(str(i))
+                slow.send_str(str(i))
+            await asyncio.sleep(0.05)
+
+            self.assertEqual(fast_ws.sent, ["0", "1", "2"])
+            self.assertEqual(fast.get_info()["messages_sent"], 3)
+            self.assertEqual(fast.get_info()["bytes_sent"], 3)
+            self.assertEqual(slow_ws.sent, [])
+            self.assertEqual(evicted, [slow])
+            self.assertTrue(slow_ws.closed)
+            fast.stop()
+
+        asyncio.run(main())
+
+    def test_buffer_overflow_evicts(self):
+        async def main():
+            ws = FakeWebsocket()
+            evicted = []
+            client = WebsocketClient(ws, 1, self.logger, buffer_size=2, max_failures=2, on_evict=evicted.append)
+            # writer coroutine isn't started, so the buffer fills up
+            for i in range(4):
+                client.send_str(str(i))
+            await asyncio.sleep(0)
+            self.assertEqual(evicted, [client])
+
+        asyncio.run(main())
+
+    def test_compression_threshold(self):
+        async def main():
+            ws = FakeWebsocket(compress=15)
+            totals = PluginTraffic()
+            client = WebsocketClient(ws, 1, self.logger, compression_threshold=100, total_traffic=totals)
+            # the writer doesn't compress on its own anymore
+            self.assertEqual(ws._writer.compress, 0)
+            client.start()
+            client.send_str("x" * 10, plugin_name="timetable")
+            client.send_str(b"x" * 200, plugin_name="timetable")
+            client.send_str("y" * 100, plugin_name="sprinklerinterface")
+            client.record_received(20, "timetable")
+            # several frames in one message are counted for each plugin
+            client.send_batch("z" * 50, [("timetable", 20), ("sprinklerinterface", 28)])
+            await asyncio.sleep(0.01)
+
+            self.assertEqual(ws.compressed, [None, 15, 15, None])
+            self.assertEqual(client.get_info()["messages_sent"], 4)
+            self.assertEqual(client.get_info()["plugins"], {
+                "timetable": {"messages_sent": 3, "bytes_sent": 230, "messages_received": 1, "bytes_received": 20},
+                "sprinklerinterface": {
+                    "messages_sent": 2, "bytes_sent": 128, "messages_received": 0, "bytes_received": 0}
+            })
+            # the shared totals are recorded together with the client's counters
+            self.assertEqual(totals.asdict(), client.get_info()["plugins"])
+            client.stop()
+
+            # without a threshold, aiohttp compresses everything once negotiated
+            ws = FakeWebsocket(compress=15)
+            WebsocketClient(ws, 2, self.logger)
+            self.assertEqual(ws._writer.compress, 15)
+
+            # writers without the compress attribute compress all messages
+            ws = FakeWebsocket(compress=15)
+            del ws._writer.compress
+            client = WebsocketClient(ws, 3, self.logger, compression_threshold=100)
+            client.start()
+            client.send_str("x" * 10)
+            await asyncio.sleep(0.01)
+            self.assertEqual(ws.compressed, [None])
+            client.stop()
+
+        asyncio.run(main())
+
+
+class TestClientRegistry(unittest.TestCase):
+
+    def test_ids_are_not_reused(self):
+        registry = ClientRegistry()
+        logger = logging.getLogger("ws_client_test")
+        first = WebsocketClient(FakeWebsocket(), registry.next_id(), logger)
+        registry.add(first)
+        registry.remove(first)
+        second = WebsocketClient(FakeWebsocket(), registry.next_id(), logger)
+        registry.add(second)
+
+        self.assertNotEqual(first.ws_id, second.ws_id)
+        self.assertIsNone(registry.get(first.ws_id))
+        self.assertIs(registry.get(second.ws_id), second)
+        self.assertEqual(list(registry), [second])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -35,13 +35,55 @@ class BybPluginInterface {
 }
 
 
+function apply_json_patch(doc, ops) {
+    // Applies JSON patch operations (add, remove, replace) as created by the
+    // server's framework/state_sync.py and returns the result.
+    for (const op of ops) {
+        const segments = op.path.split("/").slice(1).map(
+            s => s.replace(/~1/g, "/").replace(/~0/g, "~"));
+        if (segments.length == 0) {
+            doc = op.value;
+            continue;
+        }
+        var parent = doc;
+        for (const segment of segments.slice(0, -1)) {
+            parent = Array.isArray(parent) ? parent[parseInt(segment)] : parent[segment];
+        }
+        var key = segments[segments.length - 1];
+        if (Array.isArray(parent)) {
+            key = (key == "-") ? parent.length : parseInt(key);
+            if (op.op == "remove") {
+                parent.splice(key, 1);
+            } else if (op.op == "add") {
+                parent.splice(key, 0, op.value);
+            } else {
+                parent[key] = op.value;
+            }
+        } else if (op.op == "remove") {
+            delete parent[key];
+        } else {
+            parent[key] = op.value;
+        }
+    }
+    return doc;
+}
+
+
 class BybConnection {
 
     constructor() {
         const ws_addr = "ws://" + location.host + "/ws";
         // console.log(ws_addr);
-        this.ws = new WebSocket(ws_addr);
+        // The server picks the framing, MessagePack is only used if it's available there.
+        this.ws = new WebSocket(ws_addr, ["byb.msgpack", "byb.json"]);
+        this.ws.binaryType = "arraybuffer";
         this.plugins = {};
+        // plugin names in the order of their ids in MessagePack frames, sent by the server
+        this.plugin_names = [];
+        // plugin name -> command -> {version: Int, value: Object}, states that the server syncs with patches
+        this.states = {};
+        // seconds that the server's clock is ahead of this one, sent along with states
+        this.clock_offset = 0;
 
         this.connection_state_label = document.getElementById("connection_state_label");
 
@@ -73,7 +115,24 @@ class BybConnection {
         // console.log("BybConnection received data:");
         // console.log(event.data);
 
-        const json_data = JSON.parse(event.data);
+        // A message holds a single frame or all frames that the server
+        // produced for this client during one iteration of its event loop.
+        var frames;
+        if (typeof event.data == "string") {
+            frames = JSON.parse(event.data);
+            if (!Array.isArray(frames)) { frames = [frames]; }
+        } else {
+            const frame = msgpack.decode(event.data);
+            frames = (frame[0] == 5) ? frame[1] : [frame];
+            frames = frames.map(f => this.decode_frame(f)).filter(f => f != null);
+        }
+
+        for (const json_data of frames) {
+            this.dispatch_frame(json_data);
+        }
+    }
+
+    dispatch_frame(json_data) {
         const receiving_plugin = json_data["plugin_name"];
 
         if (!(receiving_plugin in this.plugins)) {
@@ -81,9 +140,86 @@ class BybConnection {
             return;
         }
 
+        if ("server_time" in json_data) {
+            this.clock_offset = json_data["server_time"] - Date.now() / 1000;
+        }
+
+        if ("state_patch" in json_data) {
+            this.apply_state_patch(receiving_plugin, json_data["state_patch"]);
+            return;
+        }
+
+        if ("state_version" in json_data) {
+            // full state, later patches are based on it
+            if (!(receiving_plugin in this.states)) { this.states[receiving_plugin] = {}; }
+            this.states[receiving_plugin][json_data["payload"]["command"]] = {
+                version: json_data["state_version"],
+                value: json_data["payload"]["payload"]
+            };
+        }
+
         this.plugins[receiving_plugin].receive_data(json_data["payload"]);
     }
 
+    is_compact() {
+        return this.ws.protocol == "byb.msgpack";
+    }
+
+    decode_frame(frame) {
+        // Turns a decoded MessagePack frame into the layout of json frames, see
+        // framework/framing.py. Returns null for frames that were handled here.
+        if (frame[0] == 3) {
+            this.plugin_names = frame[1];
+            return null;
+        }
+        const plugin_name = (typeof frame[1] == "number") ? this.plugin_names[frame[1]] : frame[1];
+        if (frame[0] == 2) {
+            return {
+                plugin_name: plugin_name,
+                state_patch: {command: frame[2], base_version: frame[3], version: frame[4], ops: frame[5]},
+                server_time: frame[6]
+            };
+        }
+        const json_data = {plugin_name: plugin_name, payload: frame[2]};
+        if (frame[0] == 1) {
+            json_data["state_version"] = frame[3];
+            json_data["server_time"] = frame[4];
+        }
+        return json_data;
+    }
+
+    plugin_id(plugin_name) {
+        const id = this.plugin_names.indexOf(plugin_name);
+        return (id == -1) ? plugin_name : id;
+    }
+
+    apply_state_patch(plugin_name, patch) {
+        // Applies the changes to the last known state and hands the complete
+        // state to the plugin. If a version was missed, the full state is
+        // requested from the server instead.
+        const plugin_states = this.states[plugin_name] || {};
+        const state = plugin_states[patch["command"]];
+        if (state == undefined || state.version != patch["base_version"]) {
+            console.log("state out of sync, requesting full state:", plugin_name, patch["command"]);
+            if (this.is_compact()) {
+                this.ws.send(msgpack.encode([4, this.plugin_id(plugin_name), patch["command"]]));
+            } else {
+                this.ws.send(JSON.stringify({
+                    plugin_name: plugin_name,
+                    sync_request: patch["command"]
+                }));
+            }
+            return;
+        }
+
+        state.value = apply_json_patch(state.value, patch["ops"]);
+        state.version = patch["version"];
+        this.plugins[plugin_name].receive_data({
+            command: patch["command"],
+            payload: state.value
+        }, patch["ops"]);
+    }
+
     register_plugin(plugin) {
         if (plugin.name == "") {
             console.log("BybConnection: Didn't add plugin: plugin.name was empty.");
@@ -94,6 +230,10 @@ class BybConnection {
     }
 
     send_to_backend(json_data, sender) {
+        if (this.is_compact()) {
+            this.ws.send(msgpack.encode([0, this.plugin_id(sender.name), json_data]));
+            return;
+        }
         const json_str = JSON.stringify({
             plugin_name: sender.name,
             payload: json_data
@@ -0,0 +1,187 @@
+//
+// msgpack.js
+// backyardbot
+//
+// Created: October 2026
+//
+
+// Minimal MessagePack encoder and decoder for the frames exchanged with the
+// server, see framework/framing.py. Supports nil, booleans, integers, floats,
+// strings, binary data, arrays and maps with string keys. Integers beyond
+// 2^53 and extension types aren't used by backyardbot.
+
+const msgpack = (function() {
+
+    const text_encoder = new TextEncoder();
+    const text_decoder = new TextDecoder();
+
+    class Writer {
+        constructor() {
+            this.buffer = new Uint8Array(256);
+            this.view = new DataView(this.buffer.buffer);
+            this.length = 0;
+        }
+
+        reserve(count) {
+            if (this.length + count <= this.buffer.length) { return; }
+            var size = this.buffer.length * 2;
+            while (size < this.length + count) { size *= 2; }
+            const buffer = new Uint8Array(size);
+            buffer.set(this.buffer);
+            this.buffer = buffer;
+            this.view = new DataView(buffer.buffer);
+        }
+
+        u8(value) { this.reserve(1); this.view.setUint8(this.length, value); this.length += 1; }
+        u16(value) { this.reserve(2); this.view.setUint16(this.length, value); this.length += 2; }
+        u32(value) { this.reserve(4); this.view.setUint32(this.length, value); this.length += 4; }
+        f64(value) { this.reserve(8); this.view.setFloat64(this.length, value); this.length += 8; }
+
+        bytes(array) {
+            this.reserve(array.length);
+            this.buffer.set(array, this.length);
+            this.length += array.length;
+        }
+
+        header(length, fix_type, fix_max, type16, type32) {
+            if (length <= fix_max) { this.u8(fix_type | length); }
+            else if (length < 0x10000) { this.u8(type16); this.u16(length); }
+            else { this.u8(type32); this.u32(length); }
+        }
+
+        integer(value) {
+            if (value >= 0) {
+                if (value < 0x80) { this.u8(value); }
+                else if (value < 0x100) { this.u8(0xcc); this.u8(value); }
+                else if (value < 0x10000) { this.u8(0xcd); this.u16(value); }
+                else if (value < 0x100000000) { this.u8(0xce); this.u32(value); }
+                else { this.u8(0xcf); this.u32(Math.floor(value / 0x100000000)); this.u32(value >>> 0); }
+            } else {
+                if (value >= -32) { this.u8(value & 0xff); }
+                else if (value >= -0x80) { this.u8(0xd0); this.reserve(1); this.view.setInt8(this.length, value); this.length += 1; }
+                else if (value >= -0x8000) { this.u8(0xd1); this.reserve(2); this.view.setInt16(this.length, value); this.length += 2; }
+                else if (value >= -0x80000000) { this.u8(0xd2); this.reserve(4); this.view.setInt32(this.length, value); this.length += 4; }
+                else { this.u8(0xcb); this.f64(value); }
+            }
+        }
+
+        value(value) {
+            if (value === null || value === undefined) { this.u8(0xc0); }
+            else if (value === false) { this.u8(0xc2); }
+            else if (value === true) { this.u8(0xc3); }
+            else if (typeof value == "number") {
+                if (Number.isSafeInteger(value)) { this.integer(value); }
+                else { this.u8(0xcb); this.f64(value); }
+            }
+            else if (typeof value == "string") {
+                const encoded = text_encoder.encode(value);
+                if (encoded.length < 0x20) { this.u8(0xa0 | encoded.length); }
+                else if (encoded.length < 0x100) { this.u8(0xd9); this.u8(encoded.length); }
+                else { this.header(encoded.length, 0, -1, 0xda, 0xdb); }
+                this.bytes(encoded);
+            }
+            else if (value instanceof Uint8Array) {
+                if (value.length < 0x100) { this.u8(0xc4); this.u8(value.length); }
+                else { this.header(value.length, 0, -1, 0xc5, 0xc6); }
+                this.bytes(value);
+            }
+            else if (Array.isArray(value)) {
+                this.header(value.length, 0x90, 15, 0xdc, 0xdd);
+                for (const item of value) { this.value(item); }
+            }
+            else {
+                const keys = Object.keys(value).filter(k => value[k] !== undefined);
+                this.header(keys.length, 0x80, 15, 0xde, 0xdf);
+                for (const key of keys) { this.value(key); this.value(value[key]); }
+            }
+        }
+    }
+
+    class Reader {
+        constructor(buffer) {
+            this.bytes = new Uint8Array(buffer);
+            this.view = new DataView(this.bytes.buffer, this.bytes.byteOffset, this.bytes.byteLength);
+            this.offset = 0;
+        }
+
+        u8() { return this.view.getUint8(this.offset++); }
+        u16() { const v = this.view.getUint16(this.offset); this.offset += 2; return v; }
+        u32() { const v = this.view.getUint32(this.offset); this.offset += 4; return v; }
+
+        str(length) {
+            const s = text_decoder.decode(this.bytes.subarray(this.offset, this.offset + length));
+            this.offset += length;
+            return s;
+        }
+
+        bin(length) {
+            const b = this.bytes.slice(this.offset, this.offset + length);
+            this.offset += length;
+            return b;
+        }
+
+        array(length) {
+            const a = new Array(length);
+            for (var i = 0; i < length; i++) { a[i] = this.value(); }
+            return a;
+        }
+
+        map(length) {
+            const m = {};
+            for (var i = 0; i < length; i++) { const key = this.value(); m[key] = this.value(); }
+            return m;
+        }
+
+        number(method, size) {
+            const v = this.view[method](this.offset);
+            this.offset += size;
+            return v;
+        }
+
+        value() {
+            const type = this.u8();
+            if (type < 0x80) { return type; }
+            if (type < 0x90) { return this.map(type & 0x0f); }
+            if (type < 0xa0) { return this.array(type & 0x0f); }
+            if (type < 0xc0) { return this.str(type & 0x1f); }
+            if (type >= 0xe0) { return type - 0x100; }
+            switch (type) {
+                case 0xc0: return null;
+                case 0xc2: return false;
+                case 0xc3: return true;
+                case 0xc4: return this.bin(this.u8());
+                case 0xc5: return this.bin(this.u16());
+                case 0xc6: return this.bin(this.u32());
+                case 0xca: return this.number("getFloat32", 4);
+                case 0xcb: return this.number("getFloat64", 8);
+                case 0xcc: return this.u8();
+                case 0xcd: return this.u16();
+                case 0xce: return this.u32();
+                case 0xcf: return this.u32() * 0x100000000 + this.u32();
+                case 0xd0: return this.number("getInt8", 1);
+                case 0xd1: return this.number("getInt16", 2);
+                case 0xd2: return this.number("getInt32", 4);
+                case 0xd3: { const high = this.number("getInt32", 4); return high * 0x100000000 + this.u32(); }
+                case 0xd9: return this.str(this.u8());
+                case 0xda: return this.str(this.u16());
+                case 0xdb: return this.str(this.u32());
+                case 0xdc: return this.array(this.u16());
+                case 0xdd: return this.array(this.u32());
+                case 0xde: return this.map(this.u16());
+                case 0xdf: return this.map(this.u32());
+            }
+            throw new Error("msgpack: unsupported type 0x" + type.toString(16));
+        }
+    }
+
+    return {
+        encode: function(value) {
+            const writer = new Writer();
+            writer.value(value);
+            return writer.buffer.slice(0, writer.length);
+        },
+        decode: function(buffer) {
+            return new Reader(buffer).value();
+        }
+    };
+})();